@@ -0,0 +1,174 @@
+import re
+import math
+import time
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# классы запросов в порядке приоритета: чем меньше число, тем позже запрос будет отброшен
+PRIORITIES = {
+    "status_write": 0,
+    "write": 1,
+    "read": 2,
+    "bulk_read": 3
+}
+
+# обновления статусов и сигналы жизни менеджеров
+STATUS_WRITE_PATH = re.compile(r"^/api/(modules/[^/]+/status|modules/statuses|nodes/[^/]+/heartbeat)$")
+
+DEFAULT_ADMISSION_CONFIG = {
+    "enabled": False,
+    "route_limits": {
+        "status_write": {"rate": 500, "burst": 1000},
+        "write": {"rate": 50, "burst": 100},
+        "read": {"rate": 200, "burst": 400},
+        "bulk_read": {"rate": 20, "burst": 40}
+    },
+    "client_limits": {"rate": 50, "burst": 100},
+    "status_client_limits": {"rate": 200, "burst": 400},
+    "max_clients": 10000,
+    "max_concurrent": 8,
+    "queue_size": 16,
+    "queue_timeout": 0.5
+}
+
+# проверка лимита маркерного ведра из конфига
+def validate_limit(name: str, limit: Any) -> Dict[str, float]:
+    if not isinstance(limit, dict):
+        raise ValueError(f"admission.{name}: ожидается объект с rate и burst")
+    try:
+        rate = float(limit["rate"])
+        burst = float(limit["burst"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"admission.{name}: rate и burst должны быть числами")
+    if rate <= 0 or burst < 1:
+        raise ValueError(f"admission.{name}: rate должен быть больше 0, burst - не меньше 1")
+    return {"rate": rate, "burst": burst}
+
+# маркерное ведро: rate токенов в секунду, не больше burst
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+    # взять токен, иначе вернуть через сколько секунд он появится
+    def take(self) -> Tuple[bool, float]:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+# ограничение числа одновременных запросов к бд с короткой очередью по приоритетам
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent: int, queue_size: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters = []
+        self.counter = itertools.count()
+    # занять слот, False если запрос отброшен
+    async def acquire(self, priority: int) -> bool:
+        if self.active < self.max_concurrent and not self.waiters:
+            self.active += 1
+            return True
+
+        if len(self.waiters) >= self.queue_size:
+            victim = max(self.waiters, key=lambda waiter: (waiter[0], waiter[1]))
+            if victim[0] <= priority:
+                return False
+            self.waiters.remove(victim)
+            victim[2].set_result(False)
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self.counter), future)
+        self.waiters.append(waiter)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+                return False
+            return future.result()
+    # освободить слот и передать его самому приоритетному ожидающему
+    def release(self):
+        self.active -= 1
+
+        while self.waiters and self.active < self.max_concurrent:
+            waiter = min(self.waiters, key=lambda waiter: (waiter[0], waiter[1]))
+            self.waiters.remove(waiter)
+            if not waiter[2].done():
+                self.active += 1
+                waiter[2].set_result(True)
+
+# проверка запросов: лимиты по классам маршрутов и клиентам, затем лимит одновременных запросов
+class AdmissionController:
+    def __init__(self, admission_config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_ADMISSION_CONFIG)
+        settings.update(admission_config or {})
+        route_limits = dict(DEFAULT_ADMISSION_CONFIG["route_limits"])
+        route_limits.update(settings["route_limits"] or {})
+
+        unknown = set(route_limits) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"admission.route_limits: неизвестные классы {', '.join(sorted(unknown))}")
+        self.route_buckets = {}
+        for route_class, limit in route_limits.items():
+            limit = validate_limit(f"route_limits.{route_class}", limit)
+            self.route_buckets[route_class] = TokenBucket(limit["rate"], limit["burst"])
+
+        # у обновлений статусов свое ведро клиента: массовые чтения клиента не отнимают токены у статусов
+        self.client_limits = {
+            "request": validate_limit("client_limits", settings["client_limits"]),
+            "status": validate_limit("status_client_limits", settings["status_client_limits"])
+        }
+        self.max_clients = int(settings["max_clients"])
+        self.client_buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+        if int(settings["max_concurrent"]) < 1 or int(settings["queue_size"]) < 0 or float(settings["queue_timeout"]) <= 0:
+            raise ValueError("admission: max_concurrent должен быть не меньше 1, queue_size - не меньше 0, queue_timeout - больше 0")
+        self.limiter = ConcurrencyLimiter(
+            int(settings["max_concurrent"]), int(settings["queue_size"]), float(settings["queue_timeout"])
+        )
+    # класс маршрута по методу и пути
+    def classify(self, method: str, path: str) -> str:
+        if method == "PUT" and STATUS_WRITE_PATH.match(path):
+            return "status_write"
+        if method in ("POST", "PUT", "DELETE", "PATCH"):
+            return "write"
+        if path == "/api/modules":
+            return "bulk_read"
+        return "read"
+    # маркерное ведро клиента для обычных запросов или статусов, старые клиенты вытесняются
+    def _client_bucket(self, client: str, kind: str) -> TokenBucket:
+        key = (client, kind)
+        bucket = self.client_buckets.get(key)
+        if bucket is None:
+            limit = self.client_limits[kind]
+            bucket = TokenBucket(limit["rate"], limit["burst"])
+            self.client_buckets[key] = bucket
+            if len(self.client_buckets) > self.max_clients:
+                self.client_buckets.popitem(last=False)
+        else:
+            self.client_buckets.move_to_end(key)
+        return bucket
+    # проверка лимитов по частоте, возвращает время ожидания для Retry-After или None
+    def check_rate(self, route_class: str, client: str) -> Optional[int]:
+        kind = "status" if route_class == "status_write" else "request"
+        allowed, retry_after = self._client_bucket(client, kind).take()
+        if not allowed:
+            return max(1, math.ceil(retry_after))
+
+        bucket = self.route_buckets.get(route_class)
+        if bucket:
+            allowed, retry_after = bucket.take()
+            if not allowed:
+                return max(1, math.ceil(retry_after))
+        return None
@@ -0,0 +1,592 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import tempfile
+import subprocess
+import multiprocessing
+
+import requests
+import paho.mqtt.client as mqtt
+
+import response_formats
+from database import Database
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# генерация тестового списка модулей
+def make_modules(count):
+    service_types = ["dummy_service", "camera_service", "sensor_service", "gateway_service"]
+    statuses = ["active", "inactive", "failed"]
+    return [
+        {
+            "guid": str(uuid.uuid4()),
+            "name": f"module_{i}",
+            "description": f"Тестовый модуль номер {i}",
+            "status": statuses[i % len(statuses)],
+            "service_type": service_types[i % len(service_types)]
+        }
+        for i in range(count)
+    ]
+
+# среднее время выполнения функции в миллисекундах
+def measure(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+# сравнение размера и времени декодирования форматов списка модулей
+def bench_encoding(args):
+    modules = make_modules(args.count)
+    print(f"Модулей: {args.count}")
+    print(f"{'формат':<42} {'сжатие':<6} {'байт':>10} {'декод, мс':>10}")
+
+    for media_type in response_formats.supported_types():
+        raw = response_formats.encode_modules(modules, media_type)
+        for encoding in [None] + response_formats.supported_encodings():
+            body, used = response_formats.compress(raw, encoding, 0)
+
+            def decode():
+                content = response_formats.decompress(body, used)
+                response_formats.decode_modules(content, media_type)
+
+            elapsed = measure(decode, args.repeat)
+            print(f"{media_type:<42} {used or '-':<6} {len(body):>10} {elapsed:>10.2f}")
+
+# заполнение временной бд тестовыми модулями
+def seed_database(db_path, count):
+    db = Database(db_path)
+    for module in make_modules(count):
+        db.add_module(module)
+
+# запуск system_api с заданным числом воркеров во временной директории
+def start_api(workdir, config_path, port, workers):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, SYSTEM_API_CONFIG=config_path)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "system_api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/api/modules", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError(f"System API не запустился на порту {port}")
+
+# один клиент: запросы в цикле до истечения времени, возвращает число ответов 200
+def run_client(url, duration):
+    session = requests.Session()
+    done = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        if session.get(url).status_code == 200:
+            done += 1
+    return done
+
+# пропускная способность чтения в зависимости от числа воркеров system_api
+def bench_api_workers(args):
+    workdir = tempfile.mkdtemp(prefix="system_api_bench_")
+    db_path = os.path.join(workdir, "modules.db")
+    config_path = os.path.join(workdir, "config.json")
+
+    seed_database(db_path, args.count)
+    with open(config_path, 'w') as f:
+        json.dump({"database": {"path": db_path}}, f)
+
+    print(f"Модулей: {args.count}, клиентов: {args.clients}, путь: {args.path}")
+    print(f"{'воркеров':>8} {'запросов/с':>12}")
+
+    for workers in args.workers:
+        process = start_api(workdir, config_path, args.port, workers)
+        try:
+            url = f"http://127.0.0.1:{args.port}{args.path}"
+            with multiprocessing.Pool(args.clients) as pool:
+                counts = pool.starmap(run_client, [(url, args.duration)] * args.clients)
+            print(f"{workers:>8} {sum(counts) / args.duration:>12.1f}")
+        finally:
+            process.terminate()
+            process.wait()
+
+# время поиска модулей по FTS5
+def bench_search(args):
+    workdir = tempfile.mkdtemp(prefix="search_bench_")
+    db = Database(os.path.join(workdir, "modules.db"))
+    db.upsert_modules(make_modules(args.count))
+
+    print(f"Модулей: {args.count}, FTS5: {db.fts_enabled}")
+    print(f"{'запрос':<20} {'найдено':>8} {'мс':>8}")
+    for query in args.queries:
+        found = len(db.search_modules(query, args.limit))
+        elapsed = measure(lambda: db.search_modules(query, args.limit), args.repeat)
+        print(f"{query:<20} {found:>8} {elapsed:>8.2f}")
+
+# время и размер страницы дашборда при росте числа модулей
+def bench_dashboard(args):
+    from jinja2 import Environment, FileSystemLoader
+    row_template = Environment(
+        loader=FileSystemLoader(os.path.join(REPO_DIR, "templates")), autoescape=True
+    ).get_template("module_row.html")
+
+    print(f"{'модулей':>8} {'сортировка':<14} {'страница, мс':>12} {'отрисовка, мс':>14} {'байт':>8}")
+    for count in args.counts:
+        workdir = tempfile.mkdtemp(prefix="dashboard_bench_")
+        db = Database(os.path.join(workdir, "modules.db"))
+        db.upsert_modules(make_modules(count))
+
+        for sort in ["name", "status"]:
+            offset = count // 2
+            _, modules = db.get_modules_page(offset, args.limit, sort)
+            rows = [row_template.render(module=module) for module in modules]
+
+            page_ms = measure(lambda: db.get_modules_page(offset, args.limit, sort), args.repeat)
+            render_ms = measure(lambda: [row_template.render(module=module) for module in modules], args.repeat)
+            print(f"{count:>8} {sort:<14} {page_ms:>12.2f} {render_ms:>14.2f} {len(''.join(rows)):>8}")
+
+# команды нагрузочного теста: имя в --mix -> (топик команды, поле action)
+LOAD_COMMANDS = {
+    "start": ("run_command_for_systemd_service", "start"),
+    "stop": ("run_command_for_systemd_service", "stop"),
+    "restart": ("run_command_for_systemd_service", "restart"),
+    "create": ("create_new_systemctl_service", None),
+    "remove": ("remove_service", None),
+    "update": ("update_modules_list", None)
+}
+
+# тестовый systemd: sudo выполняет команду как есть, systemctl хранит состояние юнитов в файлах
+FAKE_SUDO = """#!/bin/sh
+exec "$@"
+"""
+
+FAKE_SYSTEMCTL = """#!/bin/sh
+action="$1"
+shift
+case "$action" in
+    start|restart)
+        for unit in "$@"; do echo active > "$FAKE_SYSTEMD_STATE/$unit"; done ;;
+    stop)
+        for unit in "$@"; do echo inactive > "$FAKE_SYSTEMD_STATE/$unit"; done ;;
+    is-active)
+        code=0
+        for unit in "$@"; do
+            state=$(cat "$FAKE_SYSTEMD_STATE/$unit" 2>/dev/null || echo inactive)
+            echo "$state"
+            [ "$state" = active ] || code=3
+        done
+        exit $code ;;
+esac
+exit 0
+"""
+
+# n-й процентиль по ближайшему рангу
+def percentile(values, n):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(len(ordered) * n / 100 + 0.5) - 1))]
+
+# миллисекунды для таблицы
+def ms(value):
+    return f"{value:.1f}" if value is not None else "-"
+
+# разбор --mix вида start=40,stop=40,create=10
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in LOAD_COMMANDS:
+            raise argparse.ArgumentTypeError(f"неизвестная команда {name}, доступны: {', '.join(LOAD_COMMANDS)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"вес команды {name} должен быть числом: {weight}")
+        if mix[name] < 0:
+            raise argparse.ArgumentTypeError(f"вес команды {name} не может быть отрицательным")
+    if not sum(mix.values()):
+        raise argparse.ArgumentTypeError("сумма весов должна быть больше нуля")
+    return mix
+
+# каталог с тестовым systemd и юнитами для всех модулей
+def prepare_fake_systemd(workdir, modules):
+    bin_dir = os.path.join(workdir, "bin")
+    systemd_dir = os.path.join(workdir, "systemd")
+    state_dir = os.path.join(workdir, "systemd_state")
+    for path in (bin_dir, systemd_dir, state_dir):
+        os.makedirs(path, exist_ok=True)
+
+    for name, content in (("sudo", FAKE_SUDO), ("systemctl", FAKE_SYSTEMCTL)):
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        os.chmod(path, 0o755)
+
+    for module in modules:
+        with open(os.path.join(systemd_dir, f"{module['name']}.service"), 'w') as f:
+            f.write(f"[Service]\nWorkingDirectory={workdir}\nExecStart=/usr/bin/python3 {workdir}/main.py\n")
+
+    return {
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "HOME": workdir,
+        "MODULE_MANAGER_SYSTEMD_PATH": systemd_dir,
+        "FAKE_SYSTEMD_STATE": state_dir
+    }
+
+# статус модуля в System API после успешной команды
+STATUS_COMMANDS = {"start": "active", "stop": "inactive", "restart": "active"}
+
+# клиент нагрузочного теста: команды с correlation_id, ответы менеджера в свой топик,
+# после ответа статус модуля ожидается в GET /api/modules
+class LoadClient:
+    def __init__(self, broker, port, prefix, expected_modules, api_url, poll_interval):
+        self.prefix = prefix
+        self.reply_topic = f"{prefix}/loadgen/{uuid.uuid4().hex[:8]}"
+        self.expected_modules = expected_modules
+        self.api_url = api_url
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.watches = {}
+        self.results = []
+        self.heartbeats = 0
+
+        self.polling = True
+        self.poller = threading.Thread(target=self.poll_statuses, daemon=True)
+        self.poller.start()
+
+        self.client = mqtt.Client(client_id=f"loadgen_{uuid.uuid4().hex[:8]}")
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.client.connect(broker, port, 60)
+        self.client.loop_start()
+
+    def on_connect(self, client, userdata, flags, rc):
+        client.subscribe(self.reply_topic, qos=1)
+        client.subscribe(f"{self.prefix}/managers/+", qos=1)
+    # подтверждения и результаты команд, сигналы жизни менеджера
+    def on_message(self, client, userdata, msg):
+        received = time.time()
+        reply = json.loads(msg.payload)
+
+        if msg.topic != self.reply_topic:
+            if reply.get("state") == "online" and reply.get("modules") == self.expected_modules:
+                self.heartbeats += 1
+            return
+
+        with self.lock:
+            request = self.pending.get(reply.get("correlation_id"))
+            if request is None:
+                return
+            if reply["state"] == "accepted":
+                request["accepted_ts"] = reply["ts"]
+                return
+            del self.pending[reply["correlation_id"]]
+
+        queue_wait = None
+        if reply["state"] != "rejected" and request.get("accepted_ts") is not None:
+            queue_wait = max(0.0, reply["ts"] - reply.get("duration", 0) - request["accepted_ts"])
+        result = {
+            "kind": request["kind"],
+            "state": reply["state"],
+            "sent": request["sent"],
+            "received": received,
+            "latency": received - request["sent"],
+            "queue_wait": queue_wait,
+            "visible": received
+        }
+
+        if reply["state"] == "completed" and request["kind"] in STATUS_COMMANDS:
+            result["visible"] = None
+            with self.lock:
+                self.watches[reply["correlation_id"]] = (request["guid"], STATUS_COMMANDS[request["kind"]], result)
+        self.results.append(result)
+    # опрос System API: время, когда статус после команды стал виден в GET /api/modules
+    def poll_statuses(self):
+        session = requests.Session()
+        while self.polling:
+            if self.watches:
+                try:
+                    response = session.get(f"{self.api_url}/api/modules", headers={"Accept": "application/json"}, timeout=5)
+                    seen = time.time()
+                    statuses = {module["guid"]: module["status"] for module in response.json()}
+                except (requests.RequestException, ValueError):
+                    statuses, seen = {}, None
+
+                with self.lock:
+                    for correlation_id, (guid, status, result) in list(self.watches.items()):
+                        if statuses.get(guid) == status:
+                            result["visible"] = seen
+                            del self.watches[correlation_id]
+            time.sleep(self.poll_interval)
+    # ожидание менеджера, который загрузил все модули и запустил цикл мониторинга
+    def wait_ready(self, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.heartbeats >= 2:
+                return True
+            time.sleep(0.2)
+        return False
+    # публикация одной команды
+    def send(self, kind, module):
+        topic, action = LOAD_COMMANDS[kind]
+        correlation_id = uuid.uuid4().hex
+        payload = {"correlation_id": correlation_id, "reply_to": self.reply_topic, "sent_at": time.time()}
+        if topic != "update_modules_list":
+            payload["config_id"] = module["guid"]
+        if action:
+            payload["action"] = action
+
+        with self.lock:
+            self.pending[correlation_id] = {"kind": kind, "guid": module["guid"], "sent": time.time()}
+        self.client.publish(f"{self.prefix}/command/{topic}", json.dumps(payload), qos=1)
+    # ожидание ответов на все команды и новых статусов в API: (потеряно ответов, статусов не появилось в API)
+    def drain(self, timeout):
+        deadline = time.time() + timeout
+        while (self.pending or self.watches) and time.time() < deadline:
+            time.sleep(0.05)
+        with self.lock:
+            lost = len(self.pending)
+            invisible = len(self.watches)
+            self.pending.clear()
+            self.watches.clear()
+        return lost, invisible
+
+    def close(self):
+        self.polling = False
+        self.poller.join()
+        self.client.loop_stop()
+        self.client.disconnect()
+
+# нагрузка на ModuleManager через MQTT ступенями частоты: задержки до нового статуса в API и точка насыщения
+def bench_mqtt_load(args):
+    workdir = tempfile.mkdtemp(prefix="mqtt_load_")
+    db_path = os.path.join(workdir, "modules.db")
+    config_path = os.path.join(workdir, "config.json")
+    prefix = f"loadgen_{uuid.uuid4().hex[:8]}"
+
+    modules = make_modules(args.count)
+    Database(db_path).upsert_modules(modules)
+    env = dict(os.environ, **prepare_fake_systemd(workdir, modules))
+
+    with open(config_path, 'w') as f:
+        json.dump({
+            "loglevel": args.loglevel,
+            "database": {"path": db_path},
+            "systemapi": {"base_url": f"http://127.0.0.1:{args.port}"},
+            "mqtt": {"broker": args.broker, "port": args.broker_port, "username": "", "password": "", "topic_prefix": prefix},
+            "alerts": {"send_alert_after_service_failed": False},
+            "status_stream": {"enabled": True, "qos": 1, "summary_interval": 10, "heartbeat_interval": 1},
+            "commands": {"max_pending": args.max_pending},
+            "resources": {"enabled": False},
+            "health_checks": {"enabled": False}
+        }, f)
+
+    api_process = start_api(workdir, config_path, args.port, 1)
+    client = LoadClient(
+        args.broker, args.broker_port, prefix, args.count, f"http://127.0.0.1:{args.port}", args.poll_interval
+    )
+    manager_process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "module_manager.py"), config_path],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    try:
+        if not client.wait_ready(60):
+            raise RuntimeError("ModuleManager не подключился к брокеру или не загрузил модули")
+
+        kinds = list(args.mix)
+        weights = [args.mix[kind] for kind in kinds]
+        print(f"Модулей: {args.count}, смесь: {args.mix}, очередь менеджера: {args.max_pending}, ступень: {args.duration} с")
+        print(f"{'команд/с':>9} {'отпр.':>6} {'готово':>7} {'ошибки':>7} {'откл.':>6} {'потер.':>6} {'нет в API':>9} "
+              f"{'вып./с':>7} {'p50, мс':>8} {'p95, мс':>8} {'p99, мс':>8} {'ответ p99':>10} {'очередь p99':>12}")
+
+        saturation = None
+        last_ok = None
+        all_results = []
+        for rate in args.rates:
+            client.results = []
+            started = time.time()
+            sent = 0
+            while time.time() - started < args.duration:
+                client.send(random.choices(kinds, weights)[0], random.choice(modules))
+                sent += 1
+                delay = started + sent / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            window_end = time.time()
+            lost, invisible = client.drain(args.drain_timeout)
+
+            results = client.results
+            all_results += results
+            done = [result for result in results if result["state"] in ("completed", "failed")]
+            failed = sum(1 for result in done if result["state"] == "failed")
+            rejected = sum(1 for result in results if result["state"] == "rejected")
+            throughput = sum(1 for result in done if result["received"] <= window_end) / (window_end - started)
+            latencies = [(result["visible"] - result["sent"]) * 1000 for result in done if result["visible"] is not None]
+            reply_p99 = percentile([result["latency"] * 1000 for result in done], 99)
+            queue_waits = [result["queue_wait"] * 1000 for result in done if result["queue_wait"] is not None]
+            p50, p95, p99 = (percentile(latencies, n) for n in (50, 95, 99))
+            queue_p99 = percentile(queue_waits, 99)
+
+            print(f"{rate:>9g} {sent:>6} {len(done) - failed:>7} {failed:>7} {rejected:>6} {lost:>6} {invisible:>9} "
+                  f"{throughput:>7.1f} {ms(p50):>8} {ms(p95):>8} {ms(p99):>8} {ms(reply_p99):>10} {ms(queue_p99):>12}")
+
+            saturated = rejected or lost or invisible or throughput < rate * 0.9 or (p99 is not None and p99 > args.slo)
+            if saturated:
+                saturation = rate
+                break
+            last_ok = rate
+
+        print(f"{'команда':<9} {'всего':>6} {'ошибки':>7} {'p50, мс':>8} {'p95, мс':>8} {'p99, мс':>8}")
+        for kind in kinds:
+            done = [result for result in all_results if result["kind"] == kind and result["state"] in ("completed", "failed")]
+            latencies = [(result["visible"] - result["sent"]) * 1000 for result in done if result["visible"] is not None]
+            failed = sum(1 for result in done if result["state"] == "failed")
+            print(f"{kind:<9} {len(done):>6} {failed:>7} " + " ".join(f"{ms(percentile(latencies, n)):>8}" for n in (50, 95, 99)))
+
+        if saturation is None:
+            print(f"Насыщение не достигнуто до {args.rates[-1]:g} команд/с")
+        else:
+            print(f"Точка насыщения: {saturation:g} команд/с (последняя устойчивая ступень: {f'{last_ok:g}' if last_ok is not None else '-'})")
+        print(f"Журнал менеджера: {os.path.join(workdir, 'module_manager.log')}")
+    finally:
+        client.close()
+        manager_process.terminate()
+        manager_process.wait()
+        api_process.terminate()
+        api_process.wait()
+
+# бюджет времени холодного импорта точек входа, мс
+DEFAULT_STARTUP_BUDGET = {"module_manager": 400, "system_api": 1000}
+
+# разбор --budget вида module_manager=400
+def parse_budget(value):
+    name, _, budget = value.partition("=")
+    if name not in DEFAULT_STARTUP_BUDGET or not budget:
+        raise argparse.ArgumentTypeError(f"ожидается <точка входа>=<мс>, точки входа: {', '.join(DEFAULT_STARTUP_BUDGET)}")
+    return name, float(budget)
+
+# импорт модуля в новом процессе с -X importtime: (всего мс, прямые импорты модуля {имя: мс})
+def measure_import(module, workdir, env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=workdir, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Импорт {module} завершился с ошибкой: {result.stderr.strip().splitlines()[-1:]}")
+
+    # строки вида "import time: <свое> | <всего> | <отступ><модуль>", вложенные импорты идут перед родителем
+    children = {}
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        cumulative = int(parts[1]) / 1000
+        if depth == 0:
+            if name.strip() == module:
+                return cumulative, children
+            children = {}
+        elif depth == 1:
+            children[name.strip()] = cumulative
+    raise RuntimeError(f"В выводе -X importtime нет модуля {module}")
+
+# время холодного старта точек входа по -X importtime, код возврата 1 при превышении бюджета
+def bench_startup(args):
+    workdir = tempfile.mkdtemp(prefix="startup_bench_")
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, 'w') as f:
+        json.dump({"database": {"path": os.path.join(workdir, "modules.db")}}, f)
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, SYSTEM_API_CONFIG=config_path)
+    budget = dict(DEFAULT_STARTUP_BUDGET)
+    budget.update(dict(args.budget or []))
+
+    # первый импорт system_api создает схему бд, дальше она уже актуальна
+    first_run, _ = measure_import("system_api", workdir, env)
+    print(f"system_api с созданием схемы: {first_run:.1f} мс")
+    print(f"{'точка входа':<16} {'медиана, мс':>12} {'бюджет, мс':>11}  самые долгие импорты")
+
+    over_budget = False
+    for module in DEFAULT_STARTUP_BUDGET:
+        runs = [measure_import(module, workdir, env) for _ in range(args.repeat)]
+        runs.sort(key=lambda run: run[0])
+        total, children = runs[len(runs) // 2]
+        heaviest = sorted(children.items(), key=lambda item: -item[1])[:args.top]
+
+        verdict = "" if total <= budget[module] else "  ПРЕВЫШЕН"
+        over_budget = over_budget or bool(verdict)
+        print(f"{module:<16} {total:>12.1f} {budget[module]:>11g}  "
+              + ", ".join(f"{name} {elapsed:.1f}" for name, elapsed in heaviest) + verdict)
+
+    return 1 if over_budget else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки module_manager")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    encoding_parser = subparsers.add_parser("encoding", help="форматы ответа /api/modules")
+    encoding_parser.add_argument("--count", type=int, default=20000)
+    encoding_parser.add_argument("--repeat", type=int, default=10)
+    encoding_parser.set_defaults(func=bench_encoding)
+
+    workers_parser = subparsers.add_parser("api-workers", help="масштабирование чтения по воркерам system_api")
+    workers_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    workers_parser.add_argument("--clients", type=int, default=8)
+    workers_parser.add_argument("--duration", type=float, default=5)
+    workers_parser.add_argument("--count", type=int, default=100)
+    workers_parser.add_argument("--path", default="/api/modules")
+    workers_parser.add_argument("--port", type=int, default=8099)
+    workers_parser.set_defaults(func=bench_api_workers)
+
+    search_parser = subparsers.add_parser("search", help="поиск модулей по FTS5")
+    search_parser.add_argument("--count", type=int, default=100000)
+    search_parser.add_argument("--limit", type=int, default=20)
+    search_parser.add_argument("--repeat", type=int, default=20)
+    search_parser.add_argument("--queries", nargs="+", default=["module_123", "mod", "Тестовый 42", "номер 9999"])
+    search_parser.set_defaults(func=bench_search)
+
+    dashboard_parser = subparsers.add_parser("dashboard", help="страница строк дашборда")
+    dashboard_parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 100000])
+    dashboard_parser.add_argument("--limit", type=int, default=100)
+    dashboard_parser.add_argument("--repeat", type=int, default=20)
+    dashboard_parser.set_defaults(func=bench_dashboard)
+
+    load_parser = subparsers.add_parser("mqtt-load", help="нагрузка командами MQTT на ModuleManager с тестовым systemd")
+    load_parser.add_argument("--broker", default="localhost")
+    load_parser.add_argument("--broker-port", type=int, default=1883)
+    load_parser.add_argument("--port", type=int, default=8099, help="порт временного system_api")
+    load_parser.add_argument("--count", type=int, default=200)
+    load_parser.add_argument("--mix", type=parse_mix, default=parse_mix("start=40,stop=40,create=8,remove=4,update=8"))
+    load_parser.add_argument("--rates", type=float, nargs="+", default=[5, 10, 20, 50, 100, 200])
+    load_parser.add_argument("--duration", type=float, default=10)
+    load_parser.add_argument("--drain-timeout", type=float, default=30)
+    load_parser.add_argument("--slo", type=float, default=1000, help="допустимый p99 в мс")
+    load_parser.add_argument("--poll-interval", type=float, default=0.05, help="интервал опроса статусов в API, с")
+    load_parser.add_argument("--max-pending", type=int, default=100)
+    load_parser.add_argument("--loglevel", default="info")
+    load_parser.set_defaults(func=bench_mqtt_load)
+
+    startup_parser = subparsers.add_parser("startup", help="время импорта module_manager и system_api, проверка бюджета")
+    startup_parser.add_argument("--budget", type=parse_budget, nargs="+", help="например module_manager=300 system_api=800")
+    startup_parser.add_argument("--repeat", type=int, default=5)
+    startup_parser.add_argument("--top", type=int, default=5)
+    startup_parser.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
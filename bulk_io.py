@@ -0,0 +1,128 @@
+import io
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
+
+from database import MODULE_FIELDS
+
+NDJSON_TYPE = "application/x-ndjson"
+CSV_TYPE = "text/csv"
+
+# формат импорта/экспорта по Content-Type или параметру format
+def detect_format(value: Optional[str]) -> Optional[str]:
+    media_type = (value or "").split(";")[0].strip().lower()
+    if media_type in (NDJSON_TYPE, "application/ndjson", "application/jsonl", "ndjson", "jsonl"):
+        return "ndjson"
+    if media_type in (CSV_TYPE, "application/csv", "csv"):
+        return "csv"
+    return None
+
+# строки тела запроса по мере получения
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+# строки NDJSON: (номер строки, словарь или текст ошибки)
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, f"некорректный JSON: {str(e)}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "строка должна быть JSON объектом"
+            continue
+        yield line_number, row
+
+# строки CSV с заголовком: (номер строки, словарь или текст ошибки)
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    header = None
+    line_number = 0
+    pending = ""
+    pending_start = 0
+
+    async for line in lines:
+        line_number += 1
+        if pending:
+            pending += "\n" + line
+        else:
+            pending = line
+            pending_start = line_number
+
+        # поле в кавычках может содержать перевод строки: ждем закрывающую кавычку
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+
+        if len(values) != len(header):
+            yield pending_start, f"ожидалось {len(header)} полей, получено {len(values)}"
+            continue
+
+        row = {key: value for key, value in zip(header, values) if value != ""}
+        if row.get("health_check"):
+            try:
+                row["health_check"] = json.loads(row["health_check"])
+            except json.JSONDecodeError as e:
+                yield pending_start, f"некорректный health_check: {str(e)}"
+                continue
+        yield pending_start, row
+
+    if pending:
+        yield pending_start, "незакрытая кавычка в конце файла"
+
+# экспорт модулей построчно в NDJSON
+def export_ndjson(modules: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    lines = []
+    size = 0
+    for module in modules:
+        line = json.dumps(module, ensure_ascii=False) + "\n"
+        lines.append(line)
+        size += len(line)
+
+        if size > 65536:
+            yield "".join(lines).encode("utf-8")
+            lines = []
+            size = 0
+
+    yield "".join(lines).encode("utf-8")
+
+# экспорт модулей в CSV с заголовком
+def export_csv(modules: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(MODULE_FIELDS)
+
+    for module in modules:
+        row = []
+        for field in MODULE_FIELDS:
+            value = module.get(field)
+            if field == "health_check" and value is not None:
+                value = json.dumps(value, ensure_ascii=False)
+            row.append("" if value is None else value)
+        writer.writerow(row)
+
+        if buffer.tell() > 65536:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
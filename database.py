@@ -1,227 +1,1111 @@
-import os
-import sqlite3
-import logging
-from typing import List, Dict, Any, Optional, Tuple
-
-class Database:
-    def __init__(self, db_path: str):
-        self.logger = logging.getLogger("Database")
-        self.db_path = db_path
-        
-        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
-
-        self._initialize_db()
-    # подключение к SQlite
-    def _get_connection(self) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        return conn, cursor
-    # инициализация бд
-    def _initialize_db(self):
-        try:
-            conn, cursor = self._get_connection()
-
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS modules (
-                guid TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                description TEXT,
-                status TEXT DEFAULT 'inactive',
-                service_type TEXT NOT NULL
-            )
-            ''')
-            
-            conn.commit()
-            conn.close()
-            
-            self.logger.info(f"База данных была создана: {self.db_path}")
-            
-        except Exception as e:
-            self.logger.error(f"Ошибка создания базы данных: {str(e)}")
-            raise
-    # получения списка всех модулей
-    def get_modules(self) -> List[Dict[str, Any]]:
-        try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT * FROM modules")
-            modules = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
-            
-            return modules
-        except Exception as e:
-            self.logger.error(f"Ошибка при получении модулей: {str(e)}")
-            return []
-    # получение модуля по ID
-    def get_module(self, guid: str) -> Optional[Dict[str, Any]]:
-        try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT * FROM modules WHERE guid = ?", (guid,))
-            row = cursor.fetchone()
-            
-            conn.close()
-            
-            if row:
-                return dict(row)
-            return None
-        except Exception as e:
-            self.logger.error(f"Ошибка при получении модуля: {guid}: {str(e)}")
-            return None
-    # добавить новый модуль
-    def add_module(self, module: Dict[str, Any]) -> bool:
-        try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute(
-                """
-                INSERT INTO modules (guid, name, description, status, service_type)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    module.get('guid'),
-                    module.get('name'),
-                    module.get('description', ''),
-                    module.get('status', 'inactive'),
-                    module.get('service_type', 'dummy_service')
-                )
-            )
-            
-            conn.commit()
-            conn.close()
-            
-            self.logger.info(f"Добавлен новый модуль: {module.get('name')} (GUID: {module.get('guid')})")
-            return True
-        except Exception as e:
-            self.logger.error(f"Ошибка при добавлении модуля: {str(e)}")
-            return False
-    # обновить параметры модуля
-    def update_module(self, guid: str, update_data: Dict[str, Any]) -> bool:
-        try:
-            conn, cursor = self._get_connection()
-
-            cursor.execute("SELECT * FROM modules WHERE guid = ?", (guid,))
-            existing = cursor.fetchone()
-            
-            if not existing:
-                conn.close()
-                self.logger.warning(f"Модуль {guid} не найден")
-                return False
-            
-            updates = []
-            values = []
-            
-            for key, value in update_data.items():
-                if key in ['guid', 'name', 'description', 'status', 'service_type']:
-                    updates.append(f"{key} = ?")
-                    values.append(value)
-            
-            if not updates:
-                conn.close()
-                return True
-            
-            values.append(guid)
-            
-            query = f"UPDATE modules SET {', '.join(updates)} WHERE guid = ?"
-            cursor.execute(query, values)
-            
-            conn.commit()
-            conn.close()
-            
-            self.logger.info(f"Модуль обнавлен {guid}")
-            return True
-        except Exception as e:
-            self.logger.error(f"Ошибка при обновлении модуля {guid}: {str(e)}")
-            return False
-    # обновление статуса сервиса для модуля
-    def update_module_status(self, guid: str, status: str) -> bool:
-        try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT status FROM modules WHERE guid = ?", (guid,))
-            row = cursor.fetchone()
-            
-            if not row:
-                conn.close()
-                self.logger.warning(f"Модуль {guid} не найден")
-                return False
-            
-            old_status = row['status']
-            
-            cursor.execute(
-                "UPDATE modules SET status = ? WHERE guid = ?",
-                (status, guid)
-            )
-            
-            conn.commit()
-            conn.close()
-            
-            self.logger.info(f"Обновлен статус для {guid} из {old_status} в {status}")
-            return True
-        except Exception as e:
-            self.logger.error(f"Ошибка при обновлении статуса модуля {guid}: {str(e)}")
-            return False
-    # Обновление всех статусов модулей
-    def update_modules_status(self, status_updates_modules: List[Dict[str, Any]]) -> Tuple[bool, int, List[str]]:
-        try:
-            conn, cursor = self._get_connection()
-            
-            updated_count = 0
-            updated_modules = []
-            
-            for update in status_updates_modules:
-                guid = update.get('guid')
-                status = update.get('status')
-                
-                cursor.execute("SELECT name, status FROM modules WHERE guid = ?", (guid,))
-                row = cursor.fetchone()
-                
-                if row:
-                    old_status = row['status']
-                    name = row['name']
-                    
-                    cursor.execute(
-                        "UPDATE modules SET status = ? WHERE guid = ?",
-                        (status, guid)
-                    )
-                    
-                    updated_count += 1
-                    updated_modules.append(name)
-                    
-                    if old_status != status:
-                        self.logger.info(f"Обновленый статус для {name} из {old_status} в {status}")
-            
-            conn.commit()
-            conn.close()
-            
-            return True, updated_count, updated_modules
-        except Exception as e:
-            self.logger.error(f"Ошибка при обновлении статусов модулей: {str(e)}")
-            return False, 0, []
-    # Удалить модуль
-    def delete_module(self, guid: str) -> bool:
-        try:
-            conn, cursor = self._get_connection()
-            
-            cursor.execute("SELECT name FROM modules WHERE guid = ?", (guid,))
-            row = cursor.fetchone()
-            
-            if not row:
-                conn.close()
-                self.logger.warning(f"Модуль {guid} не найден для удаления")
-                return False
-            
-            name = row['name']
-            
-            cursor.execute("DELETE FROM modules WHERE guid = ?", (guid,))
-            
-            conn.commit()
-            conn.close()
-            
-            self.logger.info(f"Модуль был удален: {name} (GUID: {guid})")
-            return True
-        except Exception as e:
-            self.logger.error(f"Ошибка при удалении модуля {guid}: {str(e)}")
-            return False
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+from sharding import HashRing, membership_signature
+
+ROLLUP_BUCKETS = {"hour": 3600, "day": 86400}
+
+# версия схемы в PRAGMA user_version, увеличивается при каждом изменении DDL в _initialize_db
+SCHEMA_VERSION = 2
+
+MODULE_FIELDS = ['guid', 'name', 'description', 'status', 'service_type', 'health_check']
+
+PAGE_SORT_FIELDS = ['name', 'status', 'service_type', 'guid']
+
+DEFAULT_HISTORY_RETENTION = {
+    "raw_days": 7,
+    "hourly_days": 30,
+    "daily_days": 365
+}
+
+class Database:
+    def __init__(self, db_path: str, history_retention: Optional[Dict[str, int]] = None,
+                 busy_timeout: float = 5.0, journal_mode: str = "wal"):
+        self.logger = logging.getLogger("Database")
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.journal_mode = journal_mode
+        self.fts_enabled = False
+        self.history_retention = dict(DEFAULT_HISTORY_RETENTION)
+        self.history_retention.update(history_retention or {})
+        
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._initialize_db()
+    # подключение к SQlite
+    def _get_connection(self) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        return conn, cursor
+    # инициализация бд
+    def _initialize_db(self):
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+
+            # схема уже актуальна: DDL не выполняется, проверяется только наличие индекса FTS5
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] == SCHEMA_VERSION:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'modules_fts'")
+                self.fts_enabled = cursor.fetchone() is not None
+                conn.close()
+
+                self.logger.info(f"База данных открыта: {self.db_path} (схема {SCHEMA_VERSION})")
+                return
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS modules (
+                guid TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                status TEXT DEFAULT 'inactive',
+                service_type TEXT NOT NULL
+            )
+            ''')
+            self._ensure_column(cursor, "modules", "health_check", "TEXT")
+            self._ensure_column(cursor, "modules", "node", "TEXT")
+            self._ensure_column(cursor, "modules", "pinned_node", "TEXT")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_modules_node ON modules (node)")
+            self._ensure_column(cursor, "modules", "version", "INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_modules_name ON modules (name, guid)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_modules_status_name ON modules (status, name, guid)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_modules_service_type_name ON modules (service_type, name, guid)")
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                registered_at REAL NOT NULL,
+                last_heartbeat REAL NOT NULL
+            )
+            ''')
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS status_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guid TEXT NOT NULL,
+                old_status TEXT,
+                new_status TEXT NOT NULL,
+                ts REAL NOT NULL
+            )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_status_events_guid_ts ON status_events (guid, ts)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_status_events_ts ON status_events (ts)")
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS status_since (
+                guid TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                since REAL NOT NULL
+            )
+            ''')
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS status_rollups (
+                guid TEXT NOT NULL,
+                bucket_size TEXT NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                seconds REAL NOT NULL DEFAULT 0,
+                transitions INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guid, bucket_size, bucket_start, status)
+            )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_status_rollups_start ON status_rollups (bucket_size, bucket_start)")
+            self._initialize_status_history(cursor)
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+            ''')
+            cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+            cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('assignment_version', 0)")
+            cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('node_membership', 0)")
+            cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('row_version', 0)")
+            self._initialize_row_versions(cursor)
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS module_counts (
+                service_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (service_type, status)
+            )
+            ''')
+            cursor.execute("SELECT value FROM meta WHERE key = 'module_counts_ready'")
+            if not cursor.fetchone():
+                cursor.execute("DELETE FROM module_counts")
+                cursor.execute('''
+                INSERT INTO module_counts (service_type, status, count)
+                SELECT service_type, status, COUNT(*) FROM modules GROUP BY service_type, status
+                ''')
+                cursor.execute("INSERT INTO meta (key, value) VALUES ('module_counts_ready', 1)")
+            
+            conn.commit()
+
+            self.fts_enabled = self._initialize_search_index(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+            conn.close()
+            
+            self.logger.info(f"База данных была создана: {self.db_path}")
+            
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка создания базы данных: {str(e)}")
+            raise
+    # версия строки модуля из общего счетчика row_version, меняется при изменении отображаемых полей
+    def _initialize_row_versions(self, cursor: sqlite3.Cursor):
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS modules_version_insert AFTER INSERT ON modules BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'row_version';
+            UPDATE modules SET version = (SELECT value FROM meta WHERE key = 'row_version') WHERE rowid = new.rowid;
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS modules_version_update AFTER UPDATE OF name, description, status, service_type ON modules
+        WHEN new.name IS NOT old.name OR new.description IS NOT old.description
+            OR new.status IS NOT old.status OR new.service_type IS NOT old.service_type
+        BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'row_version';
+            UPDATE modules SET version = (SELECT value FROM meta WHERE key = 'row_version') WHERE rowid = new.rowid;
+        END
+        ''')
+    # полнотекстовый индекс FTS5 по name и description, синхронизируется триггерами
+    def _initialize_search_index(self, cursor: sqlite3.Cursor) -> bool:
+        try:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'modules_fts'")
+            created = cursor.fetchone() is None
+
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS modules_fts USING fts5(
+                name, description,
+                content = 'modules', content_rowid = 'rowid',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3 4'
+            )
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS modules_fts_insert AFTER INSERT ON modules BEGIN
+                INSERT INTO modules_fts (rowid, name, description) VALUES (new.rowid, new.name, new.description);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS modules_fts_delete AFTER DELETE ON modules BEGIN
+                INSERT INTO modules_fts (modules_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS modules_fts_update AFTER UPDATE OF name, description ON modules BEGIN
+                INSERT INTO modules_fts (modules_fts, rowid, name, description) VALUES ('delete', old.rowid, old.name, old.description);
+                INSERT INTO modules_fts (rowid, name, description) VALUES (new.rowid, new.name, new.description);
+            END
+            ''')
+
+            if created:
+                cursor.execute("INSERT INTO modules_fts (modules_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"Полнотекстовый поиск FTS5 недоступен, используется LIKE: {str(e)}")
+            return False
+    # пересборка полнотекстового индекса (например после VACUUM)
+    def rebuild_search_index(self) -> bool:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("INSERT INTO modules_fts (modules_fts) VALUES ('rebuild')")
+
+            conn.commit()
+            conn.close()
+
+            self.logger.info("Полнотекстовый индекс модулей пересобран")
+            return True
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при пересборке полнотекстового индекса: {str(e)}")
+            return False
+    # поиск модулей по началу слов в name и description, лучшие совпадения первыми
+    def search_modules(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            if self.fts_enabled:
+                match = " ".join(f'"{word}"*' for word in words)
+                cursor.execute(
+                    """
+                    SELECT modules.* FROM modules_fts
+                    JOIN modules ON modules.rowid = modules_fts.rowid
+                    WHERE modules_fts MATCH ?
+                    ORDER BY bm25(modules_fts, 10.0, 1.0)
+                    LIMIT ?
+                    """,
+                    (match, limit)
+                )
+            else:
+                conditions, values = self._like_conditions(words)
+                cursor.execute(f"SELECT * FROM modules WHERE {' AND '.join(conditions)} LIMIT ?", values + [limit])
+
+            modules = [self._row_to_module(row) for row in cursor.fetchall()]
+
+            conn.close()
+
+            return modules
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при поиске модулей по запросу {query}: {str(e)}")
+            return []
+    # условия поиска слов через LIKE без FTS5: (условия, значения)
+    def _like_conditions(self, words: List[str]) -> Tuple[List[str], List[str]]:
+        conditions = []
+        values = []
+        for word in words:
+            # "_" входит в \w, но в LIKE это любой символ
+            pattern = "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append("(name LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')")
+            values += [pattern, pattern]
+        return conditions, values
+    # страница модулей для дашборда: (всего модулей по фильтру, модули страницы) или None при ошибке
+    def get_modules_page(self, offset: int = 0, limit: int = 100, sort: str = "name", descending: bool = False,
+                         statuses: Optional[List[str]] = None, query: Optional[str] = None) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        if sort not in PAGE_SORT_FIELDS:
+            sort = "name"
+        direction = "DESC" if descending else "ASC"
+        # порядок совпадает с индексами idx_modules_*_name, при равенстве строки упорядочены по имени
+        order = {"name": ["name", "guid"], "guid": ["guid"]}.get(sort, [sort, "name", "guid"])
+
+        conditions = []
+        values = []
+        if statuses:
+            conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            values += statuses
+
+        words = re.findall(r"\w+", query or "")
+        if words and self.fts_enabled:
+            conditions.append("rowid IN (SELECT rowid FROM modules_fts WHERE modules_fts MATCH ?)")
+            values.append(" ".join(f'"{word}"*' for word in words))
+        else:
+            like_conditions, like_values = self._like_conditions(words)
+            conditions += like_conditions
+            values += like_values
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            # без поиска общее число берется из счетчиков, а не подсчетом строк
+            if words:
+                cursor.execute(f"SELECT COUNT(*) FROM modules {where}", values)
+            elif statuses:
+                cursor.execute(
+                    f"SELECT COALESCE(SUM(count), 0) FROM module_counts WHERE status IN ({', '.join('?' for _ in statuses)})",
+                    statuses
+                )
+            else:
+                cursor.execute("SELECT COALESCE(SUM(count), 0) FROM module_counts")
+            total = cursor.fetchone()[0]
+
+            cursor.execute(
+                f"SELECT * FROM modules {where} ORDER BY {', '.join(f'{column} {direction}' for column in order)} LIMIT ? OFFSET ?",
+                values + [limit, offset]
+            )
+            modules = [self._row_to_module(row) for row in cursor.fetchall()]
+
+            conn.close()
+
+            return total, modules
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при получении страницы модулей: {str(e)}")
+            return None
+    # добавление колонки в существующую таблицу
+    def _ensure_column(self, cursor: sqlite3.Cursor, table: str, column: str, column_type: str):
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    # преобразование строки таблицы modules в словарь
+    def _row_to_module(self, row: sqlite3.Row) -> Dict[str, Any]:
+        module = dict(row)
+        if module.get('health_check'):
+            module['health_check'] = json.loads(module['health_check'])
+        return module
+    # получения списка всех модулей или модулей одного узла
+    def get_modules(self, node: Optional[str] = None) -> List[Dict[str, Any]]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+            
+            if node is None:
+                cursor.execute("SELECT * FROM modules")
+            else:
+                cursor.execute("SELECT * FROM modules WHERE node = ?", (node,))
+            modules = [self._row_to_module(row) for row in cursor.fetchall()]
+            
+            conn.close()
+            
+            return modules
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при получении модулей: {str(e)}")
+            return []
+    # получение модуля по ID
+    def get_module(self, guid: str) -> Optional[Dict[str, Any]]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+            
+            cursor.execute("SELECT * FROM modules WHERE guid = ?", (guid,))
+            row = cursor.fetchone()
+            
+            conn.close()
+            
+            if row:
+                return self._row_to_module(row)
+            return None
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при получении модуля: {guid}: {str(e)}")
+            return None
+    # добавить новый модуль
+    def add_module(self, module: Dict[str, Any]) -> bool:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+            
+            cursor.execute(
+                """
+                INSERT INTO modules (guid, name, description, status, service_type, health_check)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    module.get('guid'),
+                    module.get('name'),
+                    module.get('description', ''),
+                    module.get('status', 'inactive'),
+                    module.get('service_type', 'dummy_service'),
+                    json.dumps(module['health_check']) if module.get('health_check') else None
+                )
+            )
+            now = time.time()
+            cursor.execute(
+                "INSERT OR REPLACE INTO status_since (guid, status, since) VALUES (?, ?, ?)",
+                (module.get('guid'), module.get('status', 'inactive'), now)
+            )
+            cursor.execute(
+                "INSERT INTO status_events (guid, old_status, new_status, ts) VALUES (?, NULL, ?, ?)",
+                (module.get('guid'), module.get('status', 'inactive'), now)
+            )
+            self._adjust_counts(cursor, {(module.get('service_type', 'dummy_service'), module.get('status', 'inactive')): 1})
+            self._bump_data_version(cursor)
+            
+            conn.commit()
+            conn.close()
+            
+            self.logger.info(f"Добавлен новый модуль: {module.get('name')} (GUID: {module.get('guid')})")
+            return True
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при добавлении модуля: {str(e)}")
+            return False
+    # добавить или обновить много модулей одной транзакцией, возвращает guid новых модулей
+    def upsert_modules(self, modules: List[Dict[str, Any]]) -> Tuple[bool, List[str]]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("SELECT guid, status, service_type FROM modules")
+            existing = {}
+            existing_types = {}
+            for row in cursor.fetchall():
+                existing[row['guid']] = row['status']
+                existing_types[row['guid']] = row['service_type']
+
+            rows = []
+            for module in modules:
+                rows.append((
+                    module.get('guid'),
+                    module.get('name'),
+                    module.get('description', ''),
+                    module.get('status', 'inactive'),
+                    module.get('service_type', 'dummy_service'),
+                    json.dumps(module['health_check']) if module.get('health_check') else None
+                ))
+
+            cursor.executemany(
+                """
+                INSERT INTO modules (guid, name, description, status, service_type, health_check)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (guid) DO UPDATE SET
+                    name = excluded.name,
+                    description = excluded.description,
+                    status = excluded.status,
+                    service_type = excluded.service_type,
+                    health_check = excluded.health_check
+                """,
+                rows
+            )
+
+            now = time.time()
+            inserted = []
+            count_deltas = {}
+            for module in modules:
+                guid = module.get('guid')
+                status = module.get('status', 'inactive')
+                service_type = module.get('service_type', 'dummy_service')
+
+                if guid not in existing:
+                    inserted.append(guid)
+                else:
+                    old_key = (existing_types[guid], existing[guid])
+                    count_deltas[old_key] = count_deltas.get(old_key, 0) - 1
+                    if existing[guid] != status:
+                        self._record_status_transition(cursor, guid, existing[guid], status, now)
+
+                count_deltas[(service_type, status)] = count_deltas.get((service_type, status), 0) + 1
+                existing[guid] = status
+                existing_types[guid] = service_type
+
+            self._adjust_counts(cursor, count_deltas)
+
+            cursor.executemany(
+                "INSERT OR IGNORE INTO status_since (guid, status, since) VALUES (?, ?, ?)",
+                [(guid, existing[guid], now) for guid in inserted]
+            )
+            cursor.executemany(
+                "INSERT INTO status_events (guid, old_status, new_status, ts) VALUES (?, NULL, ?, ?)",
+                [(guid, existing[guid], now) for guid in inserted]
+            )
+            self._bump_data_version(cursor)
+
+            conn.commit()
+            conn.close()
+
+            self.logger.info(f"Импортировано модулей: {len(modules)}, новых: {len(inserted)}")
+            return True, inserted
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при импорте модулей: {str(e)}")
+            return False, []
+    # постепенное чтение всех модулей пачками по guid; каждая пачка читается своим соединением,
+    # потому что StreamingResponse вызывает генератор из разных потоков
+    def iter_modules(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        last_guid = None
+        while True:
+            conn, cursor = self._get_connection()
+            try:
+                if last_guid is None:
+                    cursor.execute("SELECT * FROM modules ORDER BY guid LIMIT ?", (batch_size,))
+                else:
+                    cursor.execute("SELECT * FROM modules WHERE guid > ? ORDER BY guid LIMIT ?", (last_guid, batch_size))
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+
+            for row in rows:
+                yield self._row_to_module(row)
+            if len(rows) < batch_size:
+                break
+            last_guid = rows[-1]["guid"]
+    # обновить параметры модуля
+    def update_module(self, guid: str, update_data: Dict[str, Any]) -> bool:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("SELECT * FROM modules WHERE guid = ?", (guid,))
+            existing = cursor.fetchone()
+            
+            if not existing:
+                conn.close()
+                self.logger.warning(f"Модуль {guid} не найден")
+                return False
+            
+            updates = []
+            values = []
+            
+            for key, value in update_data.items():
+                if key in MODULE_FIELDS:
+                    if key == 'health_check' and value is not None:
+                        value = json.dumps(value)
+                    updates.append(f"{key} = ?")
+                    values.append(value)
+            
+            if not updates:
+                conn.close()
+                return True
+            
+            values.append(guid)
+            
+            query = f"UPDATE modules SET {', '.join(updates)} WHERE guid = ?"
+            cursor.execute(query, values)
+
+            new_status = update_data.get('status')
+            if new_status is not None and new_status != existing['status']:
+                self._record_status_transition(cursor, guid, existing['status'], new_status, time.time())
+
+            new_service_type = update_data.get('service_type', existing['service_type'])
+            new_status = new_status if new_status is not None else existing['status']
+            if (new_service_type, new_status) != (existing['service_type'], existing['status']):
+                self._adjust_counts(cursor, {
+                    (existing['service_type'], existing['status']): -1,
+                    (new_service_type, new_status): 1
+                })
+            self._bump_data_version(cursor)
+            
+            conn.commit()
+            conn.close()
+            
+            self.logger.info(f"Модуль обнавлен {guid}")
+            return True
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при обновлении модуля {guid}: {str(e)}")
+            return False
+    # обновление статуса сервиса для модуля
+    def update_module_status(self, guid: str, status: str) -> bool:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+            
+            cursor.execute("SELECT status, service_type FROM modules WHERE guid = ?", (guid,))
+            row = cursor.fetchone()
+            
+            if not row:
+                conn.close()
+                self.logger.warning(f"Модуль {guid} не найден")
+                return False
+            
+            old_status = row['status']
+            
+            cursor.execute(
+                "UPDATE modules SET status = ? WHERE guid = ?",
+                (status, guid)
+            )
+
+            if old_status != status:
+                self._record_status_transition(cursor, guid, old_status, status, time.time())
+                self._adjust_counts(cursor, {
+                    (row['service_type'], old_status): -1,
+                    (row['service_type'], status): 1
+                })
+            self._bump_data_version(cursor)
+            
+            conn.commit()
+            conn.close()
+            
+            self.logger.info(f"Обновлен статус для {guid} из {old_status} в {status}")
+            return True
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при обновлении статуса модуля {guid}: {str(e)}")
+            return False
+    # Обновление всех статусов модулей
+    def update_modules_status(self, status_updates_modules: List[Dict[str, Any]]) -> Tuple[bool, int, List[str]]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+            
+            updated_count = 0
+            updated_modules = []
+            count_deltas = {}
+            now = time.time()
+            
+            for update in status_updates_modules:
+                guid = update.get('guid')
+                status = update.get('status')
+                
+                cursor.execute("SELECT name, status, service_type FROM modules WHERE guid = ?", (guid,))
+                row = cursor.fetchone()
+                
+                if row:
+                    old_status = row['status']
+                    name = row['name']
+                    
+                    cursor.execute(
+                        "UPDATE modules SET status = ? WHERE guid = ?",
+                        (status, guid)
+                    )
+                    
+                    updated_count += 1
+                    updated_modules.append(name)
+                    
+                    if old_status != status:
+                        self._record_status_transition(cursor, guid, old_status, status, now)
+                        old_key = (row['service_type'], old_status)
+                        new_key = (row['service_type'], status)
+                        count_deltas[old_key] = count_deltas.get(old_key, 0) - 1
+                        count_deltas[new_key] = count_deltas.get(new_key, 0) + 1
+                        self.logger.info(f"Обновленый статус для {name} из {old_status} в {status}")
+
+            if updated_count:
+                self._adjust_counts(cursor, count_deltas)
+                self._bump_data_version(cursor)
+            
+            conn.commit()
+            conn.close()
+            
+            return True, updated_count, updated_modules
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при обновлении статусов модулей: {str(e)}")
+            return False, 0, []
+    # Удалить модуль
+    def delete_module(self, guid: str) -> bool:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+            
+            cursor.execute("SELECT name, status, service_type FROM modules WHERE guid = ?", (guid,))
+            row = cursor.fetchone()
+            
+            if not row:
+                conn.close()
+                self.logger.warning(f"Модуль {guid} не найден для удаления")
+                return False
+            
+            name = row['name']
+            
+            cursor.execute("DELETE FROM modules WHERE guid = ?", (guid,))
+            cursor.execute("DELETE FROM status_since WHERE guid = ?", (guid,))
+            self._adjust_counts(cursor, {(row['service_type'], row['status']): -1})
+            self._bump_data_version(cursor)
+            
+            conn.commit()
+            conn.close()
+            
+            self.logger.info(f"Модуль был удален: {name} (GUID: {guid})")
+            return True
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при удалении модуля {guid}: {str(e)}")
+            return False
+    # изменение счетчиков модулей по (service_type, status)
+    def _adjust_counts(self, cursor: sqlite3.Cursor, deltas: Dict[Tuple[str, str], int]):
+        cursor.executemany(
+            """
+            INSERT INTO module_counts (service_type, status, count) VALUES (?, ?, ?)
+            ON CONFLICT (service_type, status) DO UPDATE SET count = count + excluded.count
+            """,
+            [(service_type, status, delta) for (service_type, status), delta in deltas.items() if delta]
+        )
+    # сводка по числу модулей в каждом статусе и типе сервиса
+    def get_modules_summary(self) -> Optional[Dict[str, Any]]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("SELECT service_type, status, count FROM module_counts WHERE count > 0")
+            rows = cursor.fetchall()
+
+            conn.close()
+
+            total = 0
+            by_status = {}
+            by_service_type = {}
+            for row in rows:
+                total += row['count']
+                by_status[row['status']] = by_status.get(row['status'], 0) + row['count']
+                by_service_type.setdefault(row['service_type'], {})[row['status']] = row['count']
+
+            return {"total": total, "by_status": by_status, "by_service_type": by_service_type}
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при получении сводки модулей: {str(e)}")
+            return None
+    # сигнал жизни ModuleManager, возвращает (версия распределения, узел новый или вернулся)
+    def node_heartbeat(self, node_id: str, heartbeat_timeout: float) -> Tuple[Optional[int], bool]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            now = time.time()
+            cursor.execute("SELECT last_heartbeat FROM nodes WHERE node_id = ?", (node_id,))
+            row = cursor.fetchone()
+            joined = row is None or row['last_heartbeat'] < now - heartbeat_timeout
+
+            cursor.execute(
+                """
+                INSERT INTO nodes (node_id, registered_at, last_heartbeat) VALUES (?, ?, ?)
+                ON CONFLICT (node_id) DO UPDATE SET last_heartbeat = excluded.last_heartbeat
+                """,
+                (node_id, now, now)
+            )
+            cursor.execute("SELECT value FROM meta WHERE key = 'assignment_version'")
+            version = cursor.fetchone()['value']
+
+            conn.commit()
+            conn.close()
+
+            if joined:
+                self.logger.info(f"Узел {node_id} подключен")
+            return version, joined
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при обработке сигнала жизни узла {node_id}: {str(e)}")
+            return None, False
+    # идентификаторы живых узлов, по ним ModuleManager строит то же кольцо, что и API
+    def get_alive_nodes(self, heartbeat_timeout: float) -> List[str]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute(
+                "SELECT node_id FROM nodes WHERE last_heartbeat >= ? ORDER BY node_id",
+                (time.time() - heartbeat_timeout,)
+            )
+            nodes = [row['node_id'] for row in cursor.fetchall()]
+
+            conn.close()
+            return nodes
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при получении живых узлов: {str(e)}")
+            return []
+    # список узлов с признаком жизни и числом модулей
+    def get_nodes(self, heartbeat_timeout: float) -> List[Dict[str, Any]]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("SELECT node, COUNT(*) AS count FROM modules WHERE node IS NOT NULL GROUP BY node")
+            counts = {row['node']: row['count'] for row in cursor.fetchall()}
+            cursor.execute("SELECT * FROM nodes ORDER BY node_id")
+            rows = cursor.fetchall()
+
+            conn.close()
+
+            deadline = time.time() - heartbeat_timeout
+            return [{
+                "node_id": row['node_id'],
+                "registered_at": row['registered_at'],
+                "last_heartbeat": row['last_heartbeat'],
+                "alive": row['last_heartbeat'] >= deadline,
+                "modules": counts.get(row['node_id'], 0)
+            } for row in rows]
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при получении списка узлов: {str(e)}")
+            return []
+    # распределение модулей по живым узлам: закрепленные за живым узлом остаются на нем, остальные по кольцу хэшей
+    # распределения из разных воркеров API выполняются по очереди (BEGIN IMMEDIATE); при min_interval распределение
+    # пропускается, если другой воркер выполнил его меньше min_interval секунд назад
+    def rebalance_modules(self, heartbeat_timeout: float, virtual_nodes: int = 64, min_interval: float = 0) -> Optional[int]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            now = time.time()
+            cursor.execute("SELECT value FROM meta WHERE key = 'rebalanced_at'")
+            row = cursor.fetchone()
+            if min_interval > 0 and row and now - row['value'] / 1000 < min_interval:
+                conn.rollback()
+                conn.close()
+                return 0
+            cursor.execute(
+                "INSERT INTO meta (key, value) VALUES ('rebalanced_at', ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (int(now * 1000),)
+            )
+
+            cursor.execute("SELECT node_id FROM nodes WHERE last_heartbeat >= ?", (now - heartbeat_timeout,))
+            alive = [row['node_id'] for row in cursor.fetchall()]
+            if not alive:
+                conn.commit()
+                conn.close()
+                return 0
+
+            signature = membership_signature(alive)
+            cursor.execute("SELECT value FROM meta WHERE key = 'node_membership'")
+            membership_changed = cursor.fetchone()['value'] != signature
+
+            # без изменения состава узлов распределяются только новые и освобожденные модули
+            if membership_changed:
+                cursor.execute("SELECT guid, node, pinned_node FROM modules")
+            else:
+                cursor.execute("SELECT guid, node, pinned_node FROM modules WHERE node IS NULL")
+
+            ring = HashRing(alive, virtual_nodes)
+            alive_set = set(alive)
+            moves = []
+            for row in cursor.fetchall():
+                pinned = row['pinned_node']
+                target = pinned if pinned in alive_set else ring.node_for(row['guid'])
+                if target != row['node']:
+                    moves.append((target, row['guid']))
+
+            cursor.executemany("UPDATE modules SET node = ? WHERE guid = ?", moves)
+            if moves:
+                cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'assignment_version'")
+                self._bump_data_version(cursor)
+            if membership_changed:
+                cursor.execute("UPDATE meta SET value = ? WHERE key = 'node_membership'", (signature,))
+
+            conn.commit()
+            conn.close()
+
+            if membership_changed:
+                self.logger.info(f"Состав узлов изменен: {', '.join(sorted(alive))}, перемещено модулей: {len(moves)}")
+            return len(moves)
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при распределении модулей по узлам: {str(e)}")
+            return None
+    # закрепление модуля за узлом (None - вернуть распределение по кольцу), модуль переназначается при следующем распределении
+    def set_module_node(self, guid: str, node: Optional[str]) -> bool:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("UPDATE modules SET pinned_node = ?, node = NULL WHERE guid = ?", (node, guid))
+            if cursor.rowcount == 0:
+                conn.close()
+                self.logger.warning(f"Модуль {guid} не найден")
+                return False
+            self._bump_data_version(cursor)
+
+            conn.commit()
+            conn.close()
+
+            self.logger.info(f"Модуль {guid} закреплен за узлом {node}")
+            return True
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при закреплении модуля {guid} за узлом: {str(e)}")
+            return False
+    # увеличение версии данных модулей, по ней процессы сбрасывают свои кэши
+    def _bump_data_version(self, cursor: sqlite3.Cursor):
+        cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+    # текущая версия данных модулей
+    def get_data_version(self) -> Optional[int]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("SELECT value FROM meta WHERE key = 'data_version'")
+            row = cursor.fetchone()
+
+            conn.close()
+
+            return row['value'] if row else None
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при получении версии данных: {str(e)}")
+            return None
+    # начальная точка истории для модулей, созданных до учета статусов: без нее время до первой смены статуса не считается
+    def _initialize_status_history(self, cursor: sqlite3.Cursor):
+        cursor.execute(
+            """
+            INSERT INTO status_since (guid, status, since)
+            SELECT guid, status, ? FROM modules WHERE guid NOT IN (SELECT guid FROM status_since)
+            """,
+            (time.time(),)
+        )
+        cursor.execute(
+            """
+            INSERT INTO status_events (guid, old_status, new_status, ts)
+            SELECT guid, NULL, status, since FROM status_since
+            WHERE guid NOT IN (SELECT DISTINCT guid FROM status_events)
+            """
+        )
+    # запись перехода статуса в историю и пересчет агрегатов
+    def _record_status_transition(self, cursor: sqlite3.Cursor, guid: str, old_status: Optional[str], new_status: str, now: float):
+        cursor.execute(
+            "INSERT INTO status_events (guid, old_status, new_status, ts) VALUES (?, ?, ?, ?)",
+            (guid, old_status, new_status, now)
+        )
+
+        cursor.execute("SELECT status, since FROM status_since WHERE guid = ?", (guid,))
+        row = cursor.fetchone()
+        if row:
+            self._add_rollup_time(cursor, guid, row['status'], row['since'], now)
+
+        for bucket_size, length in ROLLUP_BUCKETS.items():
+            cursor.execute(
+                """
+                INSERT INTO status_rollups (guid, bucket_size, bucket_start, status, seconds, transitions)
+                VALUES (?, ?, ?, ?, 0, 1)
+                ON CONFLICT (guid, bucket_size, bucket_start, status)
+                DO UPDATE SET transitions = transitions + 1
+                """,
+                (guid, bucket_size, int(now // length * length), new_status)
+            )
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO status_since (guid, status, since) VALUES (?, ?, ?)",
+            (guid, new_status, now)
+        )
+    # распределение времени в статусе по часовым и суточным бакетам
+    def _add_rollup_time(self, cursor: sqlite3.Cursor, guid: str, status: str, start: float, end: float):
+        retention_days = {
+            "hour": self.history_retention["hourly_days"],
+            "day": self.history_retention["daily_days"]
+        }
+
+        for bucket_size, length in ROLLUP_BUCKETS.items():
+            current = max(start, end - retention_days[bucket_size] * 86400)
+            while current < end:
+                bucket_start = int(current // length * length)
+                bucket_end = bucket_start + length
+                seconds = min(end, bucket_end) - current
+
+                cursor.execute(
+                    """
+                    INSERT INTO status_rollups (guid, bucket_size, bucket_start, status, seconds, transitions)
+                    VALUES (?, ?, ?, ?, ?, 0)
+                    ON CONFLICT (guid, bucket_size, bucket_start, status)
+                    DO UPDATE SET seconds = seconds + excluded.seconds
+                    """,
+                    (guid, bucket_size, bucket_start, status, seconds)
+                )
+                current = bucket_end
+    # время в каждом статусе и число переходов за окно по агрегатам
+    def get_module_uptime(self, guid: str, window_seconds: int) -> Optional[Dict[str, Any]]:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            cursor.execute("SELECT status FROM modules WHERE guid = ?", (guid,))
+            if not cursor.fetchone():
+                conn.close()
+                return None
+
+            now = time.time()
+            window_start = now - window_seconds
+            bucket_size = "hour" if window_seconds <= 2 * 86400 else "day"
+            length = ROLLUP_BUCKETS[bucket_size]
+            # агрегаты берутся только по бакетам, целиком лежащим в окне
+            first_full_bucket = -int(-window_start // length) * length
+
+            cursor.execute(
+                """
+                SELECT status, SUM(seconds) AS seconds, SUM(transitions) AS transitions
+                FROM status_rollups
+                WHERE guid = ? AND bucket_size = ? AND bucket_start >= ?
+                GROUP BY status
+                """,
+                (guid, bucket_size, first_full_bucket)
+            )
+            seconds = {}
+            transitions = {}
+            for row in cursor.fetchall():
+                seconds[row['status']] = row['seconds']
+                transitions[row['status']] = row['transitions']
+
+            cursor.execute("SELECT status, since FROM status_since WHERE guid = ?", (guid,))
+            current = cursor.fetchone()
+
+            # неполный первый бакет восстанавливается по событиям от начала окна до первого полного бакета
+            clip_end = min(first_full_bucket, current['since'] if current else now)
+            if clip_end > window_start:
+                self._add_event_time(cursor, guid, window_start, clip_end, seconds, transitions)
+            conn.close()
+
+            if current:
+                open_seconds = now - max(current['since'], window_start)
+                if open_seconds > 0:
+                    seconds[current['status']] = seconds.get(current['status'], 0) + open_seconds
+
+            total = sum(seconds.values())
+            return {
+                "guid": guid,
+                "window_seconds": window_seconds,
+                "bucket_size": bucket_size,
+                "seconds": seconds,
+                "transitions": transitions,
+                "uptime": seconds.get('active', 0) / total if total else None
+            }
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при расчете времени работы модуля {guid}: {str(e)}")
+            return None
+    # время в статусах и переходы за отрезок [start, end] по журналу событий
+    def _add_event_time(self, cursor: sqlite3.Cursor, guid: str, start: float, end: float,
+                        seconds: Dict[str, float], transitions: Dict[str, int]):
+        cursor.execute(
+            "SELECT new_status FROM status_events WHERE guid = ? AND ts <= ? ORDER BY ts DESC, id DESC LIMIT 1",
+            (guid, start)
+        )
+        row = cursor.fetchone()
+        status = row['new_status'] if row else None
+        position = start
+
+        cursor.execute(
+            "SELECT old_status, new_status, ts FROM status_events WHERE guid = ? AND ts > ? AND ts <= ? ORDER BY ts, id",
+            (guid, start, end)
+        )
+        for event in cursor.fetchall():
+            if status is not None:
+                seconds[status] = seconds.get(status, 0) + event['ts'] - position
+            if event['old_status'] is not None:
+                transitions[event['new_status']] = transitions.get(event['new_status'], 0) + 1
+            status = event['new_status']
+            position = event['ts']
+
+        if status is not None:
+            seconds[status] = seconds.get(status, 0) + end - position
+    # удаление устаревших событий и агрегатов
+    def purge_status_history(self) -> bool:
+        conn = None
+        try:
+            conn, cursor = self._get_connection()
+
+            now = time.time()
+            cursor.execute(
+                "DELETE FROM status_events WHERE ts < ?",
+                (now - self.history_retention["raw_days"] * 86400,)
+            )
+            events_deleted = cursor.rowcount
+            cursor.execute(
+                "DELETE FROM status_rollups WHERE bucket_size = 'hour' AND bucket_start < ?",
+                (now - self.history_retention["hourly_days"] * 86400,)
+            )
+            cursor.execute(
+                "DELETE FROM status_rollups WHERE bucket_size = 'day' AND bucket_start < ?",
+                (now - self.history_retention["daily_days"] * 86400,)
+            )
+
+            conn.commit()
+            conn.close()
+
+            self.logger.info(f"Очистка истории статусов: удалено {events_deleted} событий")
+            return True
+        except Exception as e:
+            if conn:
+                conn.close()
+            self.logger.error(f"Ошибка при очистке истории статусов: {str(e)}")
+            return False
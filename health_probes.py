@@ -0,0 +1,157 @@
+import ssl
+import random
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_HEALTH_CHECKS_CONFIG = {
+    "enabled": True,
+    "max_concurrent": 500,
+    "jitter": 0.5,
+    "default_timeout": 2.0,
+    "failure_threshold": 3,
+    "success_threshold": 1,
+    "commands": {}
+}
+
+# проверки работоспособности модулей (http, tcp, command) на отдельном цикле asyncio
+class HealthProber:
+    def __init__(self, health_config: Optional[Dict[str, Any]] = None):
+        self.logger = logging.getLogger("ModuleManager.Health")
+
+        settings = dict(DEFAULT_HEALTH_CHECKS_CONFIG)
+        settings.update(health_config or {})
+        self.max_concurrent = int(settings["max_concurrent"])
+        self.jitter = float(settings["jitter"])
+        self.default_timeout = float(settings["default_timeout"])
+        self.failure_threshold = max(1, int(settings["failure_threshold"]))
+        self.success_threshold = max(1, int(settings["success_threshold"]))
+        # имя проверки -> argv; запись модуля ссылается только на эти имена, своя команда в ней не выполняется
+        self.commands = {}
+        for name, argv in (settings["commands"] or {}).items():
+            if not isinstance(argv, list) or not argv or not all(isinstance(arg, str) for arg in argv):
+                self.logger.error(f"Проверка {name} пропущена: команда должна быть непустым списком строк")
+                continue
+            self.commands[name] = list(argv)
+        # guid -> [здоров, подряд неудач, подряд успехов], меняется только в потоке цикла asyncio
+        self.states = {}
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="health-probes")
+        self.thread.daemon = True
+        self.thread.start()
+    # запуск проверок для всех модулей: guid -> описание проверки
+    def submit(self, checks: Dict[str, Dict[str, Any]]):
+        return asyncio.run_coroutine_threadsafe(self._run_all(checks), self.loop)
+    # максимальное время одного прохода проверок
+    def cycle_timeout(self, checks: Dict[str, Dict[str, Any]]) -> float:
+        timeouts = [float(check.get("timeout", self.default_timeout)) for check in checks.values()]
+        waves = -(-len(checks) // self.max_concurrent) if checks else 0
+        return (max(timeouts, default=0) + self.jitter) * max(waves, 1) + 1
+    # все проверки одновременно, не больше max_concurrent сразу
+    async def _run_all(self, checks: Dict[str, Dict[str, Any]]) -> Dict[str, Tuple[bool, str]]:
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def run_one(guid, check):
+            if self.jitter > 0:
+                await asyncio.sleep(random.uniform(0, self.jitter))
+            async with semaphore:
+                return guid, await self.probe(check)
+
+        results = await asyncio.gather(*(run_one(guid, check) for guid, check in checks.items()))
+        return self._apply_thresholds(dict(results))
+    # гистерезис: состояние меняется только после failure_threshold неудач или success_threshold успехов подряд
+    def _apply_thresholds(self, results: Dict[str, Tuple[bool, str]]) -> Dict[str, Tuple[bool, str]]:
+        for guid in list(self.states):
+            if guid not in results:
+                del self.states[guid]
+
+        stable = {}
+        for guid, (healthy, detail) in results.items():
+            state = self.states.setdefault(guid, [True, 0, 0])
+            if healthy:
+                state[1] = 0
+                state[2] += 1
+                if state[2] >= self.success_threshold:
+                    state[0] = True
+            else:
+                state[1] += 1
+                state[2] = 0
+                if state[1] >= self.failure_threshold:
+                    state[0] = False
+            stable[guid] = (state[0], detail)
+        return stable
+    # одна проверка с таймаутом: (успех, описание)
+    async def probe(self, check: Dict[str, Any]) -> Tuple[bool, str]:
+        check_type = check.get("type")
+        timeout = float(check.get("timeout", self.default_timeout))
+
+        try:
+            if check_type == "http":
+                return await asyncio.wait_for(self._probe_http(check), timeout)
+            if check_type == "tcp":
+                return await asyncio.wait_for(self._probe_tcp(check), timeout)
+            if check_type == "command":
+                return await self._probe_command(check, timeout)
+            return False, f"неизвестный тип проверки {check_type}"
+        except asyncio.TimeoutError:
+            return False, f"таймаут {timeout} с"
+        except Exception as e:
+            return False, str(e)
+    # HTTP GET, успех при ожидаемом коде ответа
+    async def _probe_http(self, check: Dict[str, Any]) -> Tuple[bool, str]:
+        url = urlsplit(check["url"])
+        secure = url.scheme == "https"
+        port = url.port or (443 if secure else 80)
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+
+        reader, writer = await asyncio.open_connection(
+            url.hostname, port, ssl=ssl.create_default_context() if secure else None
+        )
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {url.hostname}\r\nConnection: close\r\n\r\n".encode("ascii")
+            )
+            await writer.drain()
+            status_line = (await reader.readline()).decode("latin-1").split()
+        finally:
+            writer.close()
+
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            return False, "некорректный ответ HTTP"
+
+        status_code = int(status_line[1])
+        expected = check.get("expect_status", 200)
+        if status_code == expected:
+            return True, f"HTTP {status_code}"
+        return False, f"HTTP {status_code}, ожидался {expected}"
+    # подключение по TCP
+    async def _probe_tcp(self, check: Dict[str, Any]) -> Tuple[bool, str]:
+        _, writer = await asyncio.open_connection(check.get("host", "127.0.0.1"), int(check["port"]))
+        writer.close()
+        return True, "TCP подключение установлено"
+    # команда из health_checks.commands по имени, без shell; успех при коде возврата 0
+    async def _probe_command(self, check: Dict[str, Any], timeout: float) -> Tuple[bool, str]:
+        name = check.get("check")
+        argv = self.commands.get(name) if isinstance(name, str) else None
+        if argv is None:
+            return False, f"проверка {name} не задана в health_checks.commands"
+
+        process = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+
+        try:
+            returncode = await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+
+        if returncode == 0:
+            return True, "код возврата 0"
+        return False, f"код возврата {returncode}"
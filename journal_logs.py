@@ -0,0 +1,370 @@
+import os
+import re
+import json
+import math
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+DEFAULT_LOGS_CONFIG = {
+    "source": "journalctl",
+    "directory": "journal",
+    "tail_lines": 200,
+    "idle_ttl": 10,
+    "max_limit": 5000,
+    "queue_size": 1000
+}
+
+PRIORITY_NAMES = {
+    "emerg": 0, "alert": 1, "crit": 2, "err": 3,
+    "warning": 4, "notice": 5, "info": 6, "debug": 7
+}
+
+# журнал недоступен: нет journalctl, нет прав на чтение, неверный курсор
+class JournalError(Exception):
+    pass
+
+# имя systemd юнита модуля, так же как его создает ModuleManager
+def unit_for_module(module_name: str) -> str:
+    safe_name = "".join(char if char.isalnum() or char == "_" else "_" for char in module_name)
+    return f"{safe_name}.service"
+
+# уровень важности из числа или имени (err, warning...), None если не распознан
+def parse_priority(value: Optional[str]) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if value.isdigit() and 0 <= int(value) <= 7:
+        return int(value)
+    return PRIORITY_NAMES.get(value.lower())
+
+# запись журнала в формате journalctl -o json -> cursor, ts, priority, message, pid
+def normalize_entry(raw: Dict[str, Any]) -> Dict[str, Any]:
+    message = raw.get("MESSAGE", "")
+    if isinstance(message, list):
+        message = bytes(message).decode("utf-8", errors="replace")
+
+    return {
+        "cursor": raw.get("__CURSOR"),
+        "ts": int(raw.get("__REALTIME_TIMESTAMP", 0)) / 1e6,
+        "priority": int(raw.get("PRIORITY", 6)),
+        "message": message,
+        "pid": raw.get("_PID")
+    }
+
+# проверка записи по фильтрам важности, времени и регулярному выражению по тексту (без учета регистра)
+def make_filter(priority: Optional[int], since: Optional[float], until: Optional[float],
+                grep: Optional[str] = None) -> Callable[[Dict[str, Any]], bool]:
+    pattern = re.compile(grep, re.IGNORECASE) if grep else None
+
+    def matches(entry: Dict[str, Any]) -> bool:
+        if priority is not None and entry["priority"] > priority:
+            return False
+        if pattern is not None and not pattern.search(entry["message"]):
+            return False
+        if since is not None and entry["ts"] < since:
+            return False
+        if until is not None and entry["ts"] > until:
+            return False
+        return True
+    return matches
+
+# журнал через journalctl -o json
+class JournalctlSource:
+    async def entries(self, unit: str, after_cursor: Optional[str] = None, since: Optional[float] = None,
+                      until: Optional[float] = None, priority: Optional[int] = None,
+                      lines: Optional[int] = None, follow: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        command = ["journalctl", "-u", unit, "-o", "json", "--no-pager"]
+        if after_cursor:
+            command += ["--after-cursor", after_cursor]
+        if since is not None:
+            command += ["--since", f"@{math.floor(since)}"]
+        if until is not None:
+            command += ["--until", f"@{math.ceil(until)}"]
+        if priority is not None:
+            command += ["-p", str(priority)]
+        if lines is not None:
+            command += ["-n", str(lines)]
+        if follow:
+            command.append("-f")
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            raise JournalError(f"не удалось запустить journalctl: {str(e)}")
+
+        try:
+            async for line in process.stdout:
+                if line.strip():
+                    yield normalize_entry(json.loads(line))
+
+            returncode = await process.wait()
+            if returncode != 0:
+                error = (await process.stderr.read()).decode("utf-8", errors="replace").strip()
+                raise JournalError(f"journalctl завершился с кодом {returncode}: {error}")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+# журнал из файлов <directory>/<unit>.jsonl в формате journalctl -o json, для разработки и проверок
+class FileJournalSource:
+    def __init__(self, directory: str, poll_interval: float = 0.2):
+        self.directory = directory
+        self.poll_interval = poll_interval
+    # записи файла начиная с позиции offset: (записи, новая позиция)
+    def _read_from(self, path: str, offset: int, line_number: int):
+        entries = []
+        if not os.path.exists(path):
+            return entries, offset, line_number
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                line_number += 1
+                if not line.strip():
+                    continue
+                raw = json.loads(line)
+                raw.setdefault("__CURSOR", f"line={line_number}")
+                entries.append(normalize_entry(raw))
+        return entries, offset, line_number
+
+    async def entries(self, unit: str, after_cursor: Optional[str] = None, since: Optional[float] = None,
+                      until: Optional[float] = None, priority: Optional[int] = None,
+                      lines: Optional[int] = None, follow: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        path = os.path.join(self.directory, f"{unit}.jsonl")
+        matches = make_filter(priority, since, until)
+
+        entries, offset, line_number = self._read_from(path, 0, 0)
+        if after_cursor:
+            cursors = [entry["cursor"] for entry in entries]
+            if after_cursor in cursors:
+                entries = entries[cursors.index(after_cursor) + 1:]
+        entries = [entry for entry in entries if matches(entry)]
+        if lines is not None:
+            entries = entries[-lines:] if lines > 0 else []
+
+        for entry in entries:
+            yield entry
+
+        while follow:
+            await asyncio.sleep(self.poll_interval)
+            entries, offset, line_number = self._read_from(path, offset, line_number)
+            for entry in entries:
+                if matches(entry):
+                    yield entry
+
+# общий хвост журнала юнита: один читатель на всех зрителей, живет idle_ttl секунд после последнего
+class JournalTail:
+    def __init__(self, source, unit: str, tail_lines: int, idle_ttl: float, queue_size: int,
+                 on_closed: Callable[["JournalTail"], None]):
+        self.logger = logging.getLogger("SystemAPI.Logs")
+        self.source = source
+        self.unit = unit
+        self.idle_ttl = idle_ttl
+        self.queue_size = queue_size
+        self.on_closed = on_closed
+
+        self.buffer = deque(maxlen=tail_lines)
+        self.subscribers = set()
+        self.closed = False
+        self.error: Optional[str] = None
+        self.ready = asyncio.Event()
+        self.close_handle = None
+        self.task = asyncio.create_task(self._run(tail_lines))
+        self.touch()
+    # последние записи, затем новые по мере появления
+    async def _run(self, tail_lines: int):
+        entries = None
+        try:
+            entries = self.source.entries(self.unit, lines=tail_lines)
+            async for entry in entries:
+                self.buffer.append(entry)
+            self.ready.set()
+
+            last_cursor = self.buffer[-1]["cursor"] if self.buffer else None
+            entries = self.source.entries(self.unit, after_cursor=last_cursor, lines=None if last_cursor else 0, follow=True)
+            async for entry in entries:
+                self.buffer.append(entry)
+                for queue in self.subscribers:
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # ошибку получат текущие и новые зрители, хвост закрывается и при следующем запросе создается заново
+            self.error = str(e)
+            self.logger.error(f"Ошибка при чтении журнала {self.unit}: {str(e)}")
+        finally:
+            if entries is not None:
+                await entries.aclose()
+            self.ready.set()
+            self.close()
+    # подписка на новые записи
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        if self.close_handle:
+            self.close_handle.cancel()
+            self.close_handle = None
+        return queue
+    # отписка, без зрителей хвост закроется через idle_ttl секунд
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        self.touch()
+    # продление жизни хвоста без подписчиков
+    def touch(self):
+        if self.subscribers:
+            return
+        if self.close_handle:
+            self.close_handle.cancel()
+        self.close_handle = asyncio.get_running_loop().call_later(self.idle_ttl, self.close)
+    # записи после курсора, None если курсора уже нет в буфере
+    def after_cursor(self, cursor: str) -> Optional[List[Dict[str, Any]]]:
+        entries = list(self.buffer)
+        for position, entry in enumerate(entries):
+            if entry["cursor"] == cursor:
+                return entries[position + 1:]
+        return None
+    # остановка читателя
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.close_handle:
+            self.close_handle.cancel()
+            self.close_handle = None
+        if not self.task.done() and self.task is not asyncio.current_task():
+            self.task.cancel()
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self.on_closed(self)
+
+# чтение журналов модулей: история по курсору и фильтрам, режим follow через общий хвост
+class LogStreamer:
+    def __init__(self, logs_config: Optional[Dict[str, Any]] = None, source=None):
+        settings = dict(DEFAULT_LOGS_CONFIG)
+        settings.update(logs_config or {})
+        self.tail_lines = int(settings["tail_lines"])
+        self.idle_ttl = float(settings["idle_ttl"])
+        self.max_limit = int(settings["max_limit"])
+        self.queue_size = int(settings["queue_size"])
+
+        if source is not None:
+            self.source = source
+        elif settings["source"] == "file":
+            self.source = FileJournalSource(settings["directory"])
+        else:
+            self.source = JournalctlSource()
+
+        self.tails: Dict[str, JournalTail] = {}
+    # хвост юнита, читатель запускается при первом обращении
+    def _tail(self, unit: str) -> JournalTail:
+        tail = self.tails.get(unit)
+        if tail is None:
+            tail = JournalTail(self.source, unit, self.tail_lines, self.idle_ttl, self.queue_size, self._tail_closed)
+            self.tails[unit] = tail
+        return tail
+
+    def _tail_closed(self, tail: JournalTail):
+        if self.tails.get(tail.unit) is tail:
+            del self.tails[tail.unit]
+    # записи журнала юнита: сначала история (не больше limit), затем при follow новые записи
+    async def stream(self, unit: str, cursor: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None, priority: Optional[int] = None,
+                     follow: bool = False, limit: Optional[int] = None, grep: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        entries = await self.open(unit, cursor, since, until, priority, follow, limit, grep)
+        async for entry in entries:
+            yield entry
+    # чтение истории до начала ответа, чтобы ошибка источника (JournalError) вернулась кодом ответа;
+    # при follow с курсором история не обрезается по limit, иначе записи между историей и новыми пропали бы
+    async def open(self, unit: str, cursor: Optional[str] = None, since: Optional[float] = None,
+                   until: Optional[float] = None, priority: Optional[int] = None,
+                   follow: bool = False, limit: Optional[int] = None, grep: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        limit = min(limit or self.tail_lines, self.max_limit)
+        history_limit = self.max_limit if follow and cursor else limit
+        matches = make_filter(priority, since, until, grep)
+        # последние записи без фильтров берутся из общего хвоста, остальное читается из журнала
+        plain_tail = not (cursor or since is not None or until is not None or priority is not None or grep) and limit <= self.tail_lines
+
+        tail = self._tail(unit) if follow or plain_tail or cursor else None
+        history = None
+        position = None
+        if tail:
+            await tail.ready.wait()
+            if tail.error:
+                raise JournalError(tail.error)
+            if cursor:
+                history = tail.after_cursor(cursor)
+            elif plain_tail:
+                history = list(tail.buffer)
+            if history is not None:
+                history = [entry for entry in history if matches(entry)]
+                history = history[:history_limit] if cursor else history[-limit:]
+            # позиция хвоста: записи после нее зритель follow получит из буфера при подписке
+            position = tail.buffer[-1]["cursor"] if tail.buffer else None
+            tail.touch()
+
+        truncated = False
+        if history is None:
+            history = []
+            if cursor or since is not None:
+                entries = self.source.entries(unit, after_cursor=cursor, since=since, until=until, priority=priority)
+            else:
+                entries = self.source.entries(unit, until=until, priority=priority, lines=limit)
+            try:
+                async for entry in entries:
+                    if not matches(entry):
+                        continue
+                    if len(history) >= history_limit:
+                        truncated = True
+                        break
+                    history.append(entry)
+            finally:
+                await entries.aclose()
+
+        return self._follow(history, truncated and follow, tail if follow else None, position, matches)
+    # выдача истории и новых записей; если история не поместилась в max_limit, зритель получает курсор для дочитывания
+    async def _follow(self, history: List[Dict[str, Any]], truncated: bool, tail: Optional[JournalTail],
+                      position: Optional[str], matches: Callable[[Dict[str, Any]], bool]) -> AsyncIterator[Dict[str, Any]]:
+        seen = set()
+        for entry in history:
+            seen.add(entry["cursor"])
+            yield entry
+
+        if truncated:
+            yield {"truncated": True, "next_cursor": history[-1]["cursor"] if history else None}
+
+        if tail is None:
+            return
+
+        queue = tail.subscribe()
+        try:
+            # записи, пришедшие в хвост пока отдавалась история
+            missed = tail.after_cursor(position) if position else None
+            for entry in missed if missed is not None else list(tail.buffer):
+                if entry["cursor"] not in seen and matches(entry):
+                    seen.add(entry["cursor"])
+                    yield entry
+
+            while not tail.closed or not queue.empty():
+                entry = await queue.get()
+                if entry is None:
+                    break
+                if entry["cursor"] in seen or not matches(entry):
+                    continue
+                yield entry
+
+            if tail.error:
+                raise JournalError(tail.error)
+        finally:
+            tail.unsubscribe(queue)
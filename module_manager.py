@@ -1,835 +1,1728 @@
-import json
-import os
-import sys
-import time
-import logging
-import requests
-import smtplib
-import subprocess
-import threading
-import traceback
-import socket
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.header import Header
-import paho.mqtt.client as mqtt
-from datetime import datetime
-import chardet
-
-class ModuleManager:
-    def __init__(self, config_path):
-        self.setup_logging()
-        
-        self.config = self.load_config(config_path)
-        self.logger.info("Загрузка конфига прошла успешно")
-        
-        self.setup_mqtt()
-
-        self.modules = []
-        self.module_services = {}
-        self.is_running = True
-        self.previous_statuses = {}
-
-        self.update_modules_list()
-        self.load_existing_services()
-    # логирование
-    def setup_logging(self):
-        self.logger = logging.getLogger("ModuleManager")
-        self.logger.setLevel(logging.DEBUG)
-
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        file_handler = logging.FileHandler("module_manager.log")
-        file_handler.setLevel(logging.DEBUG)
-
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(formatter)
-        file_handler.setFormatter(formatter)
-
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
-    # чтение конфига
-    def load_config(self, config_path):
-        try:
-            with open(config_path, 'r') as config_file:
-                config = json.load(config_file)
-                return config
-        except Exception as e:
-            self.logger.error(f"Ошибка загрузки файла конфига: {str(e)}")
-            sys.exit(1)
-    # подключение к MQTT
-    def setup_mqtt(self):
-        try:
-            mqtt_config = self.config.get("mqtt")
-            
-            broker = mqtt_config.get("broker")
-            port = int(mqtt_config.get("port"))
-            
-            client_id = f"module_manager_{int(time.time())}"
-            self.mqtt_client = mqtt.Client(client_id=client_id)
-
-            if mqtt_config.get("username") and mqtt_config.get("password"):
-                self.mqtt_client.username_pw_set(
-                    mqtt_config.get("username"),
-                    mqtt_config.get("password")
-                )
-
-            self.mqtt_topic_prefix = mqtt_config.get("topic_prefix")
-
-            self.mqtt_client.on_connect = self.on_mqtt_connect
-            self.mqtt_client.on_message = self.on_mqtt_message
-            self.mqtt_client.on_disconnect = self.on_mqtt_disconnect
-            
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(1)
-                s.connect((broker, port))
-                s.close()
-                self.logger.info(f"Подключение к MQTT брокеру прошло успешно")
-            except Exception as e:
-                self.logger.warning(f"Ошибка при подключении к MQTT брокеру: {str(e)}")
-            
-            self.mqtt_client.connect(broker, port, 60)
-            self.mqtt_client.loop_start()
-            
-        except Exception as e:
-            self.logger.error(f"Ошибка при подключении к MQTT брокеру: {str(e)}")
-            self.logger.error(traceback.format_exc())
-            sys.exit(1)
-    # после подключения подписка на команды
-    def on_mqtt_connect(self, client, userdata, flags, rc):
-        if rc == 0:
-            command_topics = [
-                f"{self.mqtt_topic_prefix}/command/create_new_systemctl_service",
-                f"{self.mqtt_topic_prefix}/command/remove_service",
-                f"{self.mqtt_topic_prefix}/command/restart_configs", 
-                f"{self.mqtt_topic_prefix}/command/run_command_for_systemd_service",
-                f"{self.mqtt_topic_prefix}/command/update_modules_list"
-            ]
-            
-            for topic in command_topics:
-                result, mid = self.mqtt_client.subscribe(topic)
-                self.logger.info(f"Подписка на команды {topic}: result = {result}, mid = {mid}")
-
-            self.logger.info(f"Публикация сообщений - {self.mqtt_topic_prefix}/status")
-        else:
-            self.logger.error(f"Ошибка при подключении к MQTT брокеру: {rc}")
-            self.logger.error(traceback.format_exc())
-    # чтение сообщения
-    def on_mqtt_message(self, client, userdata, msg):
-        try:
-            payload = json.loads(msg.payload.decode('utf-8'))
-
-            topic_parts = msg.topic.split('/')
-            if len(topic_parts) >= 3 and topic_parts[-2] == "command":
-                command = topic_parts[-1]
-                self.logger.info(f"Выполнение команды: {command} с данными: {payload}")
-
-                if command == "create_new_systemctl_service":
-                    self.create_service(payload)
-                elif command == "remove_service":
-                    self.delete_service(payload)
-                elif command == "restart_configs":
-                    self.restart_all_services()
-                elif command == "run_command_for_systemd_service":
-                    self.run_command_for_service(payload)
-                elif command == "update_modules_list":
-                    self.update_modules_list()
-                else:
-                    self.logger.warning(f"Неизвестная команда: {msg.topic}")
-            else:
-                self.logger.warning(f"Ошибка при обработке команды: {msg.topic}")
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Ошибка при обработке данных: {str(e)}")
-        except Exception as e:
-            self.logger.error(f"Ошибка при обработке сообщения: {str(e)}")
-            self.logger.error(traceback.format_exc())
-    # отключение от MQTT
-    def on_mqtt_disconnect(self, client, userdata, rc):
-        if rc != 0:
-            self.logger.warning("Внеплановое отключение")
-        else:
-            self.logger.info("Отключение MQTT брокера")
-    # загрузка существующих серисных файлов для модулей
-    def load_existing_services(self):
-        try:
-            if not self.modules:
-                self.logger.warning("Список модулей пуст, невозможно загрузить сервисы")
-                return
-            
-            systemd_path = "/etc/systemd/system"
-            service_files = []
-            
-            try:
-                result = subprocess.run(
-                    ["find", systemd_path, "-name", "*.service", "-type", "f"],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                service_files = [line.strip() for line in result.stdout.splitlines() if line.strip()]
-            except Exception as e:
-                self.logger.error(f"Ошибка при сканировании директории {systemd_path}: {str(e)}")
-                self.logger.error(traceback.format_exc())
-            
-            found_services = {}
-            
-            for module in self.modules:
-                module_guid = module.get("guid")
-                module_name = module.get("name")
-                
-                if not module_guid or not module_name:
-                    continue
-
-                service_name = self._create_safe_filename(module_name)
-                systemd_service_name = f"{service_name}.service"
-                service_path = os.path.join(systemd_path, systemd_service_name)
-
-                if service_path in service_files:
-                    try:
-                        with open(service_path, 'r') as f:
-                            service_content = f.read()
-
-                        module_path = None
-                        startup_script = None
-                        
-                        for line in service_content.splitlines():
-                            if line.strip().startswith("WorkingDirectory="):
-                                module_path = line.strip().split("=", 1)[1]
-                            elif line.strip().startswith("ExecStart="):
-                                exec_start = line.strip().split("=", 1)[1]
-                                parts = exec_start.split()
-                                if len(parts) >= 2:
-                                    startup_script = parts[-1]
-                        
-                        if module_path and startup_script:
-                            service_info = {
-                                "guid": module_guid,
-                                "name": module_name,
-                                "module_path": module_path,
-                                "startup_script": startup_script,
-                                "systemd_service": systemd_service_name,
-                                "status": "unknown"
-                            }
-                            
-                            self.module_services[module_guid] = service_info
-                            found_services[module_guid] = service_name
-                        else:
-                            self.logger.warning(f"Не удалось извлечь информацию о пути из сервиса {systemd_service_name}")
-                    
-                    except Exception as e:
-                        self.logger.error(f"Ошибка при анализе файла сервиса {service_path}: {str(e)}")
-                        self.logger.error(traceback.format_exc())
-            
-            if found_services:
-                self.logger.info(f"Загружено {len(found_services)} существующих сервисов: {', '.join(found_services.values())}")
-            else:
-                self.logger.info("Не найдено существующих сервисов для модулей")
-            
-        except Exception as e:
-            self.logger.error(f"Ошибка при загрузке существующих сервисов: {str(e)}")
-            self.logger.error(traceback.format_exc())
-    # выбор команды (запуск\остановка\перезапуск) в зависимости от отправки
-    def run_command_for_service(self, data):
-        try:
-            module_guid = data.get("config_id")
-            action = data.get("action")
-            
-            if not module_guid:
-                self.logger.error("Нет параметра GUID модуля")
-                return
-            
-            if not action:
-                self.logger.error("Нет параметра action для модуля")
-                return
-            
-            module = self.get_module_by_guid(module_guid)
-            if not module:
-                self.logger.error(f"Модуль GUID {module_guid} не найден")
-                return
-
-            module_name = module.get("name")
-            
-            if action == "start":
-                self.logger.info(f"Запуск сервиса для модуля {module_name} (GUID: {module_guid})")
-                self.start_service({"config_id": module_guid, "name": module_name})
-            elif action == "stop":
-                self.logger.info(f"Остановка сервиса для модуля {module_name} (GUID: {module_guid})")
-                self.stop_service({"config_id": module_guid, "name": module_name})
-            elif action == "restart":
-                self.logger.info(f"Перезапуск сервиса для модуля {module_name} (GUID: {module_guid})")
-                self.restart_service({"config_id": module_guid, "name": module_name})
-            else:
-                self.logger.error(f"Неизвестная команда: {action}")
-        except Exception as e:
-            self.logger.error(f"Ошибка при выполнении команды: {str(e)}")
-            self.logger.error(traceback.format_exc())
-    # получить модуль по ID
-    def get_module_by_guid(self, guid):
-        for module in self.modules:
-            if module.get("guid") == guid:
-                return module
-        return None
-    # перезапуск всех сервисов ПМ
-    def restart_all_services(self):
-        self.logger.info("Перезапуск сервисов")
-        
-        for module in self.modules:
-            try:
-                guid = module.get("guid")
-                name = module.get("name")
-                
-                if guid and name:
-                    self.restart_service({"config_id": guid, "name": name})
-            except Exception as e:
-                self.logger.error(f"Ошибка при перезапуске модуля {module.get('name')}: {str(e)}")
-        
-        self.logger.info("Все сервисы перезапущены")
-    # обновление списка модулей
-    def update_modules_list(self):
-        try:
-            base_url = self.config["systemapi"]["base_url"]
-            
-            response = requests.get(f"{base_url}/api/modules")
-            
-            if response.status_code == 200:
-                self.modules = response.json()
-
-                for module in self.modules:
-                    self.logger.debug(f"Модуль: {module.get('name')} (GUID: {module.get('guid')}, Status: {module.get('status')})")
-
-            else:
-                self.logger.error(f"Ошибка при получении модулей: {response.status_code}, Response: {response.text}")
-        except Exception as e:
-            self.logger.error(f"Ошибкуа при обработки модулей: {str(e)}")
-    # создать скрипт заглушкку и .service файл и выдать права доступа, после получения команды для создания
-    def create_service(self, data):
-        try:
-            module_guid = data.get("config_id")
-            
-            if not module_guid:
-                self.logger.error("Нет GUID модуля")
-                return
-            
-            module = self.get_module_by_guid(module_guid)
-            
-            if not module:
-                self.logger.error(f"Модуль {module_guid} не найден")
-
-                return
-            
-            module_name = module.get("name")
-            
-            service_type = module.get('service_type', 'dummy_service')
-            
-            base_modules_path = os.path.expanduser("~/modules")
-            module_path = os.path.join(base_modules_path, service_type)
-            startup_script = os.path.join(module_path, "main.py")
-            
-            if not os.path.exists(module_path):
-                try:
-                    os.makedirs(module_path, exist_ok=True)
-                except Exception as e:
-                    self.logger.error(f"Ошибка при создании директории: {str(e)}")
-
-                    return
-            
-            if not os.path.exists(startup_script):
-                try:
-                    with open(startup_script, 'w') as f:
-                        f.write('''
-import time
-while True:
-    time.sleep(60)
-                                ''')
-                    os.chmod(startup_script, 0o755)
-                    self.logger.info(f"Создан скрипт заглушка {startup_script}")
-                except Exception as e:
-                    self.logger.warning(f"Скрипт не был создан: {str(e)}")
-            
-            service_name = self._create_safe_filename(module_name)
-            systemd_service_name = f"{service_name}.service"
-            
-            service_file_content = self._create_systemd_service_file(
-                service_name, module_name, module_path, startup_script
-            )
-            
-            systemd_path = "/etc/systemd/system"
-            service_file_path = os.path.join(systemd_path, systemd_service_name)
-            
-            try:
-                tmp_file_path = f"/tmp/{systemd_service_name}"
-                with open(tmp_file_path, 'w') as f:
-                    f.write(service_file_content)
-
-                subprocess.run(
-                    ["sudo", "mv", tmp_file_path, service_file_path],
-                    check=True,
-                    capture_output=True
-                )
-
-                subprocess.run(
-                    ["sudo", "chmod", "644", service_file_path],
-                    check=True,
-                    capture_output=True
-                )
-                
-                subprocess.run(
-                    ["sudo", "systemctl", "daemon-reload"],
-                    check=True,
-                    capture_output=True
-                )
-
-                subprocess.run(
-                    ["sudo", "systemctl", "disable", tmp_file_path],
-                    check=True,
-                    capture_output=True
-                )
-
-                service_info = {
-                    "guid": module_guid,
-                    "name": module_name,
-                    "module_path": module_path,
-                    "startup_script": startup_script,
-                    "systemd_service": systemd_service_name,
-                    "status": "unknow"
-                }
-                
-                self.module_services[module_guid] = service_info
-                
-                self.logger.info(f"Создан сервис {systemd_service_name} для модуля {module_name}")
-                
-                self._update_module_status(module_guid, "inactive")
-
-            except Exception as e:
-                self.logger.error(f"Ошибка при создании модуля: {str(e)}")
-                self.logger.error(traceback.format_exc())
-
-        except Exception as e:
-            self.logger.error(f"FОшибка при создании модуля: {str(e)}")
-            self.logger.error(traceback.format_exc())
-
-    # создание .service файла со своими параметрами
-    def _create_systemd_service_file(self, service_name, module_name, module_path, startup_script):
-        venv_path = os.path.expanduser("~/venv")
-        python_path = os.path.join(venv_path, "bin", "python") if os.path.exists(venv_path) else "/usr/bin/python3"
-        
-        service_content = f"""[Unit]
-Description=Module Service for {module_name}
-After=network.target
-
-[Service]
-Type=simple
-User={os.getenv('USER')}
-WorkingDirectory={module_path}
-ExecStart={python_path} {startup_script}
-Restart=no
-StandardOutput=journal
-StandardError=journal
-SyslogIdentifier={service_name}
-Environment="PATH={venv_path}/bin:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin"
-Environment="PYTHONUNBUFFERED=1"
-
-[Install]
-WantedBy=multi-user.target
-"""
-        return service_content
-    # удалить .service файл
-    def delete_service(self, data):
-        try:
-            module_guid = data.get("config_id")
-            
-            if not module_guid:
-                self.logger.error("Нет GUID модуля")
-                return
-            
-            module = self.get_module_by_guid(module_guid)
-            
-            if not module:
-                self.logger.error(f"Модуль {module_guid} не найден")
-
-                return
-            
-            module_name = module.get("name")
-            
-            self.stop_service({"config_id": module_guid, "name": module_name})
-
-            service_info = self.module_services[module_guid]
-            systemd_service = service_info.get("systemd_service")
-            
-            if not systemd_service:
-                self.logger.warning(f"Сервиса для модуля {module_name} не найдено")
-                
-                del self.module_services[module_guid]
-
-                return
-            
-            systemd_service_path = os.path.join("/etc/systemd/system", systemd_service)
-            
-            try:
-                if os.path.exists(systemd_service_path):
-                    subprocess.run(["sudo", "systemctl", "disable", systemd_service], 
-                                    check=True)
-                    
-                    subprocess.run(["sudo", "rm", systemd_service_path], 
-                                   check=True)
-                    
-                    subprocess.run(["sudo", "systemctl", "daemon-reload"], 
-                                   check=True)
-                
-                del self.module_services[module_guid]
-                
-                self.logger.info(f"Сервис удален {systemd_service} для модуля {module_name}")
-
-                self._update_module_status(module_guid, "inactive")
-
-            except Exception as e:
-                self.logger.error(f"Ошибка при удаленеии сервиса: {str(e)}")
-                self.logger.error(traceback.format_exc())
-
-        except Exception as e:
-            self.logger.error(f"Ошибка удаления сервиса {str(e)}")
-            self.logger.error(traceback.format_exc())
-
-    # запустить .service файл
-    def start_service(self, payload):
-        try:
-            module_guid = payload.get("config_id")
-            module_name = payload.get("name")
-            
-            if module_guid not in self.module_services:
-                self.logger.error(f"Нет сервиса для запуска модуля {module_name}")
-                return
-
-            service_info = self.module_services[module_guid]
-            systemd_service = service_info.get("systemd_service")
-            
-            try:
-                result = subprocess.run(
-                    ["systemctl", "is-active", systemd_service],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                if result.stdout.strip() == "active":
-                    self.logger.info(f"Сервис {systemd_service} уже запущен")
-                    
-                    service_info["status"] = "running"
-                    
-                    self._update_module_status(module_guid, "active")
-                    
-                    return
-            except Exception as e:
-                self.logger.warning(f"Ошибка при проверки статуса: {str(e)}")
-
-            try:
-                subprocess.run(["sudo", "systemctl", "start", systemd_service], 
-                               check=True)
-
-                service_info["status"] = "running"
-                
-                self.logger.info(f"Сервис {systemd_service} запущен для модуля {module_name}")
-
-                self._update_module_status(module_guid, "active")
-
-            except Exception as e:
-                self.logger.error(f"Ошибка при запуске сервиса {str(e)}")
-        except Exception as e:
-            self.logger.error(f"Ошибка при запуске сервиса: {str(e)}")
-    # остановить .service файл
-    def stop_service(self, payload):
-        try:
-            module_guid = payload.get("config_id")
-            module_name = payload.get("name")
-            
-            if not module_guid or not module_name:
-                self.logger.error("Нет GUID модуля")
-                return
-            
-            if module_guid not in self.module_services:
-                self.logger.error(f"Нет сервиса для модуля {module_name}")
-
-                return
-            
-            service_info = self.module_services[module_guid]
-            systemd_service = service_info.get("systemd_service")
-
-            try:
-                result = subprocess.run(
-                    ["systemctl", "is-active", systemd_service],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                if result.stdout.strip() != "active":
-                    self.logger.info(f"Сервис {systemd_service} не запущен")
-                    
-                    service_info["status"] = "stopped"
-                    
-                    self._update_module_status(module_guid, "inactive")
-
-                    return
-            except Exception as e:
-                self.logger.warning(f"Ошибка при получении статуса сервиса: {str(e)}")
-            
-            try:
-                subprocess.run(["sudo", "systemctl", "stop", systemd_service], 
-                               check=True)
-                
-                service_info["status"] = "stopped"
-                
-                self.logger.info(f"Сервис остановлен {systemd_service} для модуля {module_name}")
-                
-                self._update_module_status(module_guid, "inactive")
-
-            except Exception as e:
-                error_msg = f"Ошибка при остановки сервиса: {str(e)}"
-                self.logger.error(error_msg)
-                self.logger.error(traceback.format_exc())
-
-        except Exception as e:
-            self.logger.error(f"Ошибка остановки сервиса: {str(e)}")
-            self.logger.error(traceback.format_exc())
-
-    # перезапуск всех .service файлов
-    def restart_service(self, payload):
-        try:
-            module_guid = payload.get("config_id")
-            module_name = payload.get("name")
-            
-            if not module_guid or not module_name:
-                self.logger.error("Нет GUID модуля")
-                return
-            
-            if module_guid not in self.module_services:
-                self.logger.error(f"Нет сервиса для модуля {module_name}")
-
-                return
-            
-            service_info = self.module_services[module_guid]
-            systemd_service = service_info.get("systemd_service")
-            
-            try:
-                subprocess.run(["sudo", "systemctl", "restart", systemd_service], 
-                               check=True)
-                
-                service_info["status"] = "running"
-                
-                self.logger.info(f"Перезапущен сервис {systemd_service} для модуля {module_name}")
-                
-                self._update_module_status(module_guid, "active")
-
-            except Exception as e:
-                error_msg = f"Ошибка при перезапуске сервиса: {str(e)}"
-                self.logger.error(error_msg)
-                self.logger.error(traceback.format_exc())
-                
-                service_info["status"] = "failed"
-                
-                self._update_module_status(module_guid, "failed")
-                
-                if self.config.get("alerts", {}).get("send_alert_after_service_failed"):
-                    self.send_alert_email(module_name, systemd_service)
-
-        except Exception as e:
-            self.logger.error(f"Ошибка перезапуска сервиса: {str(e)}")
-            self.logger.error(traceback.format_exc())
-
-    # создание безапасного имени файла для .service
-    def _create_safe_filename(self, name):
-        safe_name = ""
-        for char in name:
-            if char.isalnum() or char == '_':
-                safe_name += char
-            else:
-                safe_name += '_'
-        return safe_name
-    # обновление статуса ПМ
-    def _update_module_status(self, module_guid, status):
-        try:
-            base_url = self.config["systemapi"]["base_url"]
-            
-            response = requests.put(
-                f"{base_url}/api/modules/{module_guid}/status",
-                json={"status": status}
-            )
-            
-            if response.status_code == 200:
-                self.logger.info(f"Обновленый статус {module_guid} - {status}")
-
-                for module in self.modules:
-                    if module.get("guid") == module_guid:
-                        module["status"] = status
-                        break
-            else:
-                self.logger.error(f"Ошибка при обновлении статуса: {response.status_code}, Response: {response.text}")
-        except Exception as e:
-            self.logger.error(f"Ошибка при обновлении статуса: {str(e)}")
-            self.logger.error(traceback.format_exc())
-    # мониторинг и логирование статусов ПМ
-    def monitor_services(self):
-        while self.is_running:
-            try:
-                all_statuses = {}
-                status_changes = {}
-                
-                for module in self.modules:
-                    module_guid = module.get("guid")
-                    module_name = module.get("name")
-
-                    if not module_guid or not module_name:
-                        continue
-                    
-                    service_status = "inactive"
-                    
-                    if module_guid in self.module_services:
-                        service_info = self.module_services[module_guid]
-                        systemd_service = service_info.get("systemd_service")
-                        
-                        if systemd_service:
-                            try:
-                                result = subprocess.run(
-                                    ["systemctl", "is-active", systemd_service],
-                                    capture_output=True,
-                                    text=True,
-                                    check=False
-                                )
-                                
-                                status_output = result.stdout.strip()
-                                
-                                if status_output == "active":
-                                    service_status = "active"
-                                elif status_output == "inactive":
-                                    service_status = "inactive"
-                                elif status_output == "failed":
-                                    service_status = "failed"
-                                else:
-                                    service_status = "failed"
-
-                            except Exception as e:
-                                self.logger.warning(f"Ошибка при получении статуса сервиса{systemd_service}: {str(e)}")
-                                service_status = "failed"
-                        else:
-                            service_status = "inactive"
-
-                    if service_status == "failed":
-                        if service_info.get("status") != "failed":
-                            self.logger.info(f"Новая поломка сервиса {module_name}")
-
-                            alert_enabled = self.config.get("alerts", {}).get("send_alert_after_service_failed")
-
-                            if alert_enabled:
-                                self.send_alert_email(module_name, systemd_service)
-                                self.logger.info(f"Сообщение об ошибке модуля {module_name} отправлено")
-                    
-                    if module_guid in self.module_services:
-                        self.module_services[module_guid]["status"] = service_status
-                    
-                    all_statuses[module_guid] = service_status
-                    
-                    previous_status = self.previous_statuses.get(module_guid)
-                    if previous_status != service_status:
-                        status_changes[module_guid] = service_status
-                        self.logger.info(f"Статус модуля {module_name} был изменен из {previous_status} в {service_status}")
-
-                    old_status = module.get("status")
-                    if old_status != service_status:
-                        self._update_module_status(module_guid, service_status)
-                
-                self.previous_statuses = all_statuses.copy()
-                self.logger.info(f"{all_statuses}")
-                
-                time.sleep(1)
-            except Exception as e:
-                self.logger.error(f"Ошибка при мониторинге сервисов{str(e)}")
-                self.logger.error(traceback.format_exc())
-    # отправка письма на почту в случае сбоя
-    def send_alert_email(self, module_name, service_name):
-        try:
-            if not self.config.get("alerts", {}).get("email"):
-                self.logger.warning("Не указан email адрес")
-                return
-            
-            log_content = "No logs available"
-            try:
-                logs_result = subprocess.run(
-                    ["sudo", "systemctl", "status", service_name, "-o", "short-iso"],
-                    capture_output=True,
-                    text=True,
-                    check=False,
-                    encoding="utf-8",
-                    errors="replace"
-                )
-                log_content = logs_result.stdout
-
-                if len(log_content) > 5000:
-                    log_content = "... (truncated) ...\n" + log_content[-5000:]
-            except Exception as e:
-                log_content = f"Error getting logs: {str(e)}"
-
-            msg = MIMEMultipart()
-            msg["Subject"] = f"Service Failure Alert: {module_name}"
-            msg["From"] = self.config.get("alerts", {}).get("smtp_username")
-            msg["To"] = self.config["alerts"]["email"]
-            
-            body = f"""
-Service failed
-
-Module: {module_name}
-Service: {service_name}
-Time: {datetime.now().isoformat()}
-Server: {self.config.get('servername')}
-
-Recent logs:
-{log_content}
-"""
-            message = MIMEText(body, "plain", "utf-8")
-            msg.attach(message)
-            
-            smtp_server = self.config.get("alerts", {}).get("smtp_server")
-            smtp_port = int(self.config.get("alerts", {}).get("smtp_port"))
-            smtp_username = self.config.get("alerts", {}).get("smtp_username")
-            smtp_password = self.config.get("alerts", {}).get("smtp_password")
-
-            try:
-                smtp = smtplib.SMTP(smtp_server, smtp_port)
-                smtp.ehlo()
-                smtp.starttls()
-                if smtp_username and smtp_password:
-                    smtp.login(smtp_username, smtp_password)
-                
-                smtp.sendmail(
-                    from_addr=smtp_username,
-                    to_addrs=self.config["alerts"]["email"],
-                    msg=msg.as_string()
-                )
-                smtp.quit()
-                
-            except Exception as e:
-                self.logger.error(f"Ошибка SMTP {str(e)}")
-                self.logger.error(traceback.format_exc())
-                
-        except Exception as e:
-            self.logger.error(f"Ошибка при отправке сообщения: {str(e)}")
-            self.logger.error(traceback.format_exc())
-    # запуск модуля
-    def start(self):
-        monitor_thread = threading.Thread(target=self.monitor_services)
-        monitor_thread.daemon = True
-        monitor_thread.start()
-
-        self.logger.info("Module Manager запущен")
-        
-        
-        while True:
-                time.sleep(1)
-
-
-if __name__ == "__main__":
-    config_path = sys.argv[1]
-
-    manager = ModuleManager(config_path)
-    manager.start()
+import json
+import os
+import sys
+import time
+import queue
+import logging
+import requests
+import subprocess
+import threading
+import traceback
+import fnmatch
+import socket
+import signal
+from contextlib import contextmanager
+import paho.mqtt.client as mqtt
+from datetime import datetime
+import response_formats
+from resource_sampler import ResourceSampler
+from state_snapshot import StateSnapshot
+from health_probes import HealthProber
+from restart_policy import RestartPolicy, RESTART, CRASHLOOP
+from profiler import Profiler
+from tracing import Tracer, TRACEPARENT
+from sharding import DEFAULT_SHARDING_CONFIG, HashRing
+
+# каталог юнитов можно переопределить для запуска с тестовым systemd (benchmark.py mqtt-load)
+SYSTEMD_PATH = os.environ.get("MODULE_MANAGER_SYSTEMD_PATH", "/etc/systemd/system")
+BULK_ACTION_CHUNK = 100
+
+# секции конфига, которые применяются при перечитывании без перезапуска
+RELOADABLE_SECTIONS = ["loglevel", "servername", "alerts", "systemapi", "mqtt", "status_stream", "commands", "sharding"]
+
+DEFAULT_COMMANDS_CONFIG = {
+    "max_pending": 100,
+    "reply_topic": "replies",
+    "reply_qos": 1
+}
+
+# сбор ошибок, записанных в лог потоком во время выполнения команды
+class CommandErrorCollector(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.local = threading.local()
+
+    def emit(self, record):
+        errors = getattr(self.local, "errors", None)
+        if errors is not None and len(errors) < 20 and not record.getMessage().startswith("Traceback"):
+            errors.append(record.getMessage())
+    # ошибки текущего потока внутри блока with
+    @contextmanager
+    def capture(self):
+        self.local.errors = []
+        try:
+            yield self.local.errors
+        finally:
+            self.local.errors = None
+
+class ModuleManager:
+    def __init__(self, config_path):
+        self.setup_logging()
+        
+        self.config_path = config_path
+        self.config = self.load_config(config_path)
+        self.logger.info("Загрузка конфига прошла успешно")
+        self.apply_log_level()
+        self.last_config_reload = None
+
+        self.node_id = self.config.get("node_id") or socket.gethostname()
+        self.status_stream = self.config.get("status_stream", {})
+        self.published_statuses = {}
+        self.status_lock = threading.Lock()
+        # модули, по которым отправлено письмо о сбое: следующее письмо только о восстановлении
+        self.alerted_modules = set()
+        self.last_summary_at = 0
+        self.last_heartbeat_at = 0
+
+        self.sharding = dict(DEFAULT_SHARDING_CONFIG)
+        self.sharding.update(self.config.get("sharding", {}))
+        self.assignment_version = None
+        self.last_shard_sync_at = 0
+        # кольцо живых узлов из сигнала жизни: владелец команды для модуля, которого еще нет в списке узла
+        self.shard_ring = None
+
+        self.modules = []
+        self.module_services = {}
+        # изменения module_services из команд, мониторинга и сверки выполняются под этой блокировкой
+        self.services_lock = threading.RLock()
+        self.is_running = True
+        self.previous_statuses = {}
+
+        resources_config = self.config.get("resources", {})
+        self.resource_sampler = ResourceSampler(resources_config) if resources_config.get("enabled", True) else None
+
+        health_config = self.config.get("health_checks", {})
+        self.health_prober = HealthProber(health_config) if health_config.get("enabled", True) else None
+
+        policy_config = self.config.get("restart_policy", {})
+        self.restart_policy = RestartPolicy(policy_config) if policy_config.get("enabled") else None
+
+        self.tracer = Tracer(self.config.get("tracing", {}), "module_manager")
+
+        profiling_config = self.config.get("profiling", {})
+        self.profiler = Profiler(profiling_config, "module_manager", self.publish_profile_result) if profiling_config.get("enabled") else None
+
+        self.unit_files = {}
+        self.service_files = None
+        self.systemd_dir_mtime = None
+
+        self.commands_config = dict(DEFAULT_COMMANDS_CONFIG)
+        self.commands_config.update(self.config.get("commands", {}))
+        self.command_queue = queue.Queue(maxsize=int(self.commands_config["max_pending"]))
+        self.command_errors = CommandErrorCollector()
+        self.logger.addHandler(self.command_errors)
+
+        command_thread = threading.Thread(target=self.process_commands, name="commands")
+        command_thread.daemon = True
+        command_thread.start()
+
+        self.setup_api_client()
+        self.setup_mqtt()
+
+        if self.sharding["enabled"]:
+            self.assignment_version = self.send_node_heartbeat()
+
+        snapshot_config = self.config.get("snapshot", {})
+        self.snapshot = StateSnapshot(snapshot_config.get("path", "module_manager_state.db")) if snapshot_config.get("enabled", True) else None
+
+        if self.load_snapshot():
+            reconcile_thread = threading.Thread(target=self.reconcile_state)
+            reconcile_thread.daemon = True
+            reconcile_thread.start()
+        else:
+            self.reconcile_state()
+    # логирование
+    def setup_logging(self):
+        self.logger = logging.getLogger("ModuleManager")
+        self.logger.setLevel(logging.DEBUG)
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        
+        file_handler = logging.FileHandler("module_manager.log")
+        file_handler.setLevel(logging.DEBUG)
+
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        console_handler.setFormatter(formatter)
+        file_handler.setFormatter(formatter)
+
+        self.logger.addHandler(console_handler)
+        self.logger.addHandler(file_handler)
+    # чтение конфига
+    def load_config(self, config_path):
+        try:
+            with open(config_path, 'r') as config_file:
+                config = json.load(config_file)
+                return config
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки файла конфига: {str(e)}")
+            sys.exit(1)
+    # уровень логирования из поля loglevel конфига
+    def apply_log_level(self):
+        level = logging.getLevelName(str(self.config.get("loglevel", "debug")).upper())
+        if isinstance(level, int):
+            self.logger.setLevel(level)
+        else:
+            self.logger.warning(f"Неизвестный уровень логирования {self.config.get('loglevel')}")
+    # проверка конфига перед применением, текст ошибки или None
+    def validate_config(self, config):
+        if not isinstance(config, dict):
+            return "конфиг должен быть объектом JSON"
+        if not isinstance(config.get("systemapi"), dict) or not config["systemapi"].get("base_url"):
+            return "не задан systemapi.base_url"
+        mqtt_config = config.get("mqtt")
+        if not isinstance(mqtt_config, dict) or not mqtt_config.get("broker") or not mqtt_config.get("topic_prefix"):
+            return "не заданы mqtt.broker и mqtt.topic_prefix"
+        try:
+            int(mqtt_config.get("port"))
+        except (TypeError, ValueError):
+            return "mqtt.port должен быть числом"
+        return None
+    # HTTP клиент System API, соединения переиспользуются между запросами
+    def setup_api_client(self):
+        self.api_base_url = self.config["systemapi"]["base_url"].rstrip("/")
+        self.api_client = requests.Session()
+    # подключение к MQTT
+    def setup_mqtt(self):
+        try:
+            mqtt_config = self.config.get("mqtt")
+            
+            broker = mqtt_config.get("broker")
+            port = int(mqtt_config.get("port"))
+            
+            client_id = f"module_manager_{int(time.time())}"
+            self.mqtt_client = mqtt.Client(client_id=client_id)
+
+            if mqtt_config.get("username") and mqtt_config.get("password"):
+                self.mqtt_client.username_pw_set(
+                    mqtt_config.get("username"),
+                    mqtt_config.get("password")
+                )
+
+            self.mqtt_topic_prefix = mqtt_config.get("topic_prefix")
+
+            self.mqtt_client.on_connect = self.on_mqtt_connect
+            self.mqtt_client.on_message = self.on_mqtt_message
+            self.mqtt_client.on_disconnect = self.on_mqtt_disconnect
+
+            self.mqtt_client.will_set(
+                self.manager_topic(),
+                json.dumps({"state": "offline"}),
+                qos=1,
+                retain=True
+            )
+            
+            self.mqtt_client.connect_async(broker, port, 60)
+            self.mqtt_client.loop_start()
+            
+        except Exception as e:
+            self.logger.error(f"Ошибка при подключении к MQTT брокеру: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            sys.exit(1)
+    # после подключения подписка на команды
+    def on_mqtt_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.logger.info(f"Подключение к MQTT брокеру прошло успешно")
+
+            for topic in self.command_topics():
+                result, mid = self.mqtt_client.subscribe(topic)
+                self.logger.info(f"Подписка на команды {topic}: result = {result}, mid = {mid}")
+
+            self.publish_heartbeat()
+            self.republish_statuses()
+
+            self.logger.info(f"Публикация сообщений - {self.mqtt_topic_prefix}/status")
+        else:
+            self.logger.error(f"Ошибка при подключении к MQTT брокеру: {rc}")
+            self.logger.error(traceback.format_exc())
+    # топики команд с текущим префиксом, при шардировании еще и топики этого узла
+    def command_topics(self):
+        command_topics = [
+            f"{self.mqtt_topic_prefix}/command/create_new_systemctl_service",
+            f"{self.mqtt_topic_prefix}/command/remove_service",
+            f"{self.mqtt_topic_prefix}/command/restart_configs", 
+            f"{self.mqtt_topic_prefix}/command/run_command_for_systemd_service",
+            f"{self.mqtt_topic_prefix}/command/update_modules_list",
+            f"{self.mqtt_topic_prefix}/command/get_resource_series",
+            f"{self.mqtt_topic_prefix}/command/bulk_action",
+            f"{self.mqtt_topic_prefix}/command/profile",
+            f"{self.mqtt_topic_prefix}/command/reload_config"
+        ]
+        
+        if self.sharding["enabled"]:
+            command_topics += [
+                topic.replace(f"{self.mqtt_topic_prefix}/command/", f"{self.mqtt_topic_prefix}/nodes/{self.node_id}/command/")
+                for topic in command_topics
+            ]
+        return command_topics
+    # переподключение к брокеру с новыми настройками mqtt, старое подключение закрывается
+    def reconnect_mqtt(self):
+        old_client = self.mqtt_client
+        # при штатном отключении брокер не публикует will, поэтому offline отправляется явно
+        old_client.publish(self.manager_topic(), json.dumps({"state": "offline"}), qos=1, retain=True)
+        old_client.disconnect()
+        old_client.loop_stop()
+
+        self.setup_mqtt()
+    # чтение сообщения
+    def on_mqtt_message(self, client, userdata, msg):
+        try:
+            payload = json.loads(msg.payload.decode('utf-8'))
+
+            topic_parts = msg.topic.split('/')
+            if len(topic_parts) >= 3 and topic_parts[-2] == "command":
+                command = topic_parts[-1]
+                traceparent = payload.get(TRACEPARENT) if isinstance(payload, dict) else None
+
+                # команды для модулей из общего топика выполняет только узел-владелец; модуль, которого нет в списке
+                # узла (например только что созданный), разбирает владелец guid по кольцу
+                module_guid = payload.get("config_id") if isinstance(payload, dict) else None
+                node_topic = len(topic_parts) >= 4 and topic_parts[-4] == "nodes"
+                route = False
+                if self.sharding["enabled"] and not node_topic and module_guid and not self.get_module_by_guid(module_guid):
+                    if not self.shard_ring or self.shard_ring.node_for(module_guid) != self.node_id:
+                        self.logger.debug(f"Команда {command} для модуля {module_guid} другого узла пропущена")
+                        return
+                    route = True
+
+                correlation_id = None
+                reply_to = None
+                if isinstance(payload, dict):
+                    correlation_id = payload.get("correlation_id") or payload.get("request_id")
+                    reply_to = payload.get("reply_to")
+                if correlation_id and not reply_to:
+                    reply_to = f"{self.mqtt_topic_prefix}/{self.commands_config['reply_topic']}"
+
+                request = {
+                    "command": command,
+                    "payload": payload,
+                    "topic": msg.topic,
+                    "traceparent": traceparent,
+                    "correlation_id": correlation_id,
+                    "reply_to": reply_to,
+                    "received_at": time.time(),
+                    "route": route
+                }
+                try:
+                    self.command_queue.put_nowait(request)
+                except queue.Full:
+                    self.logger.error(f"Очередь команд переполнена, команда {command} отклонена")
+                    self.send_command_reply(request, "rejected", error="очередь команд переполнена")
+                    return
+
+                self.send_command_reply(request, "accepted", queued=self.command_queue.qsize())
+            else:
+                self.logger.warning(f"Ошибка при обработке команды: {msg.topic}")
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Ошибка при обработке данных: {str(e)}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при обработке сообщения: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # выполнение команд из очереди по одной в отдельном потоке
+    def process_commands(self):
+        while True:
+            request = self.command_queue.get()
+            try:
+                self.execute_command(request)
+            except Exception as e:
+                self.logger.error(f"Ошибка при выполнении команды {request['command']}: {str(e)}")
+                self.logger.error(traceback.format_exc())
+    # выполнение одной команды и отправка результата с длительностью и ошибками
+    def execute_command(self, request):
+        command = request["command"]
+        payload = request["payload"]
+        started = time.time()
+
+        if request.get("route"):
+            if self.route_command(request):
+                return
+        elif self.sharding["enabled"] and isinstance(payload, dict) and payload.get("config_id") \
+                and not self.get_module_by_guid(payload["config_id"]):
+            # модуль могли назначить узлу после последнего обновления списка
+            self.update_modules_list()
+
+        with self.tracer.span(f"mqtt {command}", {"mqtt.topic": request["topic"]}, parent=request["traceparent"], root=True) as span:
+            if isinstance(payload, dict) and payload.get("sent_at"):
+                span.set_attribute("mqtt.delivery_delay", round(request["received_at"] - payload["sent_at"], 3))
+            span.set_attribute("command.queue_wait", round(started - request["received_at"], 3))
+
+            trace_note = f" (trace: {span.trace_id})" if span.trace_id else ""
+            self.logger.info(f"Выполнение команды: {command} с данными: {payload}{trace_note}")
+
+            with self.command_errors.capture() as errors:
+                known = self.dispatch_command(command, payload)
+
+        if not known:
+            errors.insert(0, f"неизвестная команда {command}")
+
+        result = {}
+        module_guid = payload.get("config_id") if isinstance(payload, dict) else None
+        if module_guid and module_guid in self.module_services:
+            result["status"] = self.module_services[module_guid].get("status")
+        if command == "reload_config" and self.last_config_reload:
+            result.update(self.last_config_reload)
+
+        self.send_command_reply(
+            request,
+            "failed" if errors else "completed",
+            duration=round(time.time() - started, 3),
+            errors=errors,
+            result=result
+        )
+    # команда для модуля не из списка узла: список обновляется, модуль другого узла пересылается в топик этого узла.
+    # True, если команда переслана и здесь не выполняется
+    def route_command(self, request):
+        module_guid = request["payload"].get("config_id")
+
+        self.update_modules_list()
+        if self.get_module_by_guid(module_guid):
+            return False
+
+        node = None
+        try:
+            response = self.api_client.get(f"{self.api_base_url}/api/modules/{module_guid}", timeout=5)
+            if response.status_code == 200:
+                node = response.json().get("node")
+        except Exception as e:
+            self.logger.error(f"Ошибка при получении узла модуля {module_guid}: {str(e)}")
+
+        if not node or node == self.node_id:
+            return False
+
+        self.logger.info(f"Команда {request['command']} для модуля {module_guid} переслана узлу {node}")
+        self.mqtt_client.publish(
+            f"{self.mqtt_topic_prefix}/nodes/{node}/command/{request['command']}",
+            json.dumps(request["payload"], ensure_ascii=False),
+            qos=1
+        )
+        self.send_command_reply(request, "forwarded", node=node)
+        return True
+    # вызов обработчика команды, False для неизвестной команды
+    def dispatch_command(self, command, payload):
+        if command == "create_new_systemctl_service":
+            self.create_service(payload)
+        elif command == "remove_service":
+            self.delete_service(payload)
+        elif command == "restart_configs":
+            self.restart_all_services()
+        elif command == "run_command_for_systemd_service":
+            self.run_command_for_service(payload)
+        elif command == "update_modules_list":
+            self.update_modules_list()
+            self.save_snapshot()
+        elif command == "get_resource_series":
+            self.publish_resource_series(payload)
+        elif command == "bulk_action":
+            self.run_bulk_action(payload)
+        elif command == "profile":
+            self.start_profiling(payload)
+        elif command == "reload_config":
+            self.reload_config()
+        else:
+            self.logger.warning(f"Неизвестная команда: {command}")
+            return False
+        return True
+    # подтверждение получения или результат команды в топик ответа, если его запросили
+    def send_command_reply(self, request, state, **details):
+        if not request["correlation_id"]:
+            return
+
+        reply = {
+            "correlation_id": request["correlation_id"],
+            "command": request["command"],
+            "node": self.node_id,
+            "state": state,
+            "ts": round(time.time(), 3)
+        }
+        reply.update(details)
+
+        self.mqtt_client.publish(
+            request["reply_to"],
+            json.dumps(reply, ensure_ascii=False),
+            qos=self.commands_config["reply_qos"]
+        )
+    # SIGHUP: перечитывание конфига в потоке команд, по очереди с остальными командами
+    def on_sighup(self, signum, frame):
+        request = {
+            "command": "reload_config",
+            "payload": {},
+            "topic": "SIGHUP",
+            "traceparent": None,
+            "correlation_id": None,
+            "reply_to": None,
+            "received_at": time.time()
+        }
+        try:
+            self.command_queue.put_nowait(request)
+        except queue.Full:
+            self.logger.error("Очередь команд переполнена, перечитывание конфига по SIGHUP отклонено")
+    # перечитывание конфига и применение только изменившихся секций, модули и состояние мониторинга остаются в памяти
+    def reload_config(self):
+        try:
+            with open(self.config_path, 'r') as config_file:
+                new_config = json.load(config_file)
+        except Exception as e:
+            self.logger.error(f"Ошибка чтения конфига {self.config_path}, остается прежний: {str(e)}")
+            return False
+
+        error = self.validate_config(new_config)
+        if error:
+            self.logger.error(f"Конфиг {self.config_path} не применен: {error}")
+            return False
+
+        changed = sorted(key for key in set(self.config) | set(new_config) if self.config.get(key) != new_config.get(key))
+        restart_required = [key for key in changed if key not in RELOADABLE_SECTIONS]
+
+        new_sharding = dict(DEFAULT_SHARDING_CONFIG)
+        new_sharding.update(new_config.get("sharding", {}))
+        if new_sharding["enabled"] != self.sharding["enabled"]:
+            restart_required.append("sharding.enabled")
+            new_sharding["enabled"] = self.sharding["enabled"]
+        new_commands = dict(DEFAULT_COMMANDS_CONFIG)
+        new_commands.update(new_config.get("commands", {}))
+        if new_commands["max_pending"] != self.commands_config["max_pending"]:
+            restart_required.append("commands.max_pending")
+
+        # секции, требующие перезапуска, остаются прежними, чтобы следующее перечитывание снова их заметило
+        running_config = dict(new_config)
+        for key in changed:
+            if key in RELOADABLE_SECTIONS:
+                continue
+            if key in self.config:
+                running_config[key] = self.config[key]
+            else:
+                running_config.pop(key, None)
+        self.config = running_config
+
+        if "loglevel" in changed:
+            self.apply_log_level()
+        if "systemapi" in changed:
+            old_client = self.api_client
+            self.setup_api_client()
+            old_client.close()
+        if "status_stream" in changed:
+            self.status_stream = new_config.get("status_stream", {})
+        if "commands" in changed:
+            self.commands_config.update({key: value for key, value in new_commands.items() if key != "max_pending"})
+        if "sharding" in changed:
+            self.sharding = new_sharding
+        if "mqtt" in changed:
+            self.reconnect_mqtt()
+
+        applied = [key for key in changed if key in RELOADABLE_SECTIONS]
+        self.last_config_reload = {"applied": applied, "restart_required": restart_required}
+
+        if restart_required:
+            self.logger.warning(f"Изменения в {', '.join(restart_required)} применятся после перезапуска")
+        self.logger.info(f"Конфиг перечитан, применены изменения: {', '.join(applied) or 'нет'}")
+        return True
+    # отключение от MQTT
+    def on_mqtt_disconnect(self, client, userdata, rc):
+        if rc != 0:
+            self.logger.warning("Внеплановое отключение")
+        else:
+            self.logger.info("Отключение MQTT брокера")
+    # загрузка снимка состояния, сохраненного при прошлой работе
+    def load_snapshot(self):
+        if not self.snapshot:
+            return False
+
+        state = self.snapshot.load()
+        if not state:
+            self.logger.info("Снимок состояния не найден, выполняется полная загрузка")
+            return False
+
+        self.modules = state["modules"]
+        self.module_services = state["services"]
+        self.unit_files = state["unit_files"]
+        self.service_files = set(state["service_files"]) if state["service_files"] is not None else None
+        self.systemd_dir_mtime = state["systemd_dir_mtime"]
+
+        saved_at = datetime.fromtimestamp(state["saved_at"]).isoformat()
+        self.logger.info(f"Загружен снимок состояния от {saved_at}: {len(self.modules)} модулей, {len(self.module_services)} сервисов")
+        return True
+    # сохранение снимка состояния
+    def save_snapshot(self):
+        if not self.snapshot:
+            return
+
+        with self.services_lock:
+            services = dict(self.module_services)
+
+        self.snapshot.save(
+            list(self.modules),
+            services,
+            dict(self.unit_files),
+            sorted(self.service_files) if self.service_files is not None else None,
+            self.systemd_dir_mtime
+        )
+    # сверка состояния из снимка с System API и файлами сервисов
+    def reconcile_state(self):
+        try:
+            self.update_modules_list()
+            self.load_existing_services()
+            self.save_snapshot()
+        except Exception as e:
+            self.logger.error(f"Ошибка при сверке состояния: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # чтение пути модуля и скрипта запуска из .service файла
+    def _parse_service_file(self, service_path):
+        with open(service_path, 'r') as f:
+            service_content = f.read()
+
+        module_path = None
+        startup_script = None
+        
+        for line in service_content.splitlines():
+            if line.strip().startswith("WorkingDirectory="):
+                module_path = line.strip().split("=", 1)[1]
+            elif line.strip().startswith("ExecStart="):
+                exec_start = line.strip().split("=", 1)[1]
+                parts = exec_start.split()
+                if len(parts) >= 2:
+                    startup_script = parts[-1]
+
+        return {"module_path": module_path, "startup_script": startup_script}
+    # загрузка существующих серисных файлов для модулей
+    def load_existing_services(self):
+        try:
+            if not self.modules:
+                self.logger.warning("Список модулей пуст, невозможно загрузить сервисы")
+                return
+            
+            systemd_path = SYSTEMD_PATH
+            with self.services_lock:
+                known_services = set(self.module_services)
+
+            try:
+                dir_mtime = os.stat(systemd_path).st_mtime
+                if self.service_files is None or dir_mtime != self.systemd_dir_mtime:
+                    with os.scandir(systemd_path) as entries:
+                        self.service_files = {
+                            entry.path for entry in entries
+                            if entry.name.endswith(".service") and entry.is_file(follow_symlinks=False)
+                        }
+                    self.systemd_dir_mtime = dir_mtime
+                else:
+                    self.logger.debug(f"Директория {systemd_path} не изменилась, используется сохраненный список")
+            except Exception as e:
+                self.logger.error(f"Ошибка при сканировании директории {systemd_path}: {str(e)}")
+                self.logger.error(traceback.format_exc())
+                self.service_files = set()
+            
+            found_services = {}
+            module_services = {}
+            unit_files = {}
+            parsed_count = 0
+            
+            for module in self.modules:
+                module_guid = module.get("guid")
+                module_name = module.get("name")
+                
+                if not module_guid or not module_name:
+                    continue
+
+                service_name = self._create_safe_filename(module_name)
+                systemd_service_name = f"{service_name}.service"
+                service_path = os.path.join(systemd_path, systemd_service_name)
+
+                if service_path in self.service_files:
+                    try:
+                        mtime = os.stat(service_path).st_mtime
+                        cached = self.unit_files.get(service_path)
+
+                        if cached and cached["mtime"] == mtime:
+                            parsed = cached["info"]
+                        else:
+                            parsed = self._parse_service_file(service_path)
+                            parsed_count += 1
+                        unit_files[service_path] = {"mtime": mtime, "info": parsed}
+
+                        module_path = parsed["module_path"]
+                        startup_script = parsed["startup_script"]
+                        
+                        if module_path and startup_script:
+                            previous = self.module_services.get(module_guid, {})
+                            service_info = {
+                                "guid": module_guid,
+                                "name": module_name,
+                                "module_path": module_path,
+                                "startup_script": startup_script,
+                                "systemd_service": systemd_service_name,
+                                "status": previous.get("status", "unknown")
+                            }
+                            
+                            module_services[module_guid] = service_info
+                            found_services[module_guid] = service_name
+                        else:
+                            self.logger.warning(f"Не удалось извлечь информацию о пути из сервиса {systemd_service_name}")
+                    
+                    except Exception as e:
+                        self.logger.error(f"Ошибка при анализе файла сервиса {service_path}: {str(e)}")
+                        self.logger.error(traceback.format_exc())
+
+            with self.services_lock:
+                self._merge_services(module_services, known_services)
+            self.unit_files = unit_files
+            
+            if found_services:
+                self.logger.info(f"Загружено {len(found_services)} существующих сервисов (перечитано файлов: {parsed_count}): {', '.join(found_services.values())}")
+            else:
+                self.logger.info("Не найдено существующих сервисов для модулей")
+            
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке существующих сервисов: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # слияние найденных сервисов с текущими: сервисы, созданные или удаленные командами во время сканирования, сохраняют свое состояние
+    def _merge_services(self, found_services, known_services):
+        for module_guid in list(self.module_services):
+            if module_guid in known_services and module_guid not in found_services:
+                del self.module_services[module_guid]
+
+        for module_guid, service_info in found_services.items():
+            current = self.module_services.get(module_guid)
+            if current is not None:
+                service_info["status"] = current.get("status", service_info["status"])
+                self.module_services[module_guid] = service_info
+            elif module_guid not in known_services:
+                self.module_services[module_guid] = service_info
+    # выбор команды (запуск\остановка\перезапуск) в зависимости от отправки
+    def run_command_for_service(self, data):
+        try:
+            module_guid = data.get("config_id")
+            action = data.get("action")
+            
+            if not module_guid:
+                self.logger.error("Нет параметра GUID модуля")
+                return
+            
+            if not action:
+                self.logger.error("Нет параметра action для модуля")
+                return
+            
+            module = self.get_module_by_guid(module_guid)
+            if not module:
+                self.logger.error(f"Модуль GUID {module_guid} не найден")
+                return
+
+            module_name = module.get("name")
+
+            if self.restart_policy:
+                self.restart_policy.reset(module_guid)
+            
+            if action == "start":
+                self.logger.info(f"Запуск сервиса для модуля {module_name} (GUID: {module_guid})")
+                self.start_service({"config_id": module_guid, "name": module_name})
+            elif action == "stop":
+                self.logger.info(f"Остановка сервиса для модуля {module_name} (GUID: {module_guid})")
+                self.stop_service({"config_id": module_guid, "name": module_name})
+            elif action == "restart":
+                self.logger.info(f"Перезапуск сервиса для модуля {module_name} (GUID: {module_guid})")
+                self.restart_service({"config_id": module_guid, "name": module_name})
+            else:
+                self.logger.error(f"Неизвестная команда: {action}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при выполнении команды: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # выбор модулей по селектору: guids, service_type, status, name (шаблон)
+    def select_modules(self, selector):
+        guids = set(selector.get("guids") or [])
+        service_type = selector.get("service_type")
+        status = selector.get("status")
+        name_pattern = selector.get("name")
+
+        selected = []
+        for module in self.modules:
+            if guids and module.get("guid") not in guids:
+                continue
+            if service_type and module.get("service_type") != service_type:
+                continue
+            if status and module.get("status") != status:
+                continue
+            if name_pattern and not fnmatch.fnmatchcase(module.get("name") or "", name_pattern):
+                continue
+            selected.append(module)
+        return selected
+    # запуск\остановка\перезапуск группы модулей пачками вызовов systemctl
+    def run_bulk_action(self, data):
+        try:
+            action = data.get("action")
+            selector = data.get("selector") or {}
+
+            if action not in ("start", "stop", "restart"):
+                self.logger.error(f"Неизвестная команда: {action}")
+                return
+
+            if not any(selector.get(key) for key in ("guids", "service_type", "status", "name")):
+                self.logger.error("Пустой селектор модулей")
+                return
+
+            modules = self.select_modules(selector)
+            services = {}
+            skipped = []
+            for module in modules:
+                service_info = self.module_services.get(module.get("guid"))
+                if service_info and service_info.get("systemd_service"):
+                    services[module.get("guid")] = service_info["systemd_service"]
+                else:
+                    skipped.append(module.get("guid"))
+
+            self.logger.info(f"Групповая команда {action}: выбрано {len(modules)} модулей, с сервисом {len(services)}")
+
+            started = time.time()
+            errors = {}
+            statuses = {}
+            guids = list(services)
+
+            for index in range(0, len(guids), BULK_ACTION_CHUNK):
+                chunk = guids[index:index + BULK_ACTION_CHUNK]
+                units = [services[guid] for guid in chunk]
+
+                if self.restart_policy:
+                    for guid in chunk:
+                        self.restart_policy.reset(guid)
+
+                with self.tracer.span(f"systemctl {action}", {"systemd.units": len(units)}):
+                    result = subprocess.run(
+                        ["sudo", "systemctl", action] + units,
+                        capture_output=True,
+                        text=True,
+                        check=False
+                    )
+                if result.returncode != 0:
+                    self.logger.warning(f"systemctl {action} завершился с кодом {result.returncode}: {result.stderr.strip()}")
+
+                check = subprocess.run(
+                    ["systemctl", "is-active"] + units,
+                    capture_output=True,
+                    text=True,
+                    check=False
+                )
+                outputs = check.stdout.split()
+
+                for position, guid in enumerate(chunk):
+                    output = outputs[position] if position < len(outputs) else "unknown"
+                    status = output if output in ("active", "inactive") else "failed"
+                    statuses[guid] = status
+                    self.module_services[guid]["status"] = status
+
+                    expected = "inactive" if action == "stop" else "active"
+                    if status != expected:
+                        errors[guid] = f"статус после {action}: {output}"
+
+            if statuses:
+                self._update_modules_status(statuses)
+
+            summary = {
+                "request_id": data.get("request_id"),
+                "action": action,
+                "matched": len(modules),
+                "succeeded": [guid for guid in statuses if guid not in errors],
+                "failed": errors,
+                "skipped": skipped,
+                "duration": round(time.time() - started, 3)
+            }
+            self.mqtt_client.publish(
+                f"{self.mqtt_topic_prefix}/bulk_action/result",
+                json.dumps(summary)
+            )
+            self.logger.info(f"Групповая команда {action} выполнена: успешно {len(summary['succeeded'])}, ошибок {len(errors)}, без сервиса {len(skipped)}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при выполнении групповой команды: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # получить модуль по ID
+    def get_module_by_guid(self, guid):
+        for module in self.modules:
+            if module.get("guid") == guid:
+                return module
+        return None
+    # перезапуск всех сервисов ПМ
+    def restart_all_services(self):
+        self.logger.info("Перезапуск сервисов")
+        
+        for module in self.modules:
+            try:
+                guid = module.get("guid")
+                name = module.get("name")
+                
+                if guid and name:
+                    if self.restart_policy:
+                        self.restart_policy.reset(guid)
+                    self.restart_service({"config_id": guid, "name": name})
+            except Exception as e:
+                self.logger.error(f"Ошибка при перезапуске модуля {module.get('name')}: {str(e)}")
+        
+        self.logger.info("Все сервисы перезапущены")
+    # обновление списка модулей
+    def update_modules_list(self):
+        try:
+            response = self.api_client.get(
+                f"{self.api_base_url}/api/modules",
+                params={"node": self.node_id} if self.sharding["enabled"] else None,
+                headers={
+                    "Accept": response_formats.accept_header(),
+                    "Accept-Encoding": ", ".join(response_formats.supported_encodings())
+                },
+                stream=True
+            )
+            
+            if response.status_code == 200:
+                # тело распаковывается здесь: urllib3 умеет zstd не во всех сборках
+                content = response_formats.decompress(
+                    response.raw.read(decode_content=False), response.headers.get("Content-Encoding")
+                )
+                self.modules = response_formats.decode_modules(
+                    content, response.headers.get("Content-Type")
+                )
+
+                for module in self.modules:
+                    self.logger.debug(f"Модуль: {module.get('name')} (GUID: {module.get('guid')}, Status: {module.get('status')})")
+
+                self.clear_removed_statuses()
+
+            else:
+                self.logger.error(f"Ошибка при получении модулей: {response.status_code}, Response: {response.text}")
+            response.close()
+        except Exception as e:
+            self.logger.error(f"Ошибкуа при обработки модулей: {str(e)}")
+    # создать скрипт заглушкку и .service файл и выдать права доступа, после получения команды для создания
+    def create_service(self, data):
+        try:
+            module_guid = data.get("config_id")
+            
+            if not module_guid:
+                self.logger.error("Нет GUID модуля")
+                return
+            
+            module = self.get_module_by_guid(module_guid)
+            
+            if not module:
+                self.logger.error(f"Модуль {module_guid} не найден")
+
+                return
+            
+            module_name = module.get("name")
+            
+            service_type = module.get('service_type', 'dummy_service')
+            
+            base_modules_path = os.path.expanduser("~/modules")
+            module_path = os.path.join(base_modules_path, service_type)
+            startup_script = os.path.join(module_path, "main.py")
+            
+            if not os.path.exists(module_path):
+                try:
+                    os.makedirs(module_path, exist_ok=True)
+                except Exception as e:
+                    self.logger.error(f"Ошибка при создании директории: {str(e)}")
+
+                    return
+            
+            if not os.path.exists(startup_script):
+                try:
+                    with open(startup_script, 'w') as f:
+                        f.write('''
+import time
+while True:
+    time.sleep(60)
+                                ''')
+                    os.chmod(startup_script, 0o755)
+                    self.logger.info(f"Создан скрипт заглушка {startup_script}")
+                except Exception as e:
+                    self.logger.warning(f"Скрипт не был создан: {str(e)}")
+            
+            service_name = self._create_safe_filename(module_name)
+            systemd_service_name = f"{service_name}.service"
+            
+            service_file_content = self._create_systemd_service_file(
+                service_name, module_name, module_path, startup_script
+            )
+            
+            systemd_path = SYSTEMD_PATH
+            service_file_path = os.path.join(systemd_path, systemd_service_name)
+            
+            try:
+                tmp_file_path = f"/tmp/{systemd_service_name}"
+                with open(tmp_file_path, 'w') as f:
+                    f.write(service_file_content)
+
+                subprocess.run(
+                    ["sudo", "mv", tmp_file_path, service_file_path],
+                    check=True,
+                    capture_output=True
+                )
+
+                subprocess.run(
+                    ["sudo", "chmod", "644", service_file_path],
+                    check=True,
+                    capture_output=True
+                )
+                
+                subprocess.run(
+                    ["sudo", "systemctl", "daemon-reload"],
+                    check=True,
+                    capture_output=True
+                )
+
+                subprocess.run(
+                    ["sudo", "systemctl", "disable", tmp_file_path],
+                    check=True,
+                    capture_output=True
+                )
+
+                service_info = {
+                    "guid": module_guid,
+                    "name": module_name,
+                    "module_path": module_path,
+                    "startup_script": startup_script,
+                    "systemd_service": systemd_service_name,
+                    "status": "unknow"
+                }
+                
+                with self.services_lock:
+                    self.module_services[module_guid] = service_info
+                
+                self.logger.info(f"Создан сервис {systemd_service_name} для модуля {module_name}")
+
+                self.save_snapshot()
+                
+                self._update_module_status(module_guid, "inactive")
+
+            except Exception as e:
+                self.logger.error(f"Ошибка при создании модуля: {str(e)}")
+                self.logger.error(traceback.format_exc())
+
+        except Exception as e:
+            self.logger.error(f"FОшибка при создании модуля: {str(e)}")
+            self.logger.error(traceback.format_exc())
+
+    # создание .service файла со своими параметрами
+    def _create_systemd_service_file(self, service_name, module_name, module_path, startup_script):
+        venv_path = os.path.expanduser("~/venv")
+        python_path = os.path.join(venv_path, "bin", "python") if os.path.exists(venv_path) else "/usr/bin/python3"
+        
+        service_content = f"""[Unit]
+Description=Module Service for {module_name}
+After=network.target
+
+[Service]
+Type=simple
+User={os.getenv('USER')}
+WorkingDirectory={module_path}
+ExecStart={python_path} {startup_script}
+Restart=no
+StandardOutput=journal
+StandardError=journal
+SyslogIdentifier={service_name}
+Environment="PATH={venv_path}/bin:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin"
+Environment="PYTHONUNBUFFERED=1"
+
+[Install]
+WantedBy=multi-user.target
+"""
+        return service_content
+    # удалить .service файл
+    def delete_service(self, data):
+        try:
+            module_guid = data.get("config_id")
+            
+            if not module_guid:
+                self.logger.error("Нет GUID модуля")
+                return
+            
+            module = self.get_module_by_guid(module_guid)
+            
+            if not module:
+                self.logger.error(f"Модуль {module_guid} не найден")
+
+                return
+            
+            module_name = module.get("name")
+            
+            self.stop_service({"config_id": module_guid, "name": module_name})
+
+            service_info = self.module_services[module_guid]
+            systemd_service = service_info.get("systemd_service")
+            
+            if not systemd_service:
+                self.logger.warning(f"Сервиса для модуля {module_name} не найдено")
+                
+                with self.services_lock:
+                    self.module_services.pop(module_guid, None)
+
+                return
+            
+            systemd_service_path = os.path.join(SYSTEMD_PATH, systemd_service)
+            
+            try:
+                if os.path.exists(systemd_service_path):
+                    subprocess.run(["sudo", "systemctl", "disable", systemd_service], 
+                                    check=True)
+                    
+                    subprocess.run(["sudo", "rm", systemd_service_path], 
+                                   check=True)
+                    
+                    subprocess.run(["sudo", "systemctl", "daemon-reload"], 
+                                   check=True)
+                
+                with self.services_lock:
+                    self.module_services.pop(module_guid, None)
+
+                self.save_snapshot()
+                
+                self.logger.info(f"Сервис удален {systemd_service} для модуля {module_name}")
+
+                self._update_module_status(module_guid, "inactive")
+
+            except Exception as e:
+                self.logger.error(f"Ошибка при удаленеии сервиса: {str(e)}")
+                self.logger.error(traceback.format_exc())
+
+        except Exception as e:
+            self.logger.error(f"Ошибка удаления сервиса {str(e)}")
+            self.logger.error(traceback.format_exc())
+
+    # запустить .service файл
+    def start_service(self, payload):
+        try:
+            module_guid = payload.get("config_id")
+            module_name = payload.get("name")
+            
+            if module_guid not in self.module_services:
+                self.logger.error(f"Нет сервиса для запуска модуля {module_name}")
+                return
+
+            service_info = self.module_services[module_guid]
+            systemd_service = service_info.get("systemd_service")
+            
+            try:
+                result = subprocess.run(
+                    ["systemctl", "is-active", systemd_service],
+                    capture_output=True,
+                    text=True,
+                    check=False
+                )
+                
+                if result.stdout.strip() == "active":
+                    self.logger.info(f"Сервис {systemd_service} уже запущен")
+                    
+                    service_info["status"] = "running"
+                    
+                    self._update_module_status(module_guid, "active")
+                    
+                    return
+            except Exception as e:
+                self.logger.warning(f"Ошибка при проверки статуса: {str(e)}")
+
+            try:
+                with self.tracer.span("systemctl start", {"systemd.unit": systemd_service}):
+                    subprocess.run(["sudo", "systemctl", "start", systemd_service], 
+                                   check=True)
+
+                service_info["status"] = "running"
+                
+                self.logger.info(f"Сервис {systemd_service} запущен для модуля {module_name}")
+
+                self._update_module_status(module_guid, "active")
+
+            except Exception as e:
+                self.logger.error(f"Ошибка при запуске сервиса {str(e)}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при запуске сервиса: {str(e)}")
+    # остановить .service файл
+    def stop_service(self, payload):
+        try:
+            module_guid = payload.get("config_id")
+            module_name = payload.get("name")
+            
+            if not module_guid or not module_name:
+                self.logger.error("Нет GUID модуля")
+                return
+            
+            if module_guid not in self.module_services:
+                self.logger.error(f"Нет сервиса для модуля {module_name}")
+
+                return
+            
+            service_info = self.module_services[module_guid]
+            systemd_service = service_info.get("systemd_service")
+
+            try:
+                result = subprocess.run(
+                    ["systemctl", "is-active", systemd_service],
+                    capture_output=True,
+                    text=True,
+                    check=False
+                )
+                
+                if result.stdout.strip() != "active":
+                    self.logger.info(f"Сервис {systemd_service} не запущен")
+                    
+                    service_info["status"] = "stopped"
+                    
+                    self._update_module_status(module_guid, "inactive")
+
+                    return
+            except Exception as e:
+                self.logger.warning(f"Ошибка при получении статуса сервиса: {str(e)}")
+            
+            try:
+                with self.tracer.span("systemctl stop", {"systemd.unit": systemd_service}):
+                    subprocess.run(["sudo", "systemctl", "stop", systemd_service], 
+                                   check=True)
+                
+                service_info["status"] = "stopped"
+                
+                self.logger.info(f"Сервис остановлен {systemd_service} для модуля {module_name}")
+                
+                self._update_module_status(module_guid, "inactive")
+
+            except Exception as e:
+                error_msg = f"Ошибка при остановки сервиса: {str(e)}"
+                self.logger.error(error_msg)
+                self.logger.error(traceback.format_exc())
+
+        except Exception as e:
+            self.logger.error(f"Ошибка остановки сервиса: {str(e)}")
+            self.logger.error(traceback.format_exc())
+
+    # перезапуск всех .service файлов, alert=False для автоперезапуска: письмо отправляется только при карантине
+    def restart_service(self, payload, alert=True):
+        try:
+            module_guid = payload.get("config_id")
+            module_name = payload.get("name")
+            
+            if not module_guid or not module_name:
+                self.logger.error("Нет GUID модуля")
+                return
+            
+            if module_guid not in self.module_services:
+                self.logger.error(f"Нет сервиса для модуля {module_name}")
+
+                return
+            
+            service_info = self.module_services[module_guid]
+            systemd_service = service_info.get("systemd_service")
+            
+            try:
+                with self.tracer.span("systemctl restart", {"systemd.unit": systemd_service}):
+                    subprocess.run(["sudo", "systemctl", "restart", systemd_service], 
+                                   check=True)
+                
+                service_info["status"] = "running"
+                
+                self.logger.info(f"Перезапущен сервис {systemd_service} для модуля {module_name}")
+                
+                self._update_module_status(module_guid, "active")
+
+            except Exception as e:
+                error_msg = f"Ошибка при перезапуске сервиса: {str(e)}"
+                self.logger.error(error_msg)
+                self.logger.error(traceback.format_exc())
+                
+                service_info["status"] = "failed"
+                
+                self._update_module_status(module_guid, "failed")
+                
+                if alert:
+                    self.alert_failure(module_guid, module_name, systemd_service)
+
+        except Exception as e:
+            self.logger.error(f"Ошибка перезапуска сервиса: {str(e)}")
+            self.logger.error(traceback.format_exc())
+
+    # создание безапасного имени файла для .service
+    def _create_safe_filename(self, name):
+        safe_name = ""
+        for char in name:
+            if char.isalnum() or char == '_':
+                safe_name += char
+            else:
+                safe_name += '_'
+        return safe_name
+    # обновление статуса ПМ
+    def _update_module_status(self, module_guid, status):
+        self.publish_status(module_guid, status)
+        try:
+            with self.tracer.span("http PUT status", {"module.guid": module_guid, "module.status": status}):
+                response = self.api_client.put(
+                    f"{self.api_base_url}/api/modules/{module_guid}/status",
+                    json={"status": status},
+                    headers=self.tracer.inject_headers()
+                )
+            
+            if response.status_code == 200:
+                self.logger.info(f"Обновленый статус {module_guid} - {status}")
+
+                for module in self.modules:
+                    if module.get("guid") == module_guid:
+                        module["status"] = status
+                        break
+            else:
+                self.logger.error(f"Ошибка при обновлении статуса: {response.status_code}, Response: {response.text}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при обновлении статуса: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # обновление статусов нескольких ПМ одним запросом
+    def _update_modules_status(self, statuses):
+        for module_guid, status in statuses.items():
+            self.publish_status(module_guid, status)
+        try:
+            with self.tracer.span("http PUT statuses", {"modules": len(statuses)}):
+                response = self.api_client.put(
+                    f"{self.api_base_url}/api/modules/statuses",
+                    json=[{"guid": guid, "status": status} for guid, status in statuses.items()],
+                    headers=self.tracer.inject_headers()
+                )
+
+            if response.status_code == 200:
+                self.logger.info(f"Обновлены статусы {len(statuses)} модулей")
+
+                for module in self.modules:
+                    status = statuses.get(module.get("guid"))
+                    if status is not None:
+                        module["status"] = status
+            else:
+                self.logger.error(f"Ошибка при обновлении статусов: {response.status_code}, Response: {response.text}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при обновлении статусов: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # мониторинг и логирование статусов ПМ
+    def monitor_services(self):
+        while self.is_running:
+            try:
+                if self.profiler:
+                    self.profiler.checkpoint()
+
+                self.sync_shard()
+
+                all_statuses = {}
+                status_changes = {}
+
+                health_checks = self.collect_health_checks()
+                health_future = self.health_prober.submit(health_checks) if health_checks else None
+                health_results = None
+                
+                for module in self.modules:
+                    module_guid = module.get("guid")
+                    module_name = module.get("name")
+
+                    if not module_guid or not module_name:
+                        continue
+                    
+                    service_status = "inactive"
+                    
+                    if module_guid in self.module_services:
+                        service_info = self.module_services[module_guid]
+                        systemd_service = service_info.get("systemd_service")
+                        
+                        if systemd_service:
+                            try:
+                                result = subprocess.run(
+                                    ["systemctl", "is-active", systemd_service],
+                                    capture_output=True,
+                                    text=True,
+                                    check=False
+                                )
+                                
+                                status_output = result.stdout.strip()
+                                
+                                if status_output == "active":
+                                    service_status = "active"
+                                elif status_output == "inactive":
+                                    service_status = "inactive"
+                                elif status_output == "failed":
+                                    service_status = "failed"
+                                else:
+                                    service_status = "failed"
+
+                            except Exception as e:
+                                self.logger.warning(f"Ошибка при получении статуса сервиса{systemd_service}: {str(e)}")
+                                service_status = "failed"
+                        else:
+                            service_status = "inactive"
+
+                    if service_status == "active" and module_guid in health_checks:
+                        if health_results is None:
+                            health_results = self.wait_health_results(health_future, health_checks)
+
+                        healthy, detail = health_results.get(module_guid, (True, ""))
+                        if not healthy:
+                            service_status = "degraded"
+                            if self.previous_statuses.get(module_guid) != "degraded":
+                                self.logger.warning(f"Проверка работоспособности модуля {module_name} не пройдена: {detail}")
+
+                    if self.restart_policy and service_status == "failed":
+                        service_status = self.apply_restart_policy(module_guid, module_name, systemd_service, service_info.get("status"))
+                    elif self.restart_policy and service_status == "active":
+                        self.restart_policy.on_recovered(module_guid)
+
+                    if service_status == "failed":
+                        restarting = self.restart_policy and self.restart_policy.has_recent_restarts(module_guid)
+                        if service_info.get("status") != "failed" and not restarting:
+                            self.logger.info(f"Новая поломка сервиса {module_name}")
+
+                            # при автоперезапуске письмо отправляется только при переходе в crashloop
+                            if not self.restart_policy:
+                                self.alert_failure(module_guid, module_name, systemd_service)
+                    elif service_status == "active":
+                        self.alert_recovered(module_guid, module_name, systemd_service)
+                    
+                    if module_guid in self.module_services:
+                        self.module_services[module_guid]["status"] = service_status
+                    
+                    all_statuses[module_guid] = service_status
+                    self.publish_status(module_guid, service_status)
+                    
+                    previous_status = self.previous_statuses.get(module_guid)
+                    if previous_status != service_status:
+                        status_changes[module_guid] = service_status
+                        self.logger.info(f"Статус модуля {module_name} был изменен из {previous_status} в {service_status}")
+
+                    old_status = module.get("status")
+                    if old_status != service_status:
+                        self._update_module_status(module_guid, service_status)
+                
+                self.previous_statuses = all_statuses.copy()
+                self.logger.info(f"{all_statuses}")
+
+                self.sample_resources()
+                self.publish_periodic()
+                
+                time.sleep(1)
+            except Exception as e:
+                self.logger.error(f"Ошибка при мониторинге сервисов{str(e)}")
+                self.logger.error(traceback.format_exc())
+    # автоперезапуск упавшего модуля по политике, возвращает статус failed или crashloop
+    def apply_restart_policy(self, module_guid, module_name, systemd_service, previous_status):
+        decision = self.restart_policy.on_failure(module_guid)
+
+        if decision == CRASHLOOP:
+            if previous_status != "crashloop":
+                self.logger.error(f"Модуль {module_name} циклически падает, автоперезапуск остановлен")
+                self.alert_failure(module_guid, module_name, systemd_service)
+            return "crashloop"
+
+        if decision == RESTART:
+            self.logger.info(f"Автоперезапуск сервиса {systemd_service} для модуля {module_name}")
+            restart_thread = threading.Thread(target=self._auto_restart, args=(module_guid, module_name))
+            restart_thread.daemon = True
+            restart_thread.start()
+
+        return "failed"
+    # перезапуск в отдельном потоке, чтобы не задерживать цикл мониторинга
+    def _auto_restart(self, module_guid, module_name):
+        try:
+            self.restart_service({"config_id": module_guid, "name": module_name}, alert=False)
+        finally:
+            self.restart_policy.restart_finished()
+    # проверки работоспособности модулей, у которых есть сервис: guid -> описание
+    def collect_health_checks(self):
+        if not self.health_prober:
+            return {}
+
+        return {
+            module.get("guid"): module["health_check"]
+            for module in self.modules
+            if module.get("health_check") and module.get("guid") in self.module_services
+        }
+    # ожидание результатов проверок текущего цикла
+    def wait_health_results(self, health_future, health_checks):
+        try:
+            return health_future.result(timeout=self.health_prober.cycle_timeout(health_checks))
+        except Exception as e:
+            self.logger.error(f"Ошибка при проверке работоспособности модулей: {str(e)}")
+            health_future.cancel()
+            return {}
+    # топик состояния этого менеджера
+    def manager_topic(self):
+        return f"{self.mqtt_topic_prefix}/managers/{self.node_id}"
+    # публикация статуса модуля в сохраняемый топик, только при изменении
+    def publish_status(self, module_guid, status):
+        if not self.status_stream.get("enabled", True):
+            return
+
+        with self.status_lock:
+            if self.published_statuses.get(module_guid, (None,))[0] == status:
+                return
+            payload = json.dumps({"status": status, "ts": round(time.time(), 3)})
+            self.published_statuses[module_guid] = (status, payload)
+
+        self.mqtt_client.publish(
+            f"{self.mqtt_topic_prefix}/status/{module_guid}",
+            payload,
+            qos=self.status_stream.get("qos", 1),
+            retain=True
+        )
+    # повторная публикация всех статусов после переподключения к брокеру
+    def republish_statuses(self):
+        with self.status_lock:
+            published = dict(self.published_statuses)
+
+        for module_guid, (_, payload) in published.items():
+            self.mqtt_client.publish(
+                f"{self.mqtt_topic_prefix}/status/{module_guid}",
+                payload,
+                qos=self.status_stream.get("qos", 1),
+                retain=True
+            )
+    # удаление сохраненных статусов модулей, которых больше нет
+    def clear_removed_statuses(self):
+        current = {module.get("guid") for module in self.modules}
+        with self.status_lock:
+            removed = [guid for guid in self.published_statuses if guid not in current]
+            for guid in removed:
+                del self.published_statuses[guid]
+
+        # при шардировании модуль мог переехать на другой узел, статусы удаленных модулей очищает API
+        if self.sharding["enabled"]:
+            return
+
+        for guid in removed:
+            self.mqtt_client.publish(f"{self.mqtt_topic_prefix}/status/{guid}", b"", qos=1, retain=True)
+    # сводка по всем модулям и сигнал жизни менеджера по расписанию
+    def publish_periodic(self):
+        if not self.status_stream.get("enabled", True):
+            return
+
+        now = time.time()
+        if now - self.last_summary_at >= self.status_stream.get("summary_interval", 10):
+            self.last_summary_at = now
+            self.publish_fleet_summary()
+        if now - self.last_heartbeat_at >= self.status_stream.get("heartbeat_interval", 10):
+            self.publish_heartbeat()
+    # число модулей в каждом статусе, у каждого узла свой топик сводки
+    def publish_fleet_summary(self):
+        with self.status_lock:
+            statuses = [status for status, _ in self.published_statuses.values()]
+
+        by_status = {}
+        for status in statuses:
+            by_status[status] = by_status.get(status, 0) + 1
+
+        self.mqtt_client.publish(
+            f"{self.mqtt_topic_prefix}/fleet/{self.node_id}",
+            json.dumps({"node": self.node_id, "total": len(statuses), "by_status": by_status, "ts": round(time.time(), 3)}),
+            qos=self.status_stream.get("qos", 1),
+            retain=True
+        )
+    # сигнал жизни менеджера, при обрыве связи брокер опубликует offline
+    def publish_heartbeat(self):
+        self.last_heartbeat_at = time.time()
+        self.mqtt_client.publish(
+            self.manager_topic(),
+            json.dumps({"state": "online", "ts": round(self.last_heartbeat_at, 3), "modules": len(self.modules)}),
+            qos=1,
+            retain=True
+        )
+    # сигнал жизни узла в API, возвращает версию распределения модулей по узлам
+    def send_node_heartbeat(self):
+        try:
+            response = self.api_client.put(f"{self.api_base_url}/api/nodes/{self.node_id}/heartbeat", timeout=5)
+
+            if response.status_code == 200:
+                heartbeat = response.json()
+                if heartbeat.get("nodes") is not None:
+                    self.shard_ring = HashRing(heartbeat["nodes"], self.sharding["virtual_nodes"])
+                return heartbeat.get("assignment_version")
+
+            self.logger.error(f"Ошибка при отправке сигнала жизни узла: {response.status_code}, Response: {response.text}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при отправке сигнала жизни узла: {str(e)}")
+        return None
+    # сигнал жизни узла по расписанию и перезагрузка своих модулей при перераспределении
+    def sync_shard(self):
+        if not self.sharding["enabled"]:
+            return
+
+        now = time.time()
+        if now - self.last_shard_sync_at < self.sharding["heartbeat_interval"]:
+            return
+        self.last_shard_sync_at = now
+
+        version = self.send_node_heartbeat()
+        if version is None or version == self.assignment_version:
+            return
+
+        self.logger.info(f"Распределение модулей по узлам изменилось (версия {version}), обновление списка модулей")
+        self.assignment_version = version
+        self.update_modules_list()
+        self.load_existing_services()
+        self.save_snapshot()
+    # сбор потребления ресурсов сервисами и публикация текущих значений
+    def sample_resources(self):
+        if not self.resource_sampler:
+            return
+
+        try:
+            services = {
+                guid: info["systemd_service"]
+                for guid, info in list(self.module_services.items())
+                if info.get("systemd_service")
+            }
+            self.resource_sampler.sample(services)
+
+            self.mqtt_client.publish(
+                f"{self.mqtt_topic_prefix}/resources",
+                json.dumps(self.resource_sampler.get_current())
+            )
+        except Exception as e:
+            self.logger.error(f"Ошибка при сборе ресурсов: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # публикация последних значений ресурсов модуля по запросу
+    def publish_resource_series(self, data):
+        module_guid = data.get("config_id")
+
+        if not module_guid:
+            self.logger.error("Нет GUID модуля")
+            return
+
+        if not self.resource_sampler:
+            self.logger.warning("Сбор ресурсов отключен")
+            return
+
+        limit = data.get("limit")
+        if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+            self.logger.error(f"Некорректный limit для ресурсов модуля {module_guid}: {limit}")
+            return
+
+        series = self.resource_sampler.get_series(
+            module_guid, data.get("resolution", "raw"), limit
+        )
+        if series is None:
+            self.logger.warning(f"Нет данных о ресурсах модуля {module_guid}")
+            series = {}
+
+        self.mqtt_client.publish(
+            f"{self.mqtt_topic_prefix}/resources/{module_guid}/series",
+            json.dumps(series)
+        )
+    # запуск профилирования по команде: режим cprofile или sampling, длительность, снимок памяти
+    def start_profiling(self, data):
+        if not self.profiler:
+            self.logger.warning("Профилирование отключено в конфиге")
+            return
+
+        self.profiler.start(
+            data.get("mode", "cprofile"),
+            data.get("duration", 30),
+            bool(data.get("memory", False))
+        )
+    # публикация списка файлов с результатами профилирования
+    def publish_profile_result(self, result):
+        self.mqtt_client.publish(
+            f"{self.mqtt_topic_prefix}/profile/{self.node_id}",
+            json.dumps(result),
+            qos=1
+        )
+    # одно письмо о сбое модуля до его восстановления
+    def alert_failure(self, module_guid, module_name, service_name):
+        if module_guid in self.alerted_modules:
+            return
+        self.alerted_modules.add(module_guid)
+
+        if self.config.get("alerts", {}).get("send_alert_after_service_failed"):
+            self.send_alert_email(module_name, service_name)
+            self.logger.info(f"Сообщение об ошибке модуля {module_name} отправлено")
+    # письмо о восстановлении модуля, если о его сбое было письмо
+    def alert_recovered(self, module_guid, module_name, service_name):
+        if module_guid not in self.alerted_modules:
+            return
+        self.alerted_modules.discard(module_guid)
+
+        if self.config.get("alerts", {}).get("send_alert_after_service_failed"):
+            self.send_alert_email(module_name, service_name, recovered=True)
+            self.logger.info(f"Сообщение о восстановлении модуля {module_name} отправлено")
+    # отправка письма на почту в случае сбоя или восстановления
+    def send_alert_email(self, module_name, service_name, recovered=False):
+        try:
+            if not self.config.get("alerts", {}).get("email"):
+                self.logger.warning("Не указан email адрес")
+                return
+
+            # почтовые модули нужны только при отправке оповещения
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+            
+            log_content = "No logs available"
+            try:
+                logs_result = subprocess.run(
+                    ["sudo", "systemctl", "status", service_name, "-o", "short-iso"],
+                    capture_output=True,
+                    text=True,
+                    check=False,
+                    encoding="utf-8",
+                    errors="replace"
+                )
+                log_content = logs_result.stdout
+
+                if len(log_content) > 5000:
+                    log_content = "... (truncated) ...\n" + log_content[-5000:]
+            except Exception as e:
+                log_content = f"Error getting logs: {str(e)}"
+
+            msg = MIMEMultipart()
+            msg["Subject"] = f"Service Recovered: {module_name}" if recovered else f"Service Failure Alert: {module_name}"
+            msg["From"] = self.config.get("alerts", {}).get("smtp_username")
+            msg["To"] = self.config["alerts"]["email"]
+            
+            body = f"""
+{"Service recovered" if recovered else "Service failed"}
+
+Module: {module_name}
+Service: {service_name}
+Time: {datetime.now().isoformat()}
+Server: {self.config.get('servername')}
+
+Recent logs:
+{log_content}
+"""
+            message = MIMEText(body, "plain", "utf-8")
+            msg.attach(message)
+            
+            smtp_server = self.config.get("alerts", {}).get("smtp_server")
+            smtp_port = int(self.config.get("alerts", {}).get("smtp_port"))
+            smtp_username = self.config.get("alerts", {}).get("smtp_username")
+            smtp_password = self.config.get("alerts", {}).get("smtp_password")
+
+            try:
+                smtp = smtplib.SMTP(smtp_server, smtp_port)
+                smtp.ehlo()
+                smtp.starttls()
+                if smtp_username and smtp_password:
+                    smtp.login(smtp_username, smtp_password)
+                
+                smtp.sendmail(
+                    from_addr=smtp_username,
+                    to_addrs=self.config["alerts"]["email"],
+                    msg=msg.as_string()
+                )
+                smtp.quit()
+                
+            except Exception as e:
+                self.logger.error(f"Ошибка SMTP {str(e)}")
+                self.logger.error(traceback.format_exc())
+                
+        except Exception as e:
+            self.logger.error(f"Ошибка при отправке сообщения: {str(e)}")
+            self.logger.error(traceback.format_exc())
+    # запуск модуля
+    def start(self):
+        signal.signal(signal.SIGHUP, self.on_sighup)
+
+        monitor_thread = threading.Thread(target=self.monitor_services)
+        monitor_thread.daemon = True
+        monitor_thread.start()
+
+        self.logger.info("Module Manager запущен")
+        
+        
+        while True:
+                time.sleep(1)
+
+
+if __name__ == "__main__":
+    config_path = sys.argv[1]
+
+    manager = ModuleManager(config_path)
+    manager.start()
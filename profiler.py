@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_PROFILING_CONFIG = {
+    "enabled": False,
+    "output_dir": "profiles",
+    "max_duration": 300,
+    "sample_interval": 0.01,
+    "admin_token": ""
+}
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+# профилирование работающего процесса по запросу: cProfile или сэмплирование стеков, снимок tracemalloc
+class Profiler:
+    def __init__(self, profiling_config: Optional[Dict[str, Any]] = None, name: str = "profile",
+                 on_finished: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.logger = logging.getLogger(f"Profiler.{name}")
+
+        settings = dict(DEFAULT_PROFILING_CONFIG)
+        settings.update(profiling_config or {})
+        self.output_dir = settings["output_dir"]
+        self.max_duration = float(settings["max_duration"])
+        self.sample_interval = float(settings["sample_interval"])
+
+        self.name = name
+        self.on_finished = on_finished
+        self.lock = threading.Lock()
+        self.session: Optional[Dict[str, Any]] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+    # запуск профилирования на duration секунд
+    def start(self, mode: str = "cprofile", duration: float = 30, memory: bool = False) -> bool:
+        if mode not in PROFILE_MODES:
+            self.logger.error(f"Неизвестный режим профилирования {mode}")
+            return False
+
+        duration = min(max(float(duration), 1.0), self.max_duration)
+
+        with self.lock:
+            if self.session is not None:
+                self.logger.warning("Профилирование уже запущено")
+                return False
+
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+            except OSError as e:
+                self.logger.error(f"Не удалось создать каталог профилей {self.output_dir}: {str(e)}")
+                return False
+
+            started_tracemalloc = False
+            if memory:
+                import tracemalloc
+                started_tracemalloc = not tracemalloc.is_tracing()
+                if started_tracemalloc:
+                    tracemalloc.start(25)
+
+            self.session = {
+                "mode": mode,
+                "memory": memory,
+                "started_tracemalloc": started_tracemalloc,
+                "started_at": time.time(),
+                "ends_at": time.monotonic() + duration,
+                "prefix": os.path.join(self.output_dir, f"{self.name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"),
+                "profile": None,
+                "owner": None,
+                # cProfile видит только поток, вызвавший checkpoint; сэмплирование - все потоки процесса
+                "scope": "process" if mode == "sampling" else "thread",
+                "thread": None,
+                "stacks": {}
+            }
+
+        self.logger.info(f"Профилирование {mode} запущено на {duration} с")
+
+        if mode == "sampling":
+            sampler_thread = threading.Thread(target=self._sample, args=(self.session,), name="profiler-sampler")
+            sampler_thread.daemon = True
+            sampler_thread.start()
+        else:
+            # если рабочий цикл не вызовет checkpoint, сессия не должна висеть вечно
+            timer = threading.Timer(duration + max(duration, 5.0), self._expire, args=(self.session,))
+            timer.daemon = True
+            timer.start()
+        return True
+    # точка в рабочем цикле: включает и выключает cProfile в потоке цикла, без сессии ничего не делает.
+    # cProfile включается только для вызвавшего потока, остальные потоки видны только в режиме sampling
+    def checkpoint(self):
+        session = self.session
+        if session is None or session["mode"] != "cprofile":
+            return
+
+        ident = threading.get_ident()
+        if time.monotonic() < session["ends_at"]:
+            with self.lock:
+                if session["owner"] is not None:
+                    return
+                session["owner"] = ident
+                session["thread"] = threading.current_thread().name
+            import cProfile
+            session["profile"] = cProfile.Profile()
+            session["profile"].enable()
+            return
+
+        if session["owner"] == ident:
+            session["profile"].disable()
+            self._finish(session)
+    # текущее состояние профилирования и файлы последнего запуска
+    def status(self) -> Dict[str, Any]:
+        session = self.session
+        if session is None:
+            return {"active": False, "last_result": self.last_result}
+        return {
+            "active": True,
+            "mode": session["mode"],
+            "memory": session["memory"],
+            "remaining": round(max(session["ends_at"] - time.monotonic(), 0), 1),
+            "scope": session["scope"],
+            "thread": session["thread"],
+            "last_result": self.last_result
+        }
+    # сэмплирование стеков всех потоков до конца окна
+    def _sample(self, session: Dict[str, Any]):
+        own_ident = threading.get_ident()
+        stacks = session["stacks"]
+
+        while time.monotonic() < session["ends_at"]:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                stacks[key] = stacks.get(key, 0) + 1
+            time.sleep(self.sample_interval)
+
+        self._finish(session)
+    # завершение сессии, если ни один поток так и не вызвал checkpoint
+    def _expire(self, session: Dict[str, Any]):
+        if self.session is not session:
+            return
+        if session["owner"] is None:
+            self.logger.warning("Рабочий цикл не вызвал checkpoint, профилирование завершено без данных")
+            self._finish(session)
+        else:
+            self.logger.warning("Рабочий цикл не вернулся в checkpoint после окончания профилирования")
+    # запись результатов и сброс сессии
+    def _finish(self, session: Dict[str, Any]):
+        with self.lock:
+            if self.session is not session:
+                return
+            self.session = None
+
+        files: List[str] = []
+        if session["memory"]:
+            import tracemalloc
+        try:
+            if session["mode"] == "cprofile" and session["profile"] is not None:
+                import pstats
+                path = f"{session['prefix']}.pstats"
+                pstats.Stats(session["profile"]).dump_stats(path)
+                files.append(path)
+            elif session["mode"] == "sampling":
+                path = f"{session['prefix']}.collapsed"
+                with open(path, "w") as f:
+                    for stack, count in sorted(session["stacks"].items()):
+                        f.write(f"{stack} {count}\n")
+                files.append(path)
+
+            if session["memory"] and tracemalloc.is_tracing():
+                path = f"{session['prefix']}.tracemalloc"
+                tracemalloc.take_snapshot().dump(path)
+                files.append(path)
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении результатов профилирования: {str(e)}")
+        finally:
+            if session["started_tracemalloc"]:
+                tracemalloc.stop()
+
+        self.last_result = {
+            "mode": session["mode"],
+            "started_at": session["started_at"],
+            "finished_at": time.time(),
+            "scope": session["scope"],
+            "thread": session["thread"],
+            "files": files
+        }
+        self.logger.info(f"Профилирование завершено, файлы: {files}")
+
+        if self.on_finished:
+            try:
+                self.on_finished(self.last_result)
+            except Exception as e:
+                self.logger.error(f"Ошибка при отправке результатов профилирования: {str(e)}")
@@ -0,0 +1,210 @@
+import os
+import time
+import logging
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+METRICS = ["cpu_percent", "memory_bytes", "io_read_bps", "io_write_bps"]
+
+DEFAULT_RESOURCES_CONFIG = {
+    "enabled": True,
+    "cgroup_root": "/sys/fs/cgroup",
+    "slice": "system.slice",
+    "raw_capacity": 300,
+    "downsample_factor": 60,
+    "downsampled_capacity": 1440
+}
+
+# кольцевой буфер фиксированного размера на основе массива
+class RingBuffer:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.values = array('d', [0.0]) * capacity
+        self.index = 0
+        self.count = 0
+
+    def append(self, value: float):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return self.values[(self.index - 1) % self.capacity]
+
+    def to_list(self, limit: Optional[int] = None) -> List[float]:
+        count = self.count if limit is None else max(0, min(limit, self.count))
+        if not count:
+            return []
+        start = (self.index - count) % self.capacity
+        if start + count <= self.capacity:
+            return self.values[start:start + count].tolist()
+        return self.values[start:].tolist() + self.values[:(start + count) % self.capacity].tolist()
+
+# ряды значений одного модуля: время и каждая метрика в своем буфере
+class SeriesBuffers:
+    def __init__(self, capacity: int):
+        self.timestamps = RingBuffer(capacity)
+        self.metrics = {metric: RingBuffer(capacity) for metric in METRICS}
+
+    def append(self, timestamp: float, sample: Dict[str, float]):
+        self.timestamps.append(timestamp)
+        for metric in METRICS:
+            self.metrics[metric].append(sample[metric])
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, List[float]]:
+        result = {"timestamps": self.timestamps.to_list(limit)}
+        for metric in METRICS:
+            result[metric] = self.metrics[metric].to_list(limit)
+        return result
+
+# сбор CPU/памяти/IO сервисов модулей из файлов cgroup v2
+class ResourceSampler:
+    def __init__(self, resources_config: Optional[Dict[str, Any]] = None):
+        self.logger = logging.getLogger("ModuleManager.Resources")
+
+        settings = dict(DEFAULT_RESOURCES_CONFIG)
+        settings.update(resources_config or {})
+        self.cgroup_root = settings["cgroup_root"]
+        self.slice = settings["slice"]
+        self.raw_capacity = int(settings["raw_capacity"])
+        self.downsample_factor = int(settings["downsample_factor"])
+        self.downsampled_capacity = int(settings["downsampled_capacity"])
+
+        self.lock = threading.Lock()
+        self.raw = {}
+        self.downsampled = {}
+        self.pending = {}
+        self.previous = {}
+        self.current = {}
+    # путь к cgroup сервиса
+    def _unit_path(self, systemd_service: str) -> str:
+        return os.path.join(self.cgroup_root, self.slice, systemd_service)
+    # чтение файла вида "ключ значение" в словарь
+    def _read_keyed(self, path: str) -> Dict[str, int]:
+        values = {}
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    values[parts[0]] = int(parts[1])
+        return values
+    # суммарные прочитанные и записанные байты по всем устройствам из io.stat
+    def _read_io(self, path: str):
+        read_bytes = 0
+        write_bytes = 0
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "rbytes":
+                            read_bytes += int(value)
+                        elif key == "wbytes":
+                            write_bytes += int(value)
+        except FileNotFoundError:
+            pass
+        return read_bytes, write_bytes
+    # чтение счетчиков cgroup одного сервиса
+    def _read_counters(self, systemd_service: str) -> Optional[Dict[str, int]]:
+        unit_path = self._unit_path(systemd_service)
+        if not os.path.isdir(unit_path):
+            return None
+
+        cpu_stat = self._read_keyed(os.path.join(unit_path, "cpu.stat"))
+        with open(os.path.join(unit_path, "memory.current"), 'r') as f:
+            memory_current = int(f.read().strip())
+        read_bytes, write_bytes = self._read_io(os.path.join(unit_path, "io.stat"))
+
+        return {
+            "cpu_usec": cpu_stat.get("usage_usec", 0),
+            "memory_bytes": memory_current,
+            "io_read_bytes": read_bytes,
+            "io_write_bytes": write_bytes
+        }
+    # один проход по всем сервисам: guid -> имя .service
+    def sample(self, services: Dict[str, str]):
+        now = time.time()
+        samples = {}
+        stopped = []
+
+        for guid, systemd_service in services.items():
+            try:
+                counters = self._read_counters(systemd_service)
+            except Exception as e:
+                self.logger.debug(f"Ошибка чтения cgroup сервиса {systemd_service}: {str(e)}")
+                counters = None
+
+            if counters is None:
+                self.previous.pop(guid, None)
+                stopped.append(guid)
+                continue
+
+            previous = self.previous.get(guid)
+            self.previous[guid] = (now, counters)
+            if previous is None:
+                continue
+
+            previous_time, previous_counters = previous
+            elapsed = now - previous_time
+            if elapsed <= 0:
+                continue
+
+            samples[guid] = {
+                "cpu_percent": max(0, counters["cpu_usec"] - previous_counters["cpu_usec"]) / (elapsed * 1e6) * 100,
+                "memory_bytes": float(counters["memory_bytes"]),
+                "io_read_bps": max(0, counters["io_read_bytes"] - previous_counters["io_read_bytes"]) / elapsed,
+                "io_write_bps": max(0, counters["io_write_bytes"] - previous_counters["io_write_bytes"]) / elapsed
+            }
+
+        with self.lock:
+            for guid in list(self.raw):
+                if guid not in services:
+                    self._forget(guid)
+
+            # остановленный сервис не должен показывать последние CPU/память в текущих значениях
+            for guid in stopped:
+                self.current.pop(guid, None)
+
+            for guid, sample in samples.items():
+                self._store(guid, now, sample)
+    # запись значения в буферы и прореживание для длинных окон
+    def _store(self, guid: str, timestamp: float, sample: Dict[str, float]):
+        if guid not in self.raw:
+            self.raw[guid] = SeriesBuffers(self.raw_capacity)
+            self.downsampled[guid] = SeriesBuffers(self.downsampled_capacity)
+            self.pending[guid] = [0, dict.fromkeys(METRICS, 0.0)]
+
+        self.raw[guid].append(timestamp, sample)
+        self.current[guid] = dict(sample, timestamp=timestamp)
+
+        pending = self.pending[guid]
+        pending[0] += 1
+        for metric in METRICS:
+            pending[1][metric] += sample[metric]
+
+        if pending[0] >= self.downsample_factor:
+            average = {metric: total / pending[0] for metric, total in pending[1].items()}
+            self.downsampled[guid].append(timestamp, average)
+            self.pending[guid] = [0, dict.fromkeys(METRICS, 0.0)]
+    # удаление данных модуля, у которого больше нет сервиса
+    def _forget(self, guid: str):
+        self.raw.pop(guid, None)
+        self.downsampled.pop(guid, None)
+        self.pending.pop(guid, None)
+        self.current.pop(guid, None)
+        self.previous.pop(guid, None)
+    # текущие значения по всем модулям
+    def get_current(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            return {guid: dict(values) for guid, values in self.current.items()}
+    # последние значения модуля: raw - каждый цикл, downsampled - средние за downsample_factor циклов
+    def get_series(self, guid: str, resolution: str = "raw", limit: Optional[int] = None) -> Optional[Dict[str, List[float]]]:
+        with self.lock:
+            buffers = (self.downsampled if resolution == "downsampled" else self.raw).get(guid)
+            if buffers is None:
+                return None
+            return buffers.to_dict(limit)
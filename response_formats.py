@@ -0,0 +1,144 @@
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_TYPE = "application/json"
+COLUMNAR_TYPE = "application/vnd.modules.columnar+json"
+MSGPACK_TYPE = "application/x-msgpack"
+
+MODULE_COLUMNS = ["guid", "name", "description", "status", "service_type", "health_check"]
+
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+
+# список форматов, которые можно отдать с учетом установленных библиотек
+def supported_types() -> List[str]:
+    types = [JSON_TYPE, COLUMNAR_TYPE]
+    if msgpack is not None:
+        types.append(MSGPACK_TYPE)
+    return types
+
+# список алгоритмов сжатия, которые можно использовать
+def supported_encodings() -> List[str]:
+    encodings = ["gzip"]
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+# заголовок Accept от самого компактного формата к самому подробному
+def accept_header() -> str:
+    parts = []
+    if msgpack is not None:
+        parts.append(MSGPACK_TYPE)
+    parts.append(f"{COLUMNAR_TYPE};q=0.9")
+    parts.append(f"{JSON_TYPE};q=0.5")
+    return ", ".join(parts)
+
+# разбор заголовков вида "a;q=0.5, b" в список значений по убыванию q
+def _parse_header(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+
+    items = []
+    for index, part in enumerate(value.split(",")):
+        fields = [field.strip() for field in part.split(";")]
+        name = fields[0].lower()
+        if not name:
+            continue
+        quality = 1.0
+        for field in fields[1:]:
+            if field.startswith("q="):
+                try:
+                    quality = float(field[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            items.append((-quality, index, name))
+
+    return [name for _, _, name in sorted(items)]
+
+# выбор формата ответа по заголовку Accept
+def negotiate_type(accept: Optional[str]) -> str:
+    available = supported_types()
+    for media_type in _parse_header(accept):
+        if media_type in available:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return JSON_TYPE
+    return JSON_TYPE
+
+# выбор сжатия по заголовку Accept-Encoding
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    available = supported_encodings()
+    for encoding in _parse_header(accept_encoding):
+        if encoding in available:
+            return encoding
+    return None
+
+# перевод списка модулей в колоночный вид: один список ключей и строки значений
+def to_columnar(modules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # базовые поля идут первыми, за ними все остальные ключи строк (node, version...), чтобы форматы не расходились
+    columns = list(MODULE_COLUMNS)
+    known = set(columns)
+    for module in modules:
+        for key in module:
+            if key not in known:
+                known.add(key)
+                columns.append(key)
+
+    return {
+        "columns": columns,
+        "rows": [[module.get(column) for column in columns] for module in modules]
+    }
+
+# обратное преобразование колоночного вида в список модулей
+def from_columnar(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    columns = data.get("columns", [])
+    return [dict(zip(columns, row)) for row in data.get("rows", [])]
+
+# кодирование списка модулей в выбранный формат
+def encode_modules(modules: List[Dict[str, Any]], media_type: str) -> bytes:
+    if media_type == MSGPACK_TYPE:
+        return msgpack.packb(to_columnar(modules), use_bin_type=True)
+    if media_type == COLUMNAR_TYPE:
+        return json.dumps(to_columnar(modules), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(modules, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# декодирование списка модулей из ответа API по Content-Type
+def decode_modules(content: bytes, content_type: Optional[str]) -> List[Dict[str, Any]]:
+    media_type = (content_type or JSON_TYPE).split(";")[0].strip().lower()
+
+    if media_type == MSGPACK_TYPE:
+        return from_columnar(msgpack.unpackb(content, raw=False))
+
+    data = json.loads(content)
+    if media_type == COLUMNAR_TYPE:
+        return from_columnar(data)
+    return data
+
+# сжатие тела ответа, если оно больше порога
+def compress(body: bytes, encoding: Optional[str], min_size: int = DEFAULT_COMPRESSION_MIN_SIZE) -> Tuple[bytes, Optional[str]]:
+    if not encoding or len(body) < min_size:
+        return body, None
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+# распаковка тела (для клиентов, которые не делают это сами)
+def decompress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    return body
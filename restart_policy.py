@@ -0,0 +1,94 @@
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+DEFAULT_RESTART_POLICY_CONFIG = {
+    "enabled": False,
+    "base_delay": 1.0,
+    "max_delay": 300.0,
+    "jitter": 0.2,
+    "window": 600,
+    "max_restarts": 5,
+    "max_concurrent_restarts": 2
+}
+
+# решения политики для упавшего модуля
+RESTART = "restart"
+WAIT = "wait"
+CRASHLOOP = "crashloop"
+
+# автоперезапуск упавших модулей с экспоненциальной задержкой и карантином при циклических падениях
+class RestartPolicy:
+    def __init__(self, policy_config: Optional[Dict[str, Any]] = None):
+        settings = dict(DEFAULT_RESTART_POLICY_CONFIG)
+        settings.update(policy_config or {})
+        self.base_delay = float(settings["base_delay"])
+        self.max_delay = float(settings["max_delay"])
+        self.jitter = float(settings["jitter"])
+        self.window = float(settings["window"])
+        self.max_restarts = int(settings["max_restarts"])
+
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(int(settings["max_concurrent_restarts"]))
+        self.restarts: Dict[str, deque] = {}
+        self.next_restart_at: Dict[str, float] = {}
+        self.quarantined = set()
+    # число перезапусков модуля в скользящем окне
+    def _recent_restarts(self, guid: str, now: float) -> deque:
+        restarts = self.restarts.setdefault(guid, deque())
+        while restarts and restarts[0] < now - self.window:
+            restarts.popleft()
+        return restarts
+    # задержка перед следующим перезапуском: base * 2^n со случайным отклонением
+    def _delay(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempts))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+    # было ли у модуля недавно автоматических перезапусков
+    def has_recent_restarts(self, guid: str) -> bool:
+        with self.lock:
+            return bool(self._recent_restarts(guid, time.time()))
+    # находится ли модуль в карантине
+    def is_quarantined(self, guid: str) -> bool:
+        with self.lock:
+            return guid in self.quarantined
+    # решение для упавшего модуля: перезапустить, подождать или поместить в карантин
+    def on_failure(self, guid: str) -> str:
+        now = time.time()
+        with self.lock:
+            if guid in self.quarantined:
+                return CRASHLOOP
+
+            restarts = self._recent_restarts(guid, now)
+            if len(restarts) >= self.max_restarts:
+                self.quarantined.add(guid)
+                self.next_restart_at.pop(guid, None)
+                return CRASHLOOP
+
+            next_at = self.next_restart_at.get(guid)
+            if next_at is None:
+                self.next_restart_at[guid] = now + self._delay(len(restarts))
+                return WAIT
+            if now < next_at:
+                return WAIT
+
+            if not self.slots.acquire(blocking=False):
+                return WAIT
+
+            restarts.append(now)
+            self.next_restart_at.pop(guid, None)
+            return RESTART
+    # освобождение слота после перезапуска
+    def restart_finished(self):
+        self.slots.release()
+    # модуль снова работает: ожидание перезапуска больше не нужно
+    def on_recovered(self, guid: str):
+        with self.lock:
+            self.next_restart_at.pop(guid, None)
+    # сброс состояния после ручной команды оператора
+    def reset(self, guid: str):
+        with self.lock:
+            self.quarantined.discard(guid)
+            self.restarts.pop(guid, None)
+            self.next_restart_at.pop(guid, None)
@@ -0,0 +1,37 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_SHARDING_CONFIG = {
+    "enabled": False,
+    "heartbeat_interval": 10,
+    "heartbeat_timeout": 30,
+    "check_interval": 5,
+    "virtual_nodes": 64
+}
+
+# стабильный между процессами хэш строки
+def stable_hash(value: str) -> int:
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+# отпечаток набора живых узлов, меняется при входе и выходе узла
+def membership_signature(nodes: Iterable[str]) -> int:
+    return stable_hash(",".join(sorted(nodes))) >> 1
+
+# консистентное хэширование: при изменении набора узлов переезжает только доля модулей ушедшего или пришедшего узла
+class HashRing:
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = 64):
+        self.points: List[int] = []
+        self.owners: Dict[int, str] = {}
+        for node in sorted(set(nodes)):
+            for replica in range(virtual_nodes):
+                point = stable_hash(f"{node}#{replica}")
+                self.owners[point] = node
+                self.points.append(point)
+        self.points.sort()
+    # узел, которому принадлежит ключ
+    def node_for(self, key: str) -> Optional[str]:
+        if not self.points:
+            return None
+        position = bisect.bisect(self.points, stable_hash(key)) % len(self.points)
+        return self.owners[self.points[position]]
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+# версия схемы снимка в PRAGMA user_version
+SNAPSHOT_SCHEMA_VERSION = 1
+
+# локальный снимок состояния ModuleManager для быстрого старта
+class StateSnapshot:
+    def __init__(self, path: str):
+        self.logger = logging.getLogger("ModuleManager.Snapshot")
+        self.path = path
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._initialize()
+    # подключение к файлу снимка
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    # создание таблиц снимка, если схема еще не актуальна
+    def _initialize(self):
+        conn = self._get_connection()
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SNAPSHOT_SCHEMA_VERSION:
+            conn.close()
+            return
+
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS modules (guid TEXT PRIMARY KEY, data TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS services (guid TEXT PRIMARY KEY, data TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS unit_files (path TEXT PRIMARY KEY, mtime REAL NOT NULL, data TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        ''')
+        conn.execute(f"PRAGMA user_version = {SNAPSHOT_SCHEMA_VERSION}")
+        conn.commit()
+        conn.close()
+    # чтение снимка, None если снимка еще нет
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            conn = self._get_connection()
+
+            meta = {row['key']: json.loads(row['value']) for row in conn.execute("SELECT key, value FROM meta")}
+            if "saved_at" not in meta:
+                conn.close()
+                return None
+
+            modules = [json.loads(row['data']) for row in conn.execute("SELECT data FROM modules")]
+            services = {row['guid']: json.loads(row['data']) for row in conn.execute("SELECT guid, data FROM services")}
+            unit_files = {
+                row['path']: {"mtime": row['mtime'], "info": json.loads(row['data'])}
+                for row in conn.execute("SELECT path, mtime, data FROM unit_files")
+            }
+            conn.close()
+
+            return {
+                "modules": modules,
+                "services": services,
+                "unit_files": unit_files,
+                "service_files": meta.get("service_files"),
+                "systemd_dir_mtime": meta.get("systemd_dir_mtime"),
+                "saved_at": meta["saved_at"]
+            }
+        except Exception as e:
+            self.logger.error(f"Ошибка при чтении снимка состояния {self.path}: {str(e)}")
+            return None
+    # запись снимка целиком в одной транзакции
+    def save(self, modules: List[Dict[str, Any]], services: Dict[str, Dict[str, Any]],
+             unit_files: Dict[str, Dict[str, Any]], service_files: Optional[List[str]],
+             systemd_dir_mtime: Optional[float]) -> bool:
+        try:
+            with self.lock:
+                conn = self._get_connection()
+                with conn:
+                    conn.execute("DELETE FROM modules")
+                    conn.execute("DELETE FROM services")
+                    conn.execute("DELETE FROM unit_files")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO modules (guid, data) VALUES (?, ?)",
+                        [(module.get("guid"), json.dumps(module)) for module in modules if module.get("guid")]
+                    )
+                    conn.executemany(
+                        "INSERT INTO services (guid, data) VALUES (?, ?)",
+                        [(guid, json.dumps(info)) for guid, info in services.items()]
+                    )
+                    conn.executemany(
+                        "INSERT INTO unit_files (path, mtime, data) VALUES (?, ?, ?)",
+                        [(path, entry["mtime"], json.dumps(entry["info"])) for path, entry in unit_files.items()]
+                    )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        [
+                            ("service_files", json.dumps(service_files)),
+                            ("systemd_dir_mtime", json.dumps(systemd_dir_mtime)),
+                            ("saved_at", json.dumps(time.time()))
+                        ]
+                    )
+                conn.close()
+            return True
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении снимка состояния {self.path}: {str(e)}")
+            return False
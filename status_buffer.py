@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from database import Database
+
+DEFAULT_WRITE_BEHIND_CONFIG = {
+    "enabled": False,
+    "flush_interval": 0.5,
+    "max_pending": 1000
+}
+
+# буфер статусов: последнее значение на guid, запись в бд одной транзакцией
+class StatusWriteBuffer:
+    def __init__(self, db: Database, flush_interval: float = 0.5, max_pending: int = 1000):
+        self.logger = logging.getLogger("SystemAPI.StatusBuffer")
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self.lock = threading.Lock()
+        self.pending: Dict[str, str] = {}
+        # пачка, которая пишется в бд прямо сейчас; читатели видят ее до фиксации транзакции
+        self.in_flight: Dict[str, str] = {}
+        self.flush_lock: Optional[asyncio.Lock] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.is_running = False
+    # положить статус в буфер, более новый статус заменяет старый
+    def put(self, guid: str, status: str):
+        with self.lock:
+            self.pending[guid] = status
+            size = len(self.pending)
+
+        if size >= self.max_pending and self.wakeup is not None:
+            self.wakeup.set()
+    # статус из буфера, если он еще не записан в бд
+    def get(self, guid: str) -> Optional[str]:
+        with self.lock:
+            status = self.pending.get(guid)
+            return status if status is not None else self.in_flight.get(guid)
+    # есть ли незаписанные статусы
+    def has_pending(self) -> bool:
+        with self.lock:
+            return bool(self.pending or self.in_flight)
+    # подстановка незаписанных статусов в модули, прочитанные из бд
+    def overlay(self, modules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            if not self.pending and not self.in_flight:
+                return modules
+            pending = dict(self.in_flight)
+            pending.update(self.pending)
+
+        for module in modules:
+            status = pending.get(module.get("guid"))
+            if status is not None:
+                module["status"] = status
+        return modules
+    # удаление статусов из буфера перед прямой записью в бд;
+    # если модуль есть в записываемой пачке, прямая запись ждет ее фиксации, чтобы старый статус ее не перезаписал
+    async def discard(self, guids: Iterable[str]):
+        guids = list(guids)
+        with self.lock:
+            for guid in guids:
+                self.pending.pop(guid, None)
+            conflict = any(guid in self.in_flight for guid in guids)
+
+        if not conflict or self.flush_lock is None:
+            return
+
+        async with self.flush_lock:
+            # после неудачной записи пачка возвращается в буфер
+            with self.lock:
+                for guid in guids:
+                    self.pending.pop(guid, None)
+    # запись всего буфера в бд одной транзакцией
+    async def flush(self):
+        if self.flush_lock is None:
+            self.flush_lock = asyncio.Lock()
+
+        async with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                batch = self.pending
+                self.in_flight = batch
+                self.pending = {}
+
+            updates = [{"guid": guid, "status": status} for guid, status in batch.items()]
+            loop = asyncio.get_running_loop()
+            try:
+                success, updated_count, _ = await loop.run_in_executor(None, self.db.update_modules_status, updates)
+            except Exception as e:
+                self.logger.error(f"Ошибка при записи буфера статусов: {str(e)}")
+                success, updated_count = False, 0
+
+            with self.lock:
+                self.in_flight = {}
+                if not success:
+                    for guid, status in batch.items():
+                        self.pending.setdefault(guid, status)
+
+            if success:
+                self.logger.debug(f"Записано статусов из буфера: {updated_count}")
+            else:
+                self.logger.error(f"Ошибка записи {len(batch)} статусов из буфера, статусы возвращены в буфер")
+    # фоновая запись по интервалу или по заполнению буфера
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        self.is_running = True
+
+        while self.is_running:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                self.logger.error(f"Ошибка при записи буфера статусов: {str(e)}")
+    # остановка с записью всех оставшихся статусов
+    async def stop(self):
+        self.is_running = False
+        if self.wakeup is not None:
+            self.wakeup.set()
+        await self.flush()
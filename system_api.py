@@ -1,150 +1,725 @@
-import sys
-import json
-import logging
-import uvicorn
-from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field
-
-from database import Database
-
-CONFIG_FILE = "config.json"
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("system_api.log"),
-        logging.StreamHandler()
-    ]
-)
-
-logger = logging.getLogger("SystemAPI")
-# чтение конфига
-def load_config():
-    try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.critical('Нет файла конфигурации')
-        sys.exit(1)
-        
-config = load_config()
-
-db = Database(config["database"]["path"])
-
-app = FastAPI(title="System API")
-templates = Jinja2Templates(directory="templates")
-
-class ModuleStatus(BaseModel):
-    status: str = Field(...)
-
-class ModuleBase(BaseModel):
-    guid: str = Field(...)
-    name: str = Field(...)
-    description: Optional[str] = Field("")
-    status: Optional[str] = Field("inactive")
-    service_type: str = Field(...)
-
-class ModuleCreate(ModuleBase):
-    pass
-
-class Module(ModuleBase):
-    pass
-
-class StatusResponse(BaseModel):
-    success: bool
-    updated_count: int
-    updated_modules: List[str] = []
-
-def get_db():
-    return db
-# главная страница
-@app.get("/")
-async def home(request: Request, db: Database = Depends(get_db)):
-    modules = db.get_modules()
-    return templates.TemplateResponse("dashboard.html", {"request": request, "modules": modules})
-# список модулей
-@app.get("/api/modules", response_model=List[Module])
-async def get_modules(db: Database = Depends(get_db)):
-    modules = db.get_modules()
-    logger.info(f"Получено {len(modules)} модулей")
-    return modules
-# получить модуль по ID 
-@app.get("/api/modules/{guid}", response_model=Module)
-async def get_module(guid: str, db: Database = Depends(get_db)):
-    module = db.get_module(guid)
-    if module:
-        return module
-    raise HTTPException(status_code=404, detail="Не найден модуль")
-# добавить новый модуль
-@app.post("/api/modules", response_model=Module)
-async def add_module(module: ModuleCreate, db: Database = Depends(get_db)):
-    existing_module = db.get_module(module.guid)
-    if existing_module:
-        raise HTTPException(status_code=409, detail="Такой модуль уже существует")
-    
-    module_dict = module.model_dump()
-    if db.add_module(module_dict):
-        logger.info(f"Добавлен новый модуль: {module_dict('name')} (GUID: {module_dict('guid')})")
-        return module_dict
-    else:
-        raise HTTPException(status_code=500, detail="Ошибка при добавлении модуля")
-# обновить параменты модуля
-@app.put("/api/modules/{guid}", response_model=Module)
-async def update_module(guid: str, module_update: dict, db: Database = Depends(get_db)):
-    existing_module = db.get_module(guid)
-    if not existing_module:
-        raise HTTPException(status_code=404, detail="Модуль не найден")
-    
-    if db.update_module(guid, module_update):
-        updated_module = db.get_module(guid)
-        logger.info(f"Обновленный модуль: {updated_module['name']} (GUID: {guid})")
-        return updated_module
-    else:
-        raise HTTPException(status_code=500, detail="Ошибка при обновлении модуля")
-# обновить статус модуля
-@app.put("/api/modules/{guid}/status", response_model=dict)
-async def update_module_status(guid: str, status_update: ModuleStatus, db: Database = Depends(get_db)):
-    status = status_update.status
-    
-    existing_module = db.get_module(guid)
-    if not existing_module:
-        raise HTTPException(status_code=404, detail="Модуль не найден")
-
-    if db.update_module_status(guid, status):
-        logger.info(f"Обновлен статус для: {existing_module['name']} (GUID: {guid}) - {status}")
-        return {"success": True}
-    else:
-        raise HTTPException(status_code=500, detail="Ошибка при обновлении статуса")
-# обновить все статусы модулей
-@app.put("/api/modules/statuses", response_model=StatusResponse)
-async def update_all_statuses(status_updates: List[Dict[str, Any]], db: Database = Depends(get_db)):
-    if not status_updates:
-        return {"success": True, "updated_count": 0, "updated_modules": []}
-    
-    success, updated_count, updated_modules = db.update_modules_status(status_updates)
-    
-    if success:
-        if updated_count > 0:
-            logger.info(f"Обновлены статусы для {updated_count} модулей: {', '.join(updated_modules)}")
-        return {"success": True, "updated_count": updated_count, "updated_modules": updated_modules}
-    else:
-        raise HTTPException(status_code=500, detail="Ошибка при обновлении статусов")
-# удлаить модуль
-@app.delete("/api/modules/{guid}", response_model=dict)
-async def delete_module(guid: str, db: Database = Depends(get_db)):
-    existing_module = db.get_module(guid)
-    if not existing_module:
-        raise HTTPException(status_code=404, detail="Модуль не найден")
-    
-    if db.delete_module(guid):
-        logger.info(f"Удаленный модуль: {existing_module['name']} (GUID: {guid})")
-        return {"success": True}
-    else:
-        raise HTTPException(status_code=500, detail="Ошибка при удалении модуля")
-
-if __name__ == "__main__":
-    logger.info("Starting System API server on http://0.0.0.0:8080")
-    uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info")
+import os
+import re
+import sys
+import json
+import hmac
+import time
+import uuid
+import shlex
+import asyncio
+import logging
+import multiprocessing
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from fastapi import FastAPI, HTTPException, Request, Depends, Header
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from database import Database, PAGE_SORT_FIELDS
+from status_buffer import StatusWriteBuffer, DEFAULT_WRITE_BEHIND_CONFIG
+from admission import AdmissionController, PRIORITIES
+from profiler import Profiler, PROFILE_MODES
+from tracing import Tracer, TRACEPARENT
+from journal_logs import LogStreamer, JournalError, parse_priority, unit_for_module
+from sharding import DEFAULT_SHARDING_CONFIG
+import response_formats
+import bulk_io
+
+CONFIG_FILE = os.environ.get("SYSTEM_API_CONFIG", "config.json")
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("system_api.log"),
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger("SystemAPI")
+# чтение конфига
+def load_config():
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.critical('Нет файла конфигурации')
+        sys.exit(1)
+        
+config = load_config()
+
+api_config = config.get("systemapi", {})
+history_config = config.get("status_history", {})
+db = Database(
+    config["database"]["path"],
+    {key: value for key, value in history_config.items() if key != "purge_interval"},
+    config["database"].get("busy_timeout", 5.0),
+    config["database"].get("journal_mode", "wal")
+)
+# число процессов System API: systemapi.workers, WEB_CONCURRENCY и -w/--workers из командной строки uvicorn/gunicorn
+def detect_worker_count(argv: List[str], environ: Dict[str, str]) -> int:
+    counts = [api_config.get("workers", 1), environ.get("WEB_CONCURRENCY") or 1]
+
+    args = list(argv[1:]) + shlex.split(environ.get("GUNICORN_CMD_ARGS", ""))
+    for position, arg in enumerate(args):
+        if arg in ("-w", "--workers") and position + 1 < len(args):
+            counts.append(args[position + 1])
+        elif arg.startswith("--workers="):
+            counts.append(arg.split("=", 1)[1])
+        elif arg.startswith("-w") and arg[2:].isdigit():
+            counts.append(arg[2:])
+
+    workers = 1
+    for count in counts:
+        try:
+            workers = max(workers, int(count))
+        except (TypeError, ValueError):
+            logger.warning(f"Некорректное число воркеров: {count}")
+
+    # uvicorn --workers запускает воркеры через multiprocessing
+    if workers == 1 and multiprocessing.parent_process() is not None:
+        workers = 2
+    return workers
+
+write_behind_config = dict(DEFAULT_WRITE_BEHIND_CONFIG)
+write_behind_config.update(config.get("write_behind", {}))
+status_buffer = None
+if write_behind_config["enabled"] and detect_worker_count(sys.argv, dict(os.environ)) > 1:
+    logger.warning("Отложенная запись статусов работает только с одним воркером и будет отключена")
+elif write_behind_config["enabled"]:
+    status_buffer = StatusWriteBuffer(
+        db,
+        write_behind_config["flush_interval"],
+        write_behind_config["max_pending"]
+    )
+tracer = Tracer(config.get("tracing", {}), "system_api")
+log_streamer = LogStreamer(config.get("logs", {}))
+profiling_config = config.get("profiling", {})
+profiler = Profiler(profiling_config, "system_api") if profiling_config.get("enabled") else None
+sharding_config = dict(DEFAULT_SHARDING_CONFIG)
+sharding_config.update(config.get("sharding", {}))
+dashboard_config = {"page_size": 100, "max_page_size": 500, "fragment_cache_size": 20000}
+dashboard_config.update(config.get("dashboard", {}))
+# периодическая очистка устаревшей истории статусов
+async def purge_status_history_loop():
+    interval = history_config.get("purge_interval", 3600)
+    while True:
+        await asyncio.get_running_loop().run_in_executor(None, db.purge_status_history)
+        await asyncio.sleep(interval)
+# распределение модулей по живым узлам вне цикла событий, min_interval > 0 - если другой воркер его еще не выполнил
+async def rebalance_nodes(min_interval: float = 0):
+    await asyncio.get_running_loop().run_in_executor(
+        None, db.rebalance_modules, sharding_config["heartbeat_timeout"], sharding_config["virtual_nodes"], min_interval
+    )
+# перераспределение модулей при истечении сигналов жизни узлов и назначение новых модулей;
+# цикл есть в каждом воркере, но за check_interval распределение выполняет только один из них
+async def rebalance_nodes_loop():
+    while True:
+        await rebalance_nodes(sharding_config["check_interval"] / 2)
+        await asyncio.sleep(sharding_config["check_interval"])
+# фоновые задачи на время работы приложения
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    purge_task = asyncio.create_task(purge_status_history_loop())
+    flush_task = asyncio.create_task(status_buffer.run()) if status_buffer else None
+    rebalance_task = asyncio.create_task(rebalance_nodes_loop()) if sharding_config["enabled"] else None
+    yield
+    purge_task.cancel()
+    if rebalance_task:
+        rebalance_task.cancel()
+    if status_buffer:
+        await status_buffer.stop()
+        await flush_task
+
+app = FastAPI(title="System API", lifespan=lifespan)
+templates = None
+# шаблоны страницы мониторинга, Jinja загружается при первом обращении к дашборду
+def get_templates():
+    global templates
+    if templates is None:
+        from fastapi.templating import Jinja2Templates
+        templates = Jinja2Templates(directory="templates")
+    return templates
+
+admission_config = config.get("admission", {})
+try:
+    admission = AdmissionController(admission_config) if admission_config.get("enabled") else None
+except ValueError as e:
+    logger.error(f"Некорректная секция admission в конфиге: {str(e)}")
+    raise
+# ограничение частоты и числа одновременных запросов, лишние отклоняются с 429
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    path = request.url.path
+    if admission is None or not (path == "/" or path.startswith("/api/")):
+        return await call_next(request)
+
+    route_class = admission.classify(request.method, path)
+    client = request.client.host if request.client else "unknown"
+
+    retry_after = admission.check_rate(route_class, client)
+    if retry_after is not None:
+        logger.warning(f"Превышен лимит запросов {route_class} для клиента {client}")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Слишком много запросов"},
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    if not await admission.limiter.acquire(PRIORITIES[route_class]):
+        logger.warning(f"Запрос {request.method} {path} от {client} отброшен: нет свободных слотов")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Сервер перегружен"},
+            headers={"Retry-After": "1"}
+        )
+
+    try:
+        return await call_next(request)
+    finally:
+        admission.limiter.release()
+# участок трассировки для запросов с заголовком traceparent (команды от ModuleManager)
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    traceparent = request.headers.get(TRACEPARENT)
+    if not tracer.enabled or not traceparent:
+        return await call_next(request)
+
+    # некорректный traceparent заменяется новой трассировкой
+    with tracer.span(f"{request.method} {request.url.path}", parent=traceparent, root=True) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
+class ModuleStatus(BaseModel):
+    status: str = Field(...)
+
+class ModuleBase(BaseModel):
+    guid: str = Field(...)
+    name: str = Field(...)
+    description: Optional[str] = Field("")
+    status: Optional[str] = Field("inactive")
+    service_type: str = Field(...)
+    health_check: Optional[Dict[str, Any]] = Field(None)
+
+class ModuleCreate(ModuleBase):
+    pass
+
+class Module(ModuleBase):
+    node: Optional[str] = Field(None)
+    pinned_node: Optional[str] = Field(None)
+
+class NodeAssignment(BaseModel):
+    node: Optional[str] = Field(None)
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+class ModuleSelector(BaseModel):
+    guids: Optional[List[str]] = Field(None)
+    service_type: Optional[str] = Field(None)
+    status: Optional[str] = Field(None)
+    name: Optional[str] = Field(None)
+
+class BulkAction(BaseModel):
+    action: str = Field(...)
+    selector: ModuleSelector = Field(...)
+
+class ProfileRequest(BaseModel):
+    mode: str = Field("cprofile")
+    duration: float = Field(30)
+    memory: bool = Field(False)
+
+class StatusResponse(BaseModel):
+    success: bool
+    updated_count: int
+    updated_modules: List[str] = []
+
+# закодированные ответы списка модулей: (формат, сжатие, узел) -> (версия данных, тело, сжатие);
+# узел приходит из запроса, поэтому размер ограничен и вытесняются давно не использованные
+modules_response_cache: "OrderedDict[Tuple[str, Optional[str], Optional[str]], Tuple[int, bytes, Optional[str]]]" = OrderedDict()
+# отрисованные строки таблицы дашборда: (guid, версия строки, статус) -> html, вытесняются давно не использованные
+row_fragment_cache: "OrderedDict[Tuple[str, int, str], str]" = OrderedDict()
+
+def get_db():
+    return db
+# доступ к служебным маршрутам только по токену администратора из конфига
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    admin_token = profiling_config.get("admin_token")
+    if not admin_token or not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+# список модулей в формате и со сжатием, которые запросил клиент
+def negotiated_response(request: Request, db: Database, node: Optional[str] = None) -> Response:
+    media_type = response_formats.negotiate_type(request.headers.get("accept"))
+    encoding = response_formats.negotiate_encoding(request.headers.get("accept-encoding"))
+    cache_key = (media_type, encoding, node)
+
+    version = db.get_data_version()
+    buffered = status_buffer is not None and status_buffer.has_pending()
+    cached = modules_response_cache.get(cache_key)
+
+    if cached and not buffered and version is not None and cached[0] == version:
+        modules_response_cache.move_to_end(cache_key)
+        _, body, used_encoding = cached
+    else:
+        modules = db.get_modules(node)
+        if status_buffer:
+            status_buffer.overlay(modules)
+        logger.info(f"Получено {len(modules)} модулей")
+
+        body = response_formats.encode_modules(modules, media_type)
+        min_size = api_config.get("compression_min_size", response_formats.DEFAULT_COMPRESSION_MIN_SIZE)
+        body, used_encoding = response_formats.compress(body, encoding, min_size)
+
+        if not buffered and version is not None:
+            modules_response_cache[cache_key] = (version, body, used_encoding)
+            modules_response_cache.move_to_end(cache_key)
+            if len(modules_response_cache) > api_config.get("response_cache_size", 64):
+                modules_response_cache.popitem(last=False)
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if used_encoding:
+        headers["Content-Encoding"] = used_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+# строка таблицы дашборда, повторно отрисовывается только после изменения модуля
+def render_row(module: Dict[str, Any]) -> str:
+    key = (module["guid"], module.get("version", 0), module["status"])
+    fragment = row_fragment_cache.get(key)
+    if fragment is not None:
+        row_fragment_cache.move_to_end(key)
+        return fragment
+
+    fragment = get_templates().get_template("module_row.html").render(module=module)
+    row_fragment_cache[key] = fragment
+    if len(row_fragment_cache) > dashboard_config["fragment_cache_size"]:
+        row_fragment_cache.popitem(last=False)
+    return fragment
+# главная страница, строки таблицы подгружаются страницами через /api/dashboard/rows
+@app.get("/")
+async def home(request: Request, q: Optional[str] = None):
+    return get_templates().TemplateResponse("dashboard.html", {
+        "request": request,
+        "query": q or "",
+        "page_size": dashboard_config["page_size"]
+    })
+# страница строк дашборда: сортировка, фильтр по статусам и поиск, без изменений данных ответ {"unchanged": true}
+@app.get("/api/dashboard/rows", response_model=dict)
+async def get_dashboard_rows(offset: int = 0, limit: Optional[int] = None, sort: str = "name", order: str = "asc",
+                             status: Optional[str] = None, q: Optional[str] = None, version: Optional[int] = None,
+                             db: Database = Depends(get_db)):
+    limit = limit or dashboard_config["page_size"]
+    if offset < 0 or limit < 1 or limit > dashboard_config["max_page_size"]:
+        raise HTTPException(status_code=400, detail=f"offset должен быть >= 0, limit от 1 до {dashboard_config['max_page_size']}")
+    if sort not in PAGE_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort должен быть одним из: {', '.join(PAGE_SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order должен быть asc или desc")
+
+    # итоги и фильтр по статусу считаются в бд, поэтому незаписанные статусы сначала записываются
+    if status_buffer and status_buffer.has_pending():
+        await status_buffer.flush()
+
+    data_version = db.get_data_version()
+    buffered = status_buffer is not None and status_buffer.has_pending()
+    if version is not None and version == data_version and not buffered:
+        return {"unchanged": True, "version": data_version}
+
+    statuses = [value for value in status.split(",") if value] if status else None
+    page = db.get_modules_page(offset, limit, sort, order == "desc", statuses, q)
+    if page is None:
+        raise HTTPException(status_code=500, detail="Ошибка при получении модулей")
+
+    total, modules = page
+    if status_buffer:
+        status_buffer.overlay(modules)
+
+    return {
+        "unchanged": False,
+        "version": None if buffered else data_version,
+        "total": total,
+        "offset": offset,
+        "rows": [render_row(module) for module in modules]
+    }
+# список модулей, с node - только модули этого узла
+@app.get("/api/modules", response_model=List[Module])
+async def get_modules(request: Request, node: Optional[str] = None, db: Database = Depends(get_db)):
+    return negotiated_response(request, db, node)
+# число модулей по статусам и типам сервисов
+@app.get("/api/modules/summary", response_model=dict)
+async def get_modules_summary(db: Database = Depends(get_db)):
+    # счетчики module_counts меняются только при записи в бд
+    if status_buffer and status_buffer.has_pending():
+        await status_buffer.flush()
+
+    summary = db.get_modules_summary()
+    if summary is None:
+        raise HTTPException(status_code=500, detail="Ошибка при получении сводки модулей")
+    return summary
+# поиск модулей по названию и описанию
+@app.get("/api/modules/search", response_model=List[Module])
+async def search_modules(q: str, limit: int = 20, db: Database = Depends(get_db)):
+    if limit < 1 or limit > 1000:
+        raise HTTPException(status_code=400, detail="limit должен быть от 1 до 1000")
+
+    modules = db.search_modules(q, limit)
+    if status_buffer:
+        status_buffer.overlay(modules)
+    return modules
+# импорт модулей из NDJSON или CSV одной транзакцией, существующие модули обновляются
+@app.post("/api/modules/bulk", response_model=dict)
+async def import_modules(request: Request, format: Optional[str] = None, db: Database = Depends(get_db)):
+    import_format = bulk_io.detect_format(format or request.headers.get("content-type"))
+    if import_format is None:
+        raise HTTPException(status_code=415, detail="Ожидается NDJSON (application/x-ndjson) или CSV (text/csv)")
+
+    lines = bulk_io.iter_lines(request.stream())
+    rows = bulk_io.iter_ndjson_rows(lines) if import_format == "ndjson" else bulk_io.iter_csv_rows(lines)
+
+    results = []
+    modules = []
+    async for line_number, row in rows:
+        if isinstance(row, str):
+            results.append({"line": line_number, "result": "error", "error": row})
+            continue
+        try:
+            module = ModuleCreate.model_validate(row).model_dump()
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in e.errors())
+            results.append({"line": line_number, "guid": row.get("guid"), "result": "error", "error": error})
+            continue
+        modules.append(module)
+        results.append({"line": line_number, "guid": module["guid"], "result": None})
+
+    inserted = []
+    if modules:
+        if status_buffer:
+            await status_buffer.discard(module["guid"] for module in modules)
+
+        loop = asyncio.get_running_loop()
+        success, inserted = await loop.run_in_executor(None, db.upsert_modules, modules)
+        if not success:
+            raise HTTPException(status_code=500, detail="Ошибка при импорте модулей")
+        if inserted and sharding_config["enabled"]:
+            await rebalance_nodes()
+
+    new_guids = set(inserted)
+    for result in results:
+        if result["result"] is None:
+            if result["guid"] in new_guids:
+                result["result"] = "inserted"
+                new_guids.discard(result["guid"])
+            else:
+                result["result"] = "updated"
+
+    failed = len(results) - len(modules)
+    logger.info(f"Импорт модулей: новых {len(inserted)}, обновлено {len(modules) - len(inserted)}, ошибок {failed}")
+    return {
+        "success": failed == 0,
+        "inserted": len(inserted),
+        "updated": len(modules) - len(inserted),
+        "failed": failed,
+        "results": results
+    }
+# экспорт всех модулей в NDJSON или CSV потоком
+@app.get("/api/modules/export")
+async def export_modules(format: str = "ndjson", db: Database = Depends(get_db)):
+    export_format = bulk_io.detect_format(format)
+    if export_format is None:
+        raise HTTPException(status_code=400, detail="Формат экспорта: ndjson или csv")
+
+    if export_format == "ndjson":
+        body = bulk_io.export_ndjson(db.iter_modules())
+        media_type = bulk_io.NDJSON_TYPE
+    else:
+        body = bulk_io.export_csv(db.iter_modules())
+        media_type = bulk_io.CSV_TYPE
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=modules.{export_format}"}
+    )
+# публикация сообщений в MQTT одним подключением
+async def publish_mqtt(messages: List[Dict[str, Any]]):
+    import paho.mqtt.publish as mqtt_publish
+
+    mqtt_config = config.get("mqtt", {})
+    auth = None
+    if mqtt_config.get("username") and mqtt_config.get("password"):
+        auth = {"username": mqtt_config["username"], "password": mqtt_config["password"]}
+
+    await asyncio.get_running_loop().run_in_executor(None, lambda: mqtt_publish.multiple(
+        messages,
+        hostname=mqtt_config.get("broker", "localhost"),
+        port=int(mqtt_config.get("port", 1883)),
+        auth=auth
+    ))
+# топики команды: общий или, при шардировании, отдельный для каждого живого узла
+def command_topics(command: str) -> List[str]:
+    prefix = config.get("mqtt", {}).get("topic_prefix")
+    if not sharding_config["enabled"]:
+        return [f"{prefix}/command/{command}"]
+
+    nodes = db.get_nodes(sharding_config["heartbeat_timeout"])
+    return [f"{prefix}/nodes/{node['node_id']}/command/{command}" for node in nodes if node["alive"]]
+# групповой запуск\остановка\перезапуск модулей по селектору через ModuleManager
+@app.post("/api/modules/actions", response_model=dict, status_code=202)
+async def bulk_action(bulk: BulkAction):
+    if bulk.action not in ("start", "stop", "restart"):
+        raise HTTPException(status_code=400, detail="action: start, stop или restart")
+
+    # пустые строки и списки не ограничивают выборку, как и в ModuleManager.run_bulk_action
+    selector = {key: value for key, value in bulk.selector.model_dump().items() if value}
+    if not selector:
+        raise HTTPException(status_code=400, detail="Пустой селектор модулей")
+
+    request_id = str(uuid.uuid4())
+    payload = {"action": bulk.action, "selector": selector, "request_id": request_id}
+
+    try:
+        with tracer.span("mqtt publish bulk_action", {"request_id": request_id}, root=True) as span:
+            if span.traceparent:
+                payload[TRACEPARENT] = span.traceparent
+                payload["sent_at"] = time.time()
+            body = json.dumps(payload)
+            await publish_mqtt([{"topic": topic, "payload": body} for topic in command_topics("bulk_action")])
+    except Exception as e:
+        logger.error(f"Ошибка при отправке групповой команды: {str(e)}")
+        raise HTTPException(status_code=503, detail="MQTT брокер недоступен")
+
+    logger.info(f"Отправлена групповая команда {bulk.action} для {selector} (request_id: {request_id})")
+    return {"accepted": True, "request_id": request_id}
+# обновить все статусы модулей
+@app.put("/api/modules/statuses", response_model=StatusResponse)
+async def update_all_statuses(status_updates: List[Dict[str, Any]], db: Database = Depends(get_db)):
+    if not status_updates:
+        return {"success": True, "updated_count": 0, "updated_modules": []}
+
+    if status_buffer:
+        await status_buffer.discard(update.get('guid') for update in status_updates)
+    
+    with tracer.span("db.update_modules_status", {"modules": len(status_updates)}):
+        success, updated_count, updated_modules = db.update_modules_status(status_updates)
+    
+    if success:
+        if updated_count > 0:
+            logger.info(f"Обновлены статусы для {updated_count} модулей: {', '.join(updated_modules)}")
+        return {"success": True, "updated_count": updated_count, "updated_modules": updated_modules}
+    else:
+        raise HTTPException(status_code=500, detail="Ошибка при обновлении статусов")
+# получить модуль по ID 
+@app.get("/api/modules/{guid}", response_model=Module)
+async def get_module(guid: str, db: Database = Depends(get_db)):
+    module = db.get_module(guid)
+    if module:
+        if status_buffer:
+            status_buffer.overlay([module])
+        return module
+    raise HTTPException(status_code=404, detail="Не найден модуль")
+# добавить новый модуль
+@app.post("/api/modules", response_model=Module)
+async def add_module(module: ModuleCreate, db: Database = Depends(get_db)):
+    existing_module = db.get_module(module.guid)
+    if existing_module:
+        raise HTTPException(status_code=409, detail="Такой модуль уже существует")
+    
+    module_dict = module.model_dump()
+    if db.add_module(module_dict):
+        logger.info(f"Добавлен новый модуль: {module_dict['name']} (GUID: {module_dict['guid']})")
+        # новый модуль сразу назначается узлу, чтобы команда create дошла до владельца
+        if sharding_config["enabled"]:
+            await rebalance_nodes()
+        return module_dict
+    else:
+        raise HTTPException(status_code=500, detail="Ошибка при добавлении модуля")
+# обновить параменты модуля
+@app.put("/api/modules/{guid}", response_model=Module)
+async def update_module(guid: str, module_update: dict, db: Database = Depends(get_db)):
+    existing_module = db.get_module(guid)
+    if not existing_module:
+        raise HTTPException(status_code=404, detail="Модуль не найден")
+
+    if status_buffer and 'status' in module_update:
+        await status_buffer.discard([guid])
+    
+    if db.update_module(guid, module_update):
+        updated_module = db.get_module(guid)
+        logger.info(f"Обновленный модуль: {updated_module['name']} (GUID: {guid})")
+        return updated_module
+    else:
+        raise HTTPException(status_code=500, detail="Ошибка при обновлении модуля")
+# обновить статус модуля
+@app.put("/api/modules/{guid}/status", response_model=dict)
+async def update_module_status(guid: str, status_update: ModuleStatus, db: Database = Depends(get_db)):
+    status = status_update.status
+    
+    with tracer.span("db.get_module"):
+        existing_module = db.get_module(guid)
+    if not existing_module:
+        raise HTTPException(status_code=404, detail="Модуль не найден")
+
+    if status_buffer:
+        with tracer.span("status_buffer.put"):
+            status_buffer.put(guid, status)
+        return {"success": True}
+
+    with tracer.span("db.update_module_status", {"module.status": status}):
+        updated = db.update_module_status(guid, status)
+    if updated:
+        logger.info(f"Обновлен статус для: {existing_module['name']} (GUID: {guid}) - {status}")
+        return {"success": True}
+    else:
+        raise HTTPException(status_code=500, detail="Ошибка при обновлении статуса")
+# закрепить модуль за узлом или вернуть распределение по кольцу (node = null)
+@app.put("/api/modules/{guid}/node", response_model=Module)
+async def assign_module_node(guid: str, assignment: NodeAssignment, db: Database = Depends(get_db)):
+    if not db.set_module_node(guid, assignment.node):
+        raise HTTPException(status_code=404, detail="Модуль не найден")
+
+    if sharding_config["enabled"]:
+        await rebalance_nodes()
+    return db.get_module(guid)
+# время работы модуля за окно (например 24h, 7d)
+@app.get("/api/modules/{guid}/uptime", response_model=dict)
+async def get_module_uptime(guid: str, window: str = "24h", db: Database = Depends(get_db)):
+    unit = window[-1:]
+    if unit not in WINDOW_UNITS or not window[:-1].isdigit() or int(window[:-1]) <= 0:
+        raise HTTPException(status_code=400, detail="Неверное окно, ожидается например 90m, 24h, 7d, 2w")
+
+    uptime = db.get_module_uptime(guid, int(window[:-1]) * WINDOW_UNITS[unit])
+    if uptime is None:
+        raise HTTPException(status_code=404, detail="Модуль не найден")
+    uptime["window"] = window
+    return uptime
+# журнал сервиса модуля в NDJSON: история по курсору и фильтрам, при follow новые записи по мере появления
+@app.get("/api/modules/{guid}/logs")
+async def get_module_logs(guid: str, follow: bool = False, cursor: Optional[str] = None,
+                          priority: Optional[str] = None, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None, limit: Optional[int] = None,
+                          grep: Optional[str] = None, db: Database = Depends(get_db)):
+    module = db.get_module(guid)
+    if not module:
+        raise HTTPException(status_code=404, detail="Модуль не найден")
+
+    max_priority = parse_priority(priority)
+    if priority and max_priority is None:
+        raise HTTPException(status_code=400, detail="priority: число 0-7 или emerg, alert, crit, err, warning, notice, info, debug")
+    if follow and until:
+        raise HTTPException(status_code=400, detail="until нельзя использовать вместе с follow")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit должен быть больше 0")
+    if grep:
+        try:
+            re.compile(grep)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"grep: некорректное регулярное выражение: {str(e)}")
+
+    unit = unit_for_module(module["name"])
+
+    # история читается до ответа: недоступный журнал - это 503, а не пустой ответ 200
+    try:
+        stream = await log_streamer.open(
+            unit, cursor,
+            since.timestamp() if since else None,
+            until.timestamp() if until else None,
+            max_priority, follow, limit, grep
+        )
+    except JournalError as e:
+        logger.error(f"Журнал {unit} недоступен: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Журнал недоступен: {str(e)}")
+
+    async def entries():
+        try:
+            async for entry in stream:
+                yield (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        except Exception as e:
+            logger.error(f"Ошибка при чтении журнала {unit}: {str(e)}")
+            yield (json.dumps({"error": str(e)}, ensure_ascii=False) + "\n").encode("utf-8")
+
+    return StreamingResponse(
+        entries(),
+        media_type=bulk_io.NDJSON_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+# удлаить модуль
+@app.delete("/api/modules/{guid}", response_model=dict)
+async def delete_module(guid: str, db: Database = Depends(get_db)):
+    existing_module = db.get_module(guid)
+    if not existing_module:
+        raise HTTPException(status_code=404, detail="Модуль не найден")
+
+    if status_buffer:
+        await status_buffer.discard([guid])
+    
+    if db.delete_module(guid):
+        logger.info(f"Удаленный модуль: {existing_module['name']} (GUID: {guid})")
+
+        # при шардировании менеджер не отличает удаленный модуль от переехавшего, сохраненный статус очищает API
+        if sharding_config["enabled"]:
+            prefix = config.get("mqtt", {}).get("topic_prefix")
+            try:
+                await publish_mqtt([{"topic": f"{prefix}/status/{guid}", "payload": b"", "qos": 1, "retain": True}])
+            except Exception as e:
+                logger.warning(f"Не удалось очистить статус модуля {guid} в MQTT: {str(e)}")
+        return {"success": True}
+    else:
+        raise HTTPException(status_code=500, detail="Ошибка при удалении модуля")
+# сигнал жизни ModuleManager, в ответе версия распределения модулей по узлам
+@app.put("/api/nodes/{node_id}/heartbeat", response_model=dict)
+async def node_heartbeat(node_id: str, db: Database = Depends(get_db)):
+    if not sharding_config["enabled"]:
+        raise HTTPException(status_code=404, detail="Шардирование отключено в конфиге")
+
+    version, joined = db.node_heartbeat(node_id, sharding_config["heartbeat_timeout"])
+    if version is None:
+        raise HTTPException(status_code=500, detail="Ошибка при обработке сигнала жизни")
+
+    if joined:
+        await rebalance_nodes()
+        version, _ = db.node_heartbeat(node_id, sharding_config["heartbeat_timeout"])
+    return {
+        "node_id": node_id,
+        "assignment_version": version,
+        "nodes": db.get_alive_nodes(sharding_config["heartbeat_timeout"])
+    }
+# узлы ModuleManager и число их модулей
+@app.get("/api/nodes", response_model=List[dict])
+async def get_nodes(db: Database = Depends(get_db)):
+    return db.get_nodes(sharding_config["heartbeat_timeout"])
+# запуск профилирования процесса API на ограниченное время
+@app.post("/api/admin/profile", response_model=dict, dependencies=[Depends(require_admin)])
+async def start_profiling(profile_request: ProfileRequest):
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Профилирование отключено в конфиге")
+    if profile_request.mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode должен быть одним из {', '.join(PROFILE_MODES)}")
+
+    if not profiler.start(profile_request.mode, profile_request.duration, profile_request.memory):
+        raise HTTPException(status_code=409, detail="Профилирование уже запущено")
+
+    # cProfile работает в потоке цикла событий: включается здесь и выключается по таймеру цикла
+    if profile_request.mode == "cprofile":
+        profiler.checkpoint()
+        asyncio.get_running_loop().call_later(profiler.status()["remaining"] + 0.1, profiler.checkpoint)
+
+    return profiler.status()
+# состояние профилирования и файлы последнего запуска
+@app.get("/api/admin/profile", response_model=dict, dependencies=[Depends(require_admin)])
+async def get_profiling_status():
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Профилирование отключено в конфиге")
+    return profiler.status()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    host = api_config.get("host", "0.0.0.0")
+    port = int(api_config.get("port", 8080))
+    workers = int(api_config.get("workers", 1))
+
+    logger.info(f"Starting System API server on http://{host}:{port} (workers: {workers})")
+    if workers > 1:
+        uvicorn.run("system_api:app", host=host, port=port, workers=workers, log_level="info")
+    else:
+        uvicorn.run(app, host=host, port=port, log_level="info")
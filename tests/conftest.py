@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+import importlib
+
+import pytest
+
+# модули проекта лежат в корне репозитория
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# импорт system_api с отдельным конфигом и бд во временной директории
+@pytest.fixture
+def load_system_api(tmp_path, monkeypatch):
+    def load(**sections):
+        config = {
+            "systemapi": {"base_url": "http://testserver"},
+            "database": {"path": str(tmp_path / "modules.db")},
+            "mqtt": {"broker": "localhost", "port": 1883, "topic_prefix": "module_manager"}
+        }
+        config.update(sections)
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(config))
+        monkeypatch.setenv("SYSTEM_API_CONFIG", str(config_path))
+        # лог и шаблоны ищутся относительно рабочей директории
+        if not (tmp_path / "templates").exists():
+            (tmp_path / "templates").symlink_to(os.path.join(ROOT, "templates"))
+        monkeypatch.chdir(tmp_path)
+
+        sys.modules.pop("system_api", None)
+        return importlib.import_module("system_api")
+
+    yield load
+    sys.modules.pop("system_api", None)
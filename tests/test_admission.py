@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from admission import AdmissionController, ConcurrencyLimiter, PRIORITIES
+
+
+def test_classify_status_routes():
+    admission = AdmissionController()
+    assert admission.classify("PUT", "/api/modules/g1/status") == "status_write"
+    assert admission.classify("PUT", "/api/modules/statuses") == "status_write"
+    assert admission.classify("PUT", "/api/nodes/node-a/heartbeat") == "status_write"
+    assert admission.classify("PUT", "/api/modules/g1") == "write"
+    assert admission.classify("PUT", "/api/modules/g1/status/extra/status") == "write"
+    assert admission.classify("GET", "/api/modules") == "bulk_read"
+
+
+@pytest.mark.parametrize("config", [
+    {"route_limits": {"read": {"rate": 0, "burst": 10}}},
+    {"route_limits": {"status_write": None}},
+    {"route_limits": {"unknown": {"rate": 1, "burst": 1}}},
+    {"client_limits": {"rate": 10}},
+    {"status_client_limits": {"rate": "fast", "burst": 10}},
+    {"max_concurrent": 0}
+])
+def test_invalid_limits_are_rejected_at_load(config):
+    with pytest.raises(ValueError):
+        AdmissionController(config)
+
+
+def test_status_writes_have_their_own_client_limit():
+    admission = AdmissionController({
+        "client_limits": {"rate": 0.01, "burst": 2},
+        "status_client_limits": {"rate": 0.01, "burst": 3}
+    })
+
+    assert [admission.check_rate("read", "10.0.0.1") for _ in range(3)] == [None, None, 100]
+    # чтения клиента исчерпали его ведро, но статусы идут по своему
+    assert [admission.check_rate("status_write", "10.0.0.1") for _ in range(4)] == [None, None, None, 100]
+    assert admission.check_rate("status_write", "10.0.0.2") is None
+
+
+def test_rate_limited_request_gets_429_with_retry_after(load_system_api):
+    system_api = load_system_api(admission={"enabled": True, "client_limits": {"rate": 0.5, "burst": 2}})
+    client = TestClient(system_api.app)
+
+    codes = [client.get("/api/modules/summary").status_code for _ in range(2)]
+    response = client.get("/api/modules/summary")
+
+    assert codes == [200, 200]
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_full_queue_rejects_equal_or_lower_priority():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, 1, 1.0)
+        assert await limiter.acquire(PRIORITIES["read"])
+        queued = asyncio.create_task(limiter.acquire(PRIORITIES["read"]))
+        await asyncio.sleep(0)
+
+        assert await limiter.acquire(PRIORITIES["bulk_read"]) is False
+        assert await limiter.acquire(PRIORITIES["read"]) is False
+
+        limiter.release()
+        assert await queued
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_rejects_waiter():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, 4, 0.05)
+        assert await limiter.acquire(PRIORITIES["write"])
+        assert await limiter.acquire(PRIORITIES["write"]) is False
+        assert limiter.waiters == []
+
+    asyncio.run(scenario())
+
+
+def test_status_writes_are_shed_after_bulk_reads():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, 2, 1.0)
+        assert await limiter.acquire(PRIORITIES["read"])
+        bulk = [asyncio.create_task(limiter.acquire(PRIORITIES["bulk_read"])) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # очередь полна: статус вытесняет массовое чтение, а не отбрасывается сам
+        status = asyncio.create_task(limiter.acquire(PRIORITIES["status_write"]))
+        assert await bulk[1] is False
+
+        limiter.release()
+        assert await status
+        assert not bulk[0].done()
+
+        limiter.release()
+        assert await bulk[0]
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+import argparse
+
+import pytest
+
+import benchmark
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert benchmark.percentile(values, 50) == 50
+    assert benchmark.percentile(values, 95) == 95
+    assert benchmark.percentile(values, 99) == 99
+    assert benchmark.percentile(values, 100) == 100
+
+
+def test_percentile_edge_cases():
+    assert benchmark.percentile([], 50) is None
+    assert benchmark.percentile([7.5], 99) == 7.5
+    assert benchmark.percentile([3, 1, 2], 0) == 1
+    assert benchmark.percentile([3, 1, 2], 50) == 2
+
+
+def test_parse_mix():
+    assert benchmark.parse_mix("start=40,stop=40,create=10") == {"start": 40.0, "stop": 40.0, "create": 10.0}
+    assert benchmark.parse_mix("restart") == {"restart": 1.0}
+
+
+@pytest.mark.parametrize("value", ["unknown=1", "start=abc", "start=-1", "start=0,stop=0"])
+def test_parse_mix_rejects_invalid_values(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        benchmark.parse_mix(value)
@@ -0,0 +1,123 @@
+import json
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import module_manager
+from module_manager import ModuleManager
+from tracing import Tracer
+
+
+@pytest.fixture
+def api(load_system_api, monkeypatch):
+    system_api = load_system_api()
+    published = []
+
+    async def publish_mqtt(messages):
+        published.extend(messages)
+
+    monkeypatch.setattr(system_api, "publish_mqtt", publish_mqtt)
+    system_api.published = published
+    return system_api
+
+
+@pytest.mark.parametrize("selector", [{}, {"guids": None, "status": None}, {"guids": [], "status": ""}])
+def test_empty_selector_is_rejected(api, selector):
+    response = TestClient(api.app).post("/api/modules/actions", json={"action": "stop", "selector": selector})
+    assert response.status_code == 400
+    assert api.published == []
+
+
+def test_unknown_action_is_rejected(api):
+    response = TestClient(api.app).post("/api/modules/actions", json={"action": "kill", "selector": {"status": "failed"}})
+    assert response.status_code == 400
+
+
+def test_bulk_action_is_published_with_selector(api):
+    response = TestClient(api.app).post(
+        "/api/modules/actions", json={"action": "restart", "selector": {"status": "failed", "service_type": "camera"}}
+    )
+
+    assert response.status_code == 202
+    request_id = response.json()["request_id"]
+    assert [message["topic"] for message in api.published] == ["module_manager/command/bulk_action"]
+    assert json.loads(api.published[0]["payload"]) == {
+        "action": "restart", "selector": {"status": "failed", "service_type": "camera"}, "request_id": request_id
+    }
+
+
+class FakeMqtt:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.published.append((topic, json.loads(payload)))
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ModuleManager.__new__(ModuleManager)
+    manager.logger = module_manager.logging.getLogger("test")
+    manager.mqtt_topic_prefix = "module_manager"
+    manager.mqtt_client = FakeMqtt()
+    manager.tracer = Tracer({"enabled": False})
+    manager.restart_policy = None
+    manager.modules = [
+        {"guid": "g1", "name": "cam-front", "status": "failed", "service_type": "camera"},
+        {"guid": "g2", "name": "cam-back", "status": "failed", "service_type": "camera"},
+        {"guid": "g3", "name": "gateway", "status": "failed", "service_type": "gateway"},
+        {"guid": "g4", "name": "cam-side", "status": "active", "service_type": "camera"},
+        {"guid": "g5", "name": "cam-new", "status": "failed", "service_type": "camera"}
+    ]
+    manager.module_services = {
+        guid: {"systemd_service": f"{guid}.service", "status": "failed"} for guid in ("g1", "g2", "g3", "g4")
+    }
+    manager.status_updates = []
+    monkeypatch.setattr(manager, "_update_modules_status", manager.status_updates.append)
+    return manager
+
+
+def guids(modules):
+    return [module["guid"] for module in modules]
+
+
+def test_select_modules_by_selector(manager):
+    assert guids(manager.select_modules({"status": "failed"})) == ["g1", "g2", "g3", "g5"]
+    assert guids(manager.select_modules({"service_type": "camera", "status": "failed"})) == ["g1", "g2", "g5"]
+    assert guids(manager.select_modules({"name": "cam-*", "status": "active"})) == ["g4"]
+    assert guids(manager.select_modules({"guids": ["g3", "g4"], "service_type": "camera"})) == ["g4"]
+
+
+def test_bulk_action_reports_result_per_module(manager, monkeypatch):
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        if args[:2] == ["systemctl", "is-active"]:
+            # g2 не поднялся после перезапуска
+            states = {"g1.service": "active", "g2.service": "failed"}
+            return SimpleNamespace(returncode=3, stdout="\n".join(states[unit] for unit in args[2:]), stderr="")
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+    monkeypatch.setattr(module_manager.subprocess, "run", run)
+    manager.run_bulk_action({
+        "action": "restart", "selector": {"service_type": "camera", "status": "failed"}, "request_id": "r1"
+    })
+
+    assert calls[0] == ["sudo", "systemctl", "restart", "g1.service", "g2.service"]
+    topic, summary = manager.mqtt_client.published[0]
+    assert topic == "module_manager/bulk_action/result"
+    assert summary["request_id"] == "r1"
+    assert summary["matched"] == 3
+    assert summary["succeeded"] == ["g1"]
+    assert list(summary["failed"]) == ["g2"]
+    assert summary["skipped"] == ["g5"]
+    assert manager.status_updates == [{"g1": "active", "g2": "failed"}]
+
+
+def test_bulk_action_ignores_empty_selector(manager, monkeypatch):
+    monkeypatch.setattr(module_manager.subprocess, "run", pytest.fail)
+    manager.run_bulk_action({"action": "stop", "selector": {"status": ""}})
+    assert manager.mqtt_client.published == []
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+
+def ndjson(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def module(i, **fields):
+    row = {"guid": f"g{i:05d}", "name": f"module-{i}", "service_type": "dummy_service"}
+    row.update(fields)
+    return row
+
+
+def test_import_ndjson_reports_each_line(load_system_api):
+    system_api = load_system_api()
+    client = TestClient(system_api.app)
+    system_api.db.add_module(module(1))
+
+    body = ndjson([module(1, name="renamed"), module(2)]) + "not json\n" + ndjson([{"guid": "g3"}])
+    response = client.post("/api/modules/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    result = response.json()
+    assert response.status_code == 200
+    assert (result["inserted"], result["updated"], result["failed"]) == (1, 1, 2)
+    assert [(item["line"], item["result"]) for item in result["results"]] == [
+        (1, "updated"), (2, "inserted"), (3, "error"), (4, "error")
+    ]
+    assert system_api.db.get_module("g00001")["name"] == "renamed"
+
+
+def test_import_csv_with_quoted_newline(load_system_api):
+    system_api = load_system_api()
+    client = TestClient(system_api.app)
+
+    body = 'guid,name,description,service_type\ng1,alpha,"first\nsecond",dummy_service\n'
+    response = client.post("/api/modules/bulk?format=csv", content=body)
+
+    assert response.json()["inserted"] == 1
+    assert system_api.db.get_module("g1")["description"] == "first\nsecond"
+
+
+def test_import_rejects_unknown_format(load_system_api):
+    client = TestClient(load_system_api().app)
+    response = client.post("/api/modules/bulk", content="x", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_export_round_trip(load_system_api):
+    system_api = load_system_api()
+    client = TestClient(system_api.app)
+    system_api.db.upsert_modules([module(i, health_check={"type": "tcp", "port": 80}) for i in range(3)])
+
+    rows = [json.loads(line) for line in client.get("/api/modules/export").text.splitlines()]
+    assert [row["guid"] for row in rows] == ["g00000", "g00001", "g00002"]
+    assert rows[0]["health_check"] == {"type": "tcp", "port": 80}
+
+    records = list(csv.DictReader(io.StringIO(client.get("/api/modules/export?format=csv").text)))
+    assert [record["guid"] for record in records] == ["g00000", "g00001", "g00002"]
+    assert json.loads(records[0]["health_check"]) == {"type": "tcp", "port": 80}
+
+
+def test_concurrent_exports(load_system_api):
+    system_api = load_system_api()
+    system_api.db.upsert_modules([module(i) for i in range(2500)])
+
+    # тело экспорта читается из пула потоков, запросы идут одновременно
+    async def export_all():
+        transport = httpx.ASGITransport(app=system_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await asyncio.gather(*(client.get("/api/modules/export") for _ in range(20)))
+
+    responses = asyncio.run(export_all())
+
+    for response in responses:
+        assert response.status_code == 200
+        assert len(response.text.splitlines()) == 2500
@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def api(load_system_api):
+    system_api = load_system_api(dashboard={"page_size": 2, "max_page_size": 3})
+    for guid, name, status in [("g1", "charlie", "active"), ("g2", "alpha", "failed"), ("g3", "bravo", "active")]:
+        assert system_api.db.add_module({"guid": guid, "name": name, "status": status, "service_type": "dummy_service"})
+    return system_api
+
+
+def row_guids(page):
+    return [row.split('data-guid="', 1)[1].split('"', 1)[0] for row in page["rows"]]
+
+
+def test_rows_are_paged_sorted_and_filtered(api):
+    client = TestClient(api.app)
+
+    page = client.get("/api/dashboard/rows").json()
+    assert (page["total"], row_guids(page)) == (3, ["g2", "g3"])
+
+    page = client.get("/api/dashboard/rows", params={"offset": 2}).json()
+    assert row_guids(page) == ["g1"]
+
+    page = client.get("/api/dashboard/rows", params={"sort": "name", "order": "desc", "limit": 3}).json()
+    assert row_guids(page) == ["g1", "g3", "g2"]
+
+    page = client.get("/api/dashboard/rows", params={"status": "active", "limit": 3}).json()
+    assert (page["total"], row_guids(page)) == (2, ["g3", "g1"])
+
+    page = client.get("/api/dashboard/rows", params={"q": "brav"}).json()
+    assert (page["total"], row_guids(page)) == (1, ["g3"])
+
+
+@pytest.mark.parametrize("params", [
+    {"sort": "description"}, {"sort": "name; DROP TABLE modules"}, {"order": "up"}, {"limit": 4}, {"offset": -1}
+])
+def test_invalid_parameters_are_rejected(api, params):
+    response = TestClient(api.app).get("/api/dashboard/rows", params=params)
+    assert response.status_code == 400
+
+
+def test_unchanged_until_data_version_changes(api):
+    client = TestClient(api.app)
+    version = client.get("/api/dashboard/rows").json()["version"]
+
+    assert client.get("/api/dashboard/rows", params={"version": version}).json() == {"unchanged": True, "version": version}
+
+    assert api.db.update_module("g2", {"status": "active"})
+    page = client.get("/api/dashboard/rows", params={"version": version}).json()
+    assert page["unchanged"] is False
+    assert page["version"] != version
+
+
+def test_rendered_rows_are_cached_until_module_changes(api, monkeypatch):
+    client = TestClient(api.app)
+    template = api.get_templates().get_template("module_row.html")
+    rendered = []
+    original_render = template.render
+
+    def render(**context):
+        rendered.append(context["module"]["guid"])
+        return original_render(**context)
+
+    monkeypatch.setattr(template, "render", render)
+    client.get("/api/dashboard/rows", params={"limit": 3})
+    client.get("/api/dashboard/rows", params={"limit": 3})
+    assert sorted(rendered) == ["g1", "g2", "g3"]
+
+    assert api.db.update_module("g2", {"status": "active"})
+    page = client.get("/api/dashboard/rows", params={"limit": 3}).json()
+    assert sorted(rendered) == ["g1", "g2", "g2", "g3"]
+    assert "status-active" in page["rows"][0]
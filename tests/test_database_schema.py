@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+import database
+
+
+def schema(path):
+    conn = sqlite3.connect(path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(modules)")}
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    return names, columns, version
+
+
+# база первой версии: только таблица modules, без индексов, истории статусов и FTS5
+@pytest.fixture
+def v1_path(tmp_path):
+    path = str(tmp_path / "modules.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE modules (
+            guid TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            status TEXT DEFAULT 'inactive',
+            service_type TEXT NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO modules VALUES ('g1', 'sensor_gateway', 'Сбор данных', 'active', 'dummy_service')")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_v1_database_is_upgraded(v1_path):
+    db = database.Database(v1_path)
+    names, columns, version = schema(v1_path)
+
+    assert version == database.SCHEMA_VERSION
+    assert {"idx_modules_name", "idx_modules_status_name", "idx_modules_service_type_name", "idx_modules_node"} <= names
+    assert {"status_events", "status_since", "status_rollups", "nodes", "meta"} <= names
+    assert {"health_check", "node", "pinned_node", "version"} <= columns
+    assert db.get_module("g1")["status"] == "active"
+
+    if db.fts_enabled:
+        assert "modules_fts" in names
+    # существующие модули попадают в индекс поиска
+    assert [module["guid"] for module in db.search_modules("sensor")] == ["g1"]
+
+
+def test_current_schema_skips_ddl(v1_path):
+    database.Database(v1_path)
+    conn = sqlite3.connect(v1_path)
+    conn.execute("DROP INDEX idx_modules_name")
+    conn.commit()
+    conn.close()
+
+    db = database.Database(v1_path)
+    names, _, version = schema(v1_path)
+    # версия совпадает: DDL не выполнялся, удаленный индекс не пересоздан
+    assert "idx_modules_name" not in names
+    assert version == database.SCHEMA_VERSION
+    assert db.fts_enabled == ("modules_fts" in names)
@@ -0,0 +1,87 @@
+import pytest
+
+import database
+
+
+MODULES = [
+    ("g1", "sensor_gateway", "Сбор данных с датчиков"),
+    ("g2", "camera", "Видеопоток с камеры и sensor fusion"),
+    ("g3", "ab_c", "Модуль с подчеркиванием"),
+    ("g4", "abxc", "Похожее имя"),
+    ("g5", "café_display", "Экран в кафе")
+]
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "like"])
+def db(request, tmp_path, monkeypatch):
+    if not request.param:
+        # FTS5 недоступен: поиск через LIKE
+        monkeypatch.setattr(database.Database, "_initialize_search_index", lambda self, cursor: False)
+
+    db = database.Database(str(tmp_path / "modules.db"))
+    assert db.fts_enabled is request.param
+    for guid, name, description in MODULES:
+        assert db.add_module({"guid": guid, "name": name, "description": description, "service_type": "dummy_service"})
+    return db
+
+
+def guids(modules):
+    return [module["guid"] for module in modules]
+
+
+def test_prefix_search(db):
+    assert set(guids(db.search_modules("sens"))) == {"g1", "g2"}
+    assert guids(db.search_modules("датчик")) == ["g1"]
+
+
+def test_all_words_must_match(db):
+    assert guids(db.search_modules("sensor gateway")) == ["g1"]
+    assert db.search_modules("sensor nothing") == []
+
+
+@pytest.mark.parametrize("query", ['sensor" OR "camera', "sensor)*", "NEAR(sensor", "^sensor -", 'sensor"'])
+def test_query_syntax_is_escaped(db, query):
+    # кавычки и операторы FTS5 не ломают запрос и не расширяют выборку
+    assert set(guids(db.search_modules(query))) <= {"g1", "g2"}
+
+
+def test_empty_query(db):
+    assert db.search_modules("") == []
+    assert db.search_modules('"*()') == []
+
+
+def test_underscore_is_literal(db):
+    assert "g4" not in guids(db.search_modules("ab_c"))
+    assert "g3" in guids(db.search_modules("ab_c"))
+
+
+def test_page_query_underscore_is_literal(db):
+    total, modules = db.get_modules_page(query="ab_c")
+    assert (total, guids(modules)) == (1, ["g3"])
+
+
+def test_limit(db):
+    assert len(db.search_modules("sensor", limit=1)) == 1
+
+
+def test_name_matches_rank_first(tmp_path):
+    db = database.Database(str(tmp_path / "modules.db"))
+    if not db.fts_enabled:
+        pytest.skip("SQLite собран без FTS5")
+    for guid, name, description in MODULES:
+        db.add_module({"guid": guid, "name": name, "description": description, "service_type": "dummy_service"})
+
+    assert guids(db.search_modules("sensor")) == ["g1", "g2"]
+    assert guids(db.search_modules("cafe")) == ["g5"]
+
+
+def test_index_follows_updates_and_deletes(tmp_path):
+    db = database.Database(str(tmp_path / "modules.db"))
+    db.add_module({"guid": "g1", "name": "old_name", "description": "", "service_type": "dummy_service"})
+
+    assert db.update_module("g1", {"name": "new_name"})
+    assert db.search_modules("old") == []
+    assert guids(db.search_modules("new")) == ["g1"]
+
+    assert db.delete_module("g1")
+    assert db.search_modules("new") == []
@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+import database
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # начало часа, чтобы границы бакетов были предсказуемы
+    clock = Clock(1_700_000_000 // 3600 * 3600)
+    monkeypatch.setattr(database.time, "time", clock)
+    return clock
+
+
+def add(db, guid, status="active"):
+    assert db.add_module({"guid": guid, "name": guid, "status": status, "service_type": "dummy_service"})
+
+
+def test_existing_modules_get_initial_history(tmp_path, clock):
+    path = str(tmp_path / "modules.db")
+    db = database.Database(path)
+    add(db, "legacy")
+
+    # модуль из старой схемы: без status_since и событий
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM status_since")
+    conn.execute("DELETE FROM status_events")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    db = database.Database(path)
+    clock.now += 600
+    uptime = db.get_module_uptime("legacy", 3600)
+    assert uptime["seconds"] == {"active": pytest.approx(600)}
+    assert uptime["uptime"] == 1
+
+
+def test_first_bucket_is_clipped_to_window(tmp_path, clock):
+    db = database.Database(str(tmp_path / "modules.db"))
+    start = clock.now
+    add(db, "m1")
+
+    # 30 минут active, затем failed до конца следующего часа
+    clock.now = start + 1800
+    assert db.update_module_status("m1", "failed")
+    clock.now = start + 3600 + 1800
+
+    # окно начинается на 45-й минуте первого часа: active в окне нет
+    uptime = db.get_module_uptime("m1", 2700)
+    assert uptime["seconds"] == {"failed": pytest.approx(2700)}
+    assert uptime["transitions"] == {}
+
+    # окно с 20-й минуты: последние 10 минут active и переход
+    uptime = db.get_module_uptime("m1", 4200)
+    assert uptime["seconds"]["active"] == pytest.approx(600)
+    assert uptime["seconds"]["failed"] == pytest.approx(3600)
+    assert uptime["transitions"] == {"failed": 1}
+
+
+def test_full_window_uses_rollups(tmp_path, clock):
+    db = database.Database(str(tmp_path / "modules.db"))
+    start = clock.now
+    add(db, "m1")
+    clock.now = start + 3600
+    assert db.update_module_status("m1", "failed")
+    clock.now = start + 7200
+    assert db.update_module_status("m1", "active")
+    clock.now = start + 7200 + 60
+
+    uptime = db.get_module_uptime("m1", 7200 + 60)
+    assert uptime["seconds"]["active"] == pytest.approx(3600 + 60)
+    assert uptime["seconds"]["failed"] == pytest.approx(3600)
+    assert uptime["transitions"] == {"failed": 1, "active": 1}
@@ -0,0 +1,149 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from health_probes import HealthProber
+
+
+# HTTP-заглушка: задержка перед ответом и коды ответов по очереди (последний повторяется)
+class StubServer:
+    def __init__(self, delay=0.0, codes=(200,)):
+        self.delay = delay
+        self.codes = list(codes)
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.delay)
+                code = stub.codes.pop(0) if len(stub.codes) > 1 else stub.codes[0]
+                self.send_response(code)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}/health"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = StubServer(**kwargs)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.close()
+
+
+# порт, на котором никто не слушает: подключение отклоняется
+@pytest.fixture
+def refused_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run(prober, checks):
+    return prober.submit(checks).result(timeout=prober.cycle_timeout(checks))
+
+
+def test_probes_run_concurrently(servers):
+    prober = HealthProber({"jitter": 0, "failure_threshold": 1})
+    checks = {
+        f"g{i}": {"type": "http", "url": servers(delay=0.5).url, "timeout": 2}
+        for i in range(6)
+    }
+
+    started = time.monotonic()
+    results = run(prober, checks)
+    elapsed = time.monotonic() - started
+
+    assert all(healthy for healthy, _ in results.values())
+    assert elapsed < 1.5
+
+
+def test_timeout_does_not_block_other_probes(servers, refused_port):
+    prober = HealthProber({"jitter": 0, "failure_threshold": 1})
+    fast = servers()
+    checks = {
+        "slow": {"type": "http", "url": servers(delay=5).url, "timeout": 0.3},
+        "refused": {"type": "tcp", "port": refused_port, "timeout": 1},
+        "fast_http": {"type": "http", "url": fast.url, "timeout": 1},
+        "fast_tcp": {"type": "tcp", "port": fast.port, "timeout": 1}
+    }
+
+    started = time.monotonic()
+    results = run(prober, checks)
+    elapsed = time.monotonic() - started
+
+    assert results["slow"] == (False, "таймаут 0.3 с")
+    assert results["refused"][0] is False
+    assert results["fast_http"] == (True, "HTTP 200")
+    assert results["fast_tcp"][0] is True
+    assert elapsed < 1.5
+
+
+def test_state_changes_after_consecutive_results(servers):
+    prober = HealthProber({"jitter": 0, "failure_threshold": 2, "success_threshold": 2})
+    flapping = servers(codes=[200, 500, 200, 500, 500, 200, 500, 200, 200])
+    checks = {"flap": {"type": "http", "url": flapping.url, "timeout": 1}}
+
+    states = [run(prober, checks)["flap"][0] for _ in range(9)]
+
+    # одиночные ошибки и одиночные успехи не меняют состояние
+    assert states == [True, True, True, True, False, False, False, False, True]
+    assert flapping.requests == 9
+
+
+def test_state_is_forgotten_for_removed_checks(servers):
+    prober = HealthProber({"jitter": 0, "failure_threshold": 1, "success_threshold": 3})
+    failing = servers(codes=[500])
+    run(prober, {"g1": {"type": "http", "url": failing.url, "timeout": 1}})
+    assert "g1" in prober.states
+
+    run(prober, {})
+    assert prober.states == {}
+
+
+def test_command_probe_runs_only_configured_checks(tmp_path):
+    marker = tmp_path / "marker"
+    prober = HealthProber({"jitter": 0, "failure_threshold": 1, "commands": {"ok": ["true"], "fail": ["false"]}})
+    checks = {
+        "ok": {"type": "command", "check": "ok"},
+        "fail": {"type": "command", "check": "fail"},
+        "unknown": {"type": "command", "check": "missing"},
+        "inline": {"type": "command", "command": f"touch {marker}"}
+    }
+
+    results = run(prober, checks)
+
+    assert results["ok"] == (True, "код возврата 0")
+    assert results["fail"] == (False, "код возврата 1")
+    assert results["unknown"][0] is False
+    assert results["inline"][0] is False
+    assert not marker.exists()
+
+
+def test_invalid_configured_commands_are_skipped():
+    prober = HealthProber({"commands": {"shell": "true; reboot", "empty": [], "ok": ["true"]}})
+    assert prober.commands == {"ok": ["true"]}
@@ -0,0 +1,192 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from journal_logs import FileJournalSource, JournalctlSource, JournalError, LogStreamer
+
+
+def entry(number, message, priority=6, ts=None):
+    return {
+        "__CURSOR": f"s={number}",
+        "__REALTIME_TIMESTAMP": str(int((ts if ts is not None else 1_700_000_000 + number) * 1e6)),
+        "PRIORITY": str(priority),
+        "MESSAGE": message,
+        "_PID": "100"
+    }
+
+
+def write(directory, unit, entries, mode="w"):
+    with open(directory / f"{unit}.jsonl", mode) as f:
+        for raw in entries:
+            f.write(json.dumps(raw) + "\n")
+
+
+@pytest.fixture
+def journal(tmp_path):
+    write(tmp_path, "alpha.service", [
+        entry(1, "started"),
+        entry(2, "disk error", priority=3),
+        entry(3, "request ok"),
+        entry(4, "warning: slow request", priority=4),
+        entry(5, "request ok"),
+        entry(6, "fatal error", priority=2)
+    ])
+    write(tmp_path, "beta.service", [entry(1, "beta started")])
+    return tmp_path
+
+
+def make_streamer(directory, **settings):
+    config = {"tail_lines": 200, "idle_ttl": 0.2}
+    config.update(settings)
+    return LogStreamer(config, FileJournalSource(str(directory), poll_interval=0.02))
+
+
+async def collect(stream, count=None, timeout=3):
+    result = []
+
+    async def read():
+        async for item in stream:
+            result.append(item)
+            if count is not None and len(result) >= count:
+                break
+
+    await asyncio.wait_for(read(), timeout)
+    return result
+
+
+def messages(entries):
+    return [item["message"] for item in entries]
+
+
+def test_unit_priority_grep_and_time_filters(journal):
+    async def run():
+        streamer = make_streamer(journal)
+        assert messages(await collect(streamer.stream("beta.service"))) == ["beta started"]
+        assert messages(await collect(streamer.stream("alpha.service", priority=3))) == ["disk error", "fatal error"]
+        assert messages(await collect(streamer.stream("alpha.service", grep="ERROR"))) == ["disk error", "fatal error"]
+        assert messages(await collect(streamer.stream("alpha.service", grep="request", priority=4))) == ["warning: slow request"]
+        assert messages(await collect(streamer.stream("alpha.service", since=1_700_000_003, until=1_700_000_004))) == [
+            "request ok", "warning: slow request"
+        ]
+        assert await collect(streamer.stream("missing.service")) == []
+    asyncio.run(run())
+
+
+def test_limit_returns_latest_entries(journal):
+    async def run():
+        streamer = make_streamer(journal)
+        assert messages(await collect(streamer.stream("alpha.service", limit=2))) == ["request ok", "fatal error"]
+        # фильтр без общего хвоста: последние записи, прошедшие фильтр
+        assert messages(await collect(streamer.stream("alpha.service", priority=3, limit=1))) == ["fatal error"]
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("tail_lines", [200, 2], ids=["cursor_in_tail", "cursor_from_source"])
+def test_cursor_resume(journal, tail_lines):
+    async def run():
+        streamer = make_streamer(journal, tail_lines=tail_lines)
+        resumed = await collect(streamer.stream("alpha.service", cursor="s=2", limit=2))
+        assert [item["cursor"] for item in resumed] == ["s=3", "s=4"]
+
+        # следующая страница по курсору последней записи
+        resumed = await collect(streamer.stream("alpha.service", cursor=resumed[-1]["cursor"], limit=10))
+        assert [item["cursor"] for item in resumed] == ["s=5", "s=6"]
+    asyncio.run(run())
+
+
+def test_follow_with_cursor_does_not_skip_entries(journal):
+    async def run():
+        streamer = make_streamer(journal)
+        stream = await streamer.open("alpha.service", cursor="s=1", follow=True, limit=2)
+        write(journal, "alpha.service", [entry(7, "new entry")], mode="a")
+
+        received = await collect(stream, count=6)
+        assert [item["cursor"] for item in received] == ["s=2", "s=3", "s=4", "s=5", "s=6", "s=7"]
+        await stream.aclose()
+    asyncio.run(run())
+
+
+def test_follow_history_over_max_limit_returns_next_cursor(journal):
+    async def run():
+        streamer = make_streamer(journal, tail_lines=1, max_limit=2)
+        stream = await streamer.open("alpha.service", cursor="s=1", follow=True)
+        received = await collect(stream, count=3)
+        assert [item.get("cursor") for item in received[:2]] == ["s=2", "s=3"]
+        assert received[2] == {"truncated": True, "next_cursor": "s=3"}
+        await stream.aclose()
+    asyncio.run(run())
+
+
+def test_followers_share_one_tail(journal, monkeypatch):
+    readers = []
+    entries = FileJournalSource.entries
+
+    def counting_entries(self, unit, **kwargs):
+        if kwargs.get("follow"):
+            readers.append(unit)
+        return entries(self, unit, **kwargs)
+
+    monkeypatch.setattr(FileJournalSource, "entries", counting_entries)
+
+    async def run():
+        streamer = make_streamer(journal)
+        streams = [await streamer.open("alpha.service", follow=True, limit=1) for _ in range(3)]
+        assert list(streamer.tails) == ["alpha.service"]
+
+        write(journal, "alpha.service", [entry(7, "shared entry")], mode="a")
+        for stream in streams:
+            assert messages(await collect(stream, count=2)) == ["fatal error", "shared entry"]
+            await stream.aclose()
+        assert readers == ["alpha.service"]
+
+        # после ухода последнего зрителя хвост закрывается через idle_ttl
+        await asyncio.sleep(0.5)
+        assert streamer.tails == {}
+    asyncio.run(run())
+
+
+def test_missing_journalctl_raises(monkeypatch, tmp_path):
+    monkeypatch.setenv("PATH", str(tmp_path))
+
+    async def run():
+        streamer = LogStreamer({"idle_ttl": 0.1}, JournalctlSource())
+        with pytest.raises(JournalError):
+            await streamer.open("alpha.service")
+        with pytest.raises(JournalError):
+            await streamer.open("alpha.service", priority=3)
+    asyncio.run(run())
+
+
+def test_journalctl_failure_raises(monkeypatch, tmp_path):
+    fake = tmp_path / "journalctl"
+    fake.write_text("#!/bin/sh\necho 'Failed to seek to cursor' >&2\nexit 1\n")
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path))
+
+    async def run():
+        streamer = LogStreamer({}, JournalctlSource())
+        with pytest.raises(JournalError, match="Failed to seek to cursor"):
+            await streamer.open("alpha.service", since=1_700_000_000)
+    asyncio.run(run())
+
+
+def test_endpoint_returns_503_when_journal_is_unavailable(load_system_api, monkeypatch, tmp_path):
+    system_api = load_system_api(logs={"source": "journalctl"})
+    monkeypatch.setenv("PATH", str(tmp_path / "empty"))
+    assert system_api.db.add_module({"guid": "g1", "name": "alpha", "service_type": "dummy_service"})
+
+    client = TestClient(system_api.app)
+    response = client.get("/api/modules/g1/logs")
+    assert response.status_code == 503
+    assert client.get("/api/modules/g1/logs", params={"grep": "("}).status_code == 400
+
+
+def test_endpoint_streams_file_journal(load_system_api, journal):
+    system_api = load_system_api(logs={"source": "file", "directory": str(journal)})
+    assert system_api.db.add_module({"guid": "g1", "name": "alpha", "service_type": "dummy_service"})
+
+    response = TestClient(system_api.app).get("/api/modules/g1/logs", params={"grep": "error"})
+    assert response.status_code == 200
+    assert [json.loads(line)["message"] for line in response.text.splitlines()] == ["disk error", "fatal error"]
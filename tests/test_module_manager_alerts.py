@@ -0,0 +1,63 @@
+import subprocess
+
+import pytest
+
+import module_manager
+from module_manager import ModuleManager
+from restart_policy import RestartPolicy
+from tracing import Tracer
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ModuleManager.__new__(ModuleManager)
+    manager.logger = module_manager.logging.getLogger("test")
+    manager.config = {"alerts": {"send_alert_after_service_failed": True}}
+    manager.tracer = Tracer({}, "test")
+    manager.alerted_modules = set()
+    manager.module_services = {"g1": {"guid": "g1", "systemd_service": "alpha.service", "status": "failed"}}
+    manager.restart_policy = RestartPolicy({"enabled": True, "base_delay": 0, "max_restarts": 2})
+
+    manager.emails = []
+    monkeypatch.setattr(manager, "send_alert_email",
+                        lambda name, service, recovered=False: manager.emails.append((name, recovered)))
+    monkeypatch.setattr(manager, "_update_module_status", lambda guid, status: None)
+    return manager
+
+
+def failing_run(*args, **kwargs):
+    raise subprocess.CalledProcessError(1, args[0])
+
+
+def test_failed_auto_restarts_do_not_send_emails(manager, monkeypatch):
+    monkeypatch.setattr(module_manager.subprocess, "run", failing_run)
+
+    for _ in range(3):
+        # слот берет политика при решении о перезапуске
+        manager.restart_policy.slots.acquire()
+        manager._auto_restart("g1", "alpha")
+
+    assert manager.emails == []
+
+
+def test_manual_restart_failure_sends_one_email(manager, monkeypatch):
+    monkeypatch.setattr(module_manager.subprocess, "run", failing_run)
+
+    manager.restart_service({"config_id": "g1", "name": "alpha"})
+    manager.restart_service({"config_id": "g1", "name": "alpha"})
+
+    assert manager.emails == [("alpha", False)]
+
+
+def test_quarantine_and_recovery_send_one_email_each(manager, monkeypatch):
+    monkeypatch.setattr(module_manager.threading, "Thread", lambda *args, **kwargs: type("T", (), {
+        "daemon": True, "start": lambda self: manager.restart_policy.restart_finished()
+    })())
+
+    statuses = [manager.apply_restart_policy("g1", "alpha", "alpha.service", "failed") for _ in range(8)]
+    assert statuses[-1] == "crashloop"
+    assert manager.emails == [("alpha", False)]
+
+    manager.alert_recovered("g1", "alpha", "alpha.service")
+    manager.alert_recovered("g1", "alpha", "alpha.service")
+    assert manager.emails == [("alpha", False), ("alpha", True)]
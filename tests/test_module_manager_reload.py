@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import module_manager
+from module_manager import ModuleManager
+
+
+BASE_CONFIG = {
+    "servername": "node",
+    "systemapi": {"base_url": "http://api"},
+    "mqtt": {"broker": "localhost", "port": 1883, "topic_prefix": "module_manager"},
+    "commands": {"max_pending": 100},
+    "snapshot": {"enabled": True}
+}
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ModuleManager.__new__(ModuleManager)
+    manager.logger = module_manager.logging.getLogger("test")
+    manager.config_path = str(tmp_path / "config.json")
+    manager.config = json.loads(json.dumps(BASE_CONFIG))
+    manager.sharding = dict(module_manager.DEFAULT_SHARDING_CONFIG)
+    manager.commands_config = dict(module_manager.DEFAULT_COMMANDS_CONFIG, max_pending=100)
+    manager.last_config_reload = None
+    return manager
+
+
+def write_config(manager, **changes):
+    config = json.loads(json.dumps(BASE_CONFIG))
+    config.update(changes)
+    with open(manager.config_path, "w") as f:
+        json.dump(config, f)
+
+
+def test_restart_required_is_reported_until_restart(manager):
+    write_config(manager, servername="renamed", snapshot={"enabled": False})
+
+    assert manager.reload_config()
+    assert manager.last_config_reload == {"applied": ["servername"], "restart_required": ["snapshot"]}
+    assert manager.config["servername"] == "renamed"
+    assert manager.config["snapshot"] == {"enabled": True}
+
+    assert manager.reload_config()
+    assert manager.last_config_reload == {"applied": [], "restart_required": ["snapshot"]}
+
+
+def test_reverted_section_no_longer_requires_restart(manager):
+    write_config(manager, snapshot={"enabled": False}, commands={"max_pending": 10})
+    assert manager.reload_config()
+    assert manager.last_config_reload["restart_required"] == ["snapshot", "commands.max_pending"]
+
+    write_config(manager, commands={"max_pending": 10})
+    assert manager.reload_config()
+    assert manager.last_config_reload == {"applied": [], "restart_required": ["commands.max_pending"]}
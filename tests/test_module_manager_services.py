@@ -0,0 +1,74 @@
+import os
+import threading
+
+import pytest
+
+import module_manager
+from module_manager import ModuleManager
+
+
+SERVICE_TEMPLATE = """[Service]
+WorkingDirectory=/opt/modules/{name}
+ExecStart=/usr/bin/python3 main.py
+"""
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(module_manager, "SYSTEMD_PATH", str(tmp_path))
+    # без __init__: сверка проверяется отдельно от MQTT и System API
+    manager = ModuleManager.__new__(ModuleManager)
+    manager.logger = module_manager.logging.getLogger("test")
+    manager.modules = []
+    manager.module_services = {}
+    manager.services_lock = threading.RLock()
+    manager.unit_files = {}
+    manager.service_files = None
+    manager.systemd_dir_mtime = None
+    return manager
+
+
+def add_module(manager, tmp_path, guid, name, with_file=True):
+    manager.modules.append({"guid": guid, "name": name})
+    if with_file:
+        with open(os.path.join(tmp_path, f"{manager._create_safe_filename(name)}.service"), "w") as f:
+            f.write(SERVICE_TEMPLATE.format(name=name))
+
+
+def test_reconcile_loads_services_and_keeps_status(manager, tmp_path):
+    add_module(manager, tmp_path, "g1", "alpha")
+    add_module(manager, tmp_path, "g2", "beta")
+    manager.module_services["g1"] = {"guid": "g1", "status": "active"}
+    manager.module_services["stale"] = {"guid": "stale", "status": "failed"}
+
+    manager.load_existing_services()
+
+    assert set(manager.module_services) == {"g1", "g2"}
+    assert manager.module_services["g1"]["status"] == "active"
+    assert manager.module_services["g1"]["module_path"] == "/opt/modules/alpha"
+    assert manager.module_services["g2"]["status"] == "unknown"
+
+
+def test_reconcile_does_not_lose_concurrent_changes(manager, tmp_path, monkeypatch):
+    add_module(manager, tmp_path, "g1", "alpha")
+    add_module(manager, tmp_path, "g2", "beta")
+    manager.module_services["g2"] = {"guid": "g2", "status": "active"}
+
+    parse = manager._parse_service_file
+    calls = []
+
+    # пока идет сканирование, команды создают g3 и удаляют g2
+    def parse_with_commands(path):
+        if not calls:
+            with manager.services_lock:
+                manager.module_services["g3"] = {"guid": "g3", "status": "unknow"}
+                manager.module_services.pop("g2", None)
+        calls.append(path)
+        return parse(path)
+
+    monkeypatch.setattr(manager, "_parse_service_file", parse_with_commands)
+    manager.load_existing_services()
+
+    assert "g3" in manager.module_services
+    assert "g2" not in manager.module_services
+    assert "g1" in manager.module_services
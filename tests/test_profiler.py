@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from profiler import Profiler
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def other_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy, args=(stop,), name="mqtt-worker", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_cprofile_reports_single_thread_scope(tmp_path, other_thread):
+    results = []
+    profiler = Profiler({"output_dir": str(tmp_path)}, "test", results.append)
+    assert profiler.start("cprofile", 1)
+
+    def loop():
+        while profiler.session is not None:
+            profiler.checkpoint()
+            sum(range(1000))
+            time.sleep(0.01)
+
+    monitor = threading.Thread(target=loop, name="monitor")
+    monitor.start()
+    monitor.join(timeout=5)
+
+    assert results[0]["scope"] == "thread"
+    assert results[0]["thread"] == "monitor"
+    assert results[0]["files"][0].endswith(".pstats")
+
+
+def test_sampling_covers_all_threads(tmp_path, other_thread):
+    results = []
+    profiler = Profiler({"output_dir": str(tmp_path), "sample_interval": 0.005}, "test", results.append)
+    assert profiler.start("sampling", 1)
+    assert profiler.status()["scope"] == "process"
+
+    deadline = time.time() + 5
+    while not results and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert results[0]["scope"] == "process"
+    with open(results[0]["files"][0]) as f:
+        threads = {line.split(";", 1)[0] for line in f}
+    assert {"mqtt-worker", "MainThread"} <= threads
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import resource_sampler
+from resource_sampler import RingBuffer, ResourceSampler
+
+
+def write_unit(root, service, usage_usec, memory):
+    path = os.path.join(root, "system.slice", service)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "cpu.stat"), "w") as f:
+        f.write(f"usage_usec {usage_usec}\n")
+    with open(os.path.join(path, "memory.current"), "w") as f:
+        f.write(f"{memory}\n")
+    return path
+
+
+def test_ring_buffer_limit():
+    buffer = RingBuffer(4)
+    for value in range(6):
+        buffer.append(value)
+
+    assert buffer.to_list() == [2, 3, 4, 5]
+    assert buffer.to_list(2) == [4, 5]
+    assert buffer.to_list(10) == [2, 3, 4, 5]
+    assert buffer.to_list(0) == []
+    assert buffer.to_list(-1) == []
+
+
+def test_stopped_unit_is_dropped_from_current(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    clock = iter([100.0, 101.0, 102.0])
+    monkeypatch.setattr(resource_sampler.time, "time", lambda: next(clock))
+    sampler = ResourceSampler({"cgroup_root": root})
+    services = {"g1": "module_g1.service"}
+
+    path = write_unit(root, "module_g1.service", 0, 1024)
+    sampler.sample(services)
+    write_unit(root, "module_g1.service", 500_000, 2048)
+    sampler.sample(services)
+
+    current = sampler.get_current()
+    assert current["g1"]["cpu_percent"] == pytest.approx(50)
+    assert current["g1"]["memory_bytes"] == 2048
+
+    # юнит остановлен: cgroup удален, но модуль еще зарегистрирован
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+    os.rmdir(path)
+    sampler.sample(services)
+
+    assert sampler.get_current() == {}
+    assert sampler.get_series("g1")["memory_bytes"] == [2048]
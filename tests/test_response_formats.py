@@ -0,0 +1,38 @@
+import response_formats
+
+
+def make_rows():
+    return [
+        {
+            "guid": f"guid-{i}",
+            "name": f"module_{i}",
+            "description": "Тестовый модуль",
+            "status": "active",
+            "service_type": "dummy_service",
+            "health_check": {"type": "tcp", "port": 8000 + i} if i % 2 else None,
+            "node": "host-a",
+            "pinned_node": None,
+            "version": i + 1
+        }
+        for i in range(5)
+    ]
+
+
+def test_all_formats_return_same_rows():
+    rows = make_rows()
+    for media_type in response_formats.supported_types():
+        body = response_formats.encode_modules(rows, media_type)
+        for encoding in [None] + response_formats.supported_encodings():
+            compressed, used = response_formats.compress(body, encoding, 0)
+            content = response_formats.decompress(compressed, used)
+            assert response_formats.decode_modules(content, media_type) == rows, (media_type, encoding)
+
+
+def test_columnar_keeps_extra_fields_after_base_columns():
+    columnar = response_formats.to_columnar(make_rows())
+    assert columnar["columns"][:len(response_formats.MODULE_COLUMNS)] == response_formats.MODULE_COLUMNS
+    assert {"node", "pinned_node", "version"} <= set(columnar["columns"])
+
+
+def test_columnar_empty_list():
+    assert response_formats.from_columnar(response_formats.to_columnar([])) == []
@@ -0,0 +1,148 @@
+import json
+import queue
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import module_manager
+from module_manager import ModuleManager
+from sharding import HashRing
+
+
+def test_modules_response_cache_is_bounded(load_system_api):
+    system_api = load_system_api(systemapi={"base_url": "http://testserver", "response_cache_size": 3})
+    client = TestClient(system_api.app)
+
+    for i in range(10):
+        assert client.get("/api/modules", params={"node": f"node-{i}"}).status_code == 200
+    assert len(system_api.modules_response_cache) == 3
+    assert [key[2] for key in system_api.modules_response_cache] == ["node-7", "node-8", "node-9"]
+
+
+def test_heartbeat_returns_alive_nodes_and_new_modules_are_assigned(load_system_api):
+    system_api = load_system_api(sharding={"enabled": True})
+    client = TestClient(system_api.app)
+
+    heartbeat = client.put("/api/nodes/node-a/heartbeat").json()
+    assert heartbeat["nodes"] == ["node-a"]
+
+    module = {"guid": "g1", "name": "alpha", "description": "", "status": "inactive", "service_type": "dummy_service"}
+    assert client.post("/api/modules", json=module).status_code == 200
+    assert system_api.db.get_module("g1")["node"] == "node-a"
+
+
+def assignment_version(db):
+    conn, cursor = db._get_connection()
+    cursor.execute("SELECT value FROM meta WHERE key = 'assignment_version'")
+    version = cursor.fetchone()["value"]
+    conn.close()
+    return version
+
+
+def test_concurrent_rebalances_apply_once(tmp_path):
+    db = database.Database(str(tmp_path / "modules.db"))
+    for i in range(50):
+        db.add_module({"guid": f"g{i}", "name": f"m{i}", "service_type": "dummy_service"})
+    db.node_heartbeat("node-a", 30)
+    db.node_heartbeat("node-b", 30)
+
+    barrier = threading.Barrier(4)
+    results = []
+
+    def rebalance():
+        barrier.wait()
+        results.append(db.rebalance_modules(30))
+
+    threads = [threading.Thread(target=rebalance) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [0, 0, 0, 50]
+    assert assignment_version(db) == 1
+
+
+def test_rebalance_skipped_within_min_interval(tmp_path):
+    db = database.Database(str(tmp_path / "modules.db"))
+    db.node_heartbeat("node-a", 30)
+    assert db.rebalance_modules(30, min_interval=60) == 0
+
+    db.add_module({"guid": "g1", "name": "m1", "service_type": "dummy_service"})
+    # другой воркер только что выполнил распределение
+    assert db.rebalance_modules(30, min_interval=60) == 0
+    assert db.get_module("g1")["node"] is None
+    assert db.rebalance_modules(30) == 1
+
+
+class FakeMqtt:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.published.append((topic, json.loads(payload)))
+
+
+@pytest.fixture
+def manager():
+    manager = ModuleManager.__new__(ModuleManager)
+    manager.logger = module_manager.logging.getLogger("test")
+    manager.node_id = "node-a"
+    manager.mqtt_topic_prefix = "module_manager"
+    manager.sharding = {"enabled": True, "virtual_nodes": 64}
+    manager.shard_ring = HashRing(["node-a", "node-b"], 64)
+    manager.modules = []
+    manager.commands_config = {"reply_topic": "command/result", "reply_qos": 1}
+    manager.command_queue = queue.Queue()
+    manager.mqtt_client = FakeMqtt()
+    manager.api_base_url = "http://api"
+    return manager
+
+
+def guid_owned_by(ring, node):
+    return next(f"g{i}" for i in range(1000) if ring.node_for(f"g{i}") == node)
+
+
+def message(topic, payload):
+    return SimpleNamespace(topic=topic, payload=json.dumps(payload).encode("utf-8"))
+
+
+def test_unknown_module_command_goes_to_ring_owner(manager):
+    own = guid_owned_by(manager.shard_ring, "node-a")
+    other = guid_owned_by(manager.shard_ring, "node-b")
+    topic = "module_manager/command/create_new_systemctl_service"
+
+    manager.on_mqtt_message(None, None, message(topic, {"config_id": other}))
+    assert manager.command_queue.empty()
+
+    manager.on_mqtt_message(None, None, message(topic, {"config_id": own}))
+    request = manager.command_queue.get_nowait()
+    assert request["payload"]["config_id"] == own
+    assert request["route"] is True
+
+
+def test_routed_command_is_forwarded_to_assigned_node(manager, monkeypatch):
+    monkeypatch.setattr(manager, "update_modules_list", lambda: None)
+    manager.api_client = SimpleNamespace(get=lambda url, timeout: SimpleNamespace(
+        status_code=200, json=lambda: {"guid": "g1", "node": "node-b"}
+    ))
+    request = {
+        "command": "create_new_systemctl_service",
+        "payload": {"config_id": "g1", "correlation_id": "c1"},
+        "correlation_id": "c1",
+        "reply_to": "module_manager/command/result"
+    }
+
+    assert manager.route_command(request) is True
+    assert manager.mqtt_client.published[0] == (
+        "module_manager/nodes/node-b/command/create_new_systemctl_service", {"config_id": "g1", "correlation_id": "c1"}
+    )
+    assert manager.mqtt_client.published[1][1]["state"] == "forwarded"
+
+
+def test_routed_command_runs_locally_when_module_arrives(manager, monkeypatch):
+    monkeypatch.setattr(manager, "update_modules_list", lambda: manager.modules.append({"guid": "g1"}))
+    assert manager.route_command({"command": "remove_service", "payload": {"config_id": "g1"}}) is False
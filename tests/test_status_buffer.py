@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+from status_buffer import StatusWriteBuffer
+
+
+# бд, запись в которую ждет разрешения теста
+class BlockingDb:
+    def __init__(self, success=True):
+        self.success = success
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.writes = []
+
+    def update_modules_status(self, updates):
+        self.started.set()
+        self.release.wait(5)
+        self.writes.append(updates)
+        return self.success, len(updates), [update["guid"] for update in updates]
+
+
+async def wait_started(db):
+    await asyncio.get_running_loop().run_in_executor(None, db.started.wait, 5)
+
+
+def test_in_flight_batch_stays_visible_until_commit():
+    db = BlockingDb()
+    buffer = StatusWriteBuffer(db)
+
+    async def scenario():
+        buffer.put("g1", "active")
+        flush = asyncio.create_task(buffer.flush())
+        await wait_started(db)
+
+        assert buffer.has_pending()
+        assert buffer.get("g1") == "active"
+        assert buffer.overlay([{"guid": "g1", "status": "inactive"}])[0]["status"] == "active"
+
+        buffer.put("g1", "failed")
+        assert buffer.get("g1") == "failed"
+
+        db.release.set()
+        await flush
+        assert buffer.get("g1") == "failed"
+        assert buffer.in_flight == {}
+
+    asyncio.run(scenario())
+
+
+def test_discard_waits_for_in_flight_batch():
+    db = BlockingDb()
+    buffer = StatusWriteBuffer(db)
+
+    async def scenario():
+        buffer.put("g1", "active")
+        flush = asyncio.create_task(buffer.flush())
+        await wait_started(db)
+
+        discard = asyncio.create_task(buffer.discard(["g1"]))
+        await asyncio.sleep(0.05)
+        # прямая запись не начинается, пока пачка из буфера не зафиксирована
+        assert not discard.done()
+
+        db.release.set()
+        await discard
+        assert flush.done()
+        await flush
+
+    asyncio.run(scenario())
+
+
+def test_discard_without_conflict_does_not_wait():
+    db = BlockingDb()
+    buffer = StatusWriteBuffer(db)
+
+    async def scenario():
+        buffer.put("g1", "active")
+        buffer.put("g2", "active")
+        flush = asyncio.create_task(buffer.flush())
+        await wait_started(db)
+        buffer.put("g3", "active")
+
+        await asyncio.wait_for(buffer.discard(["g3"]), 1)
+        assert buffer.get("g3") is None
+
+        db.release.set()
+        await flush
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_returns_batch_and_discard_removes_it():
+    db = BlockingDb(success=False)
+    buffer = StatusWriteBuffer(db)
+
+    async def scenario():
+        buffer.put("g1", "active")
+        buffer.put("g2", "active")
+        flush = asyncio.create_task(buffer.flush())
+        await wait_started(db)
+        buffer.put("g2", "failed")
+
+        discard = asyncio.create_task(buffer.discard(["g1"]))
+        db.release.set()
+        await flush
+        await discard
+
+        assert buffer.in_flight == {}
+        assert buffer.pending == {"g2": "failed"}
+
+    asyncio.run(scenario())
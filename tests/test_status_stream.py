@@ -0,0 +1,290 @@
+import json
+import socket
+import struct
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+import pytest
+
+import module_manager
+from module_manager import ModuleManager
+
+
+# совпадение топика с фильтром подписки (+ и #)
+def topic_matches(topic_filter, topic):
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for position, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if position >= len(topic_parts) or (part != "+" and part != topic_parts[position]):
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+# минимальный брокер MQTT 3.1.1 в процессе: подписки, сохраняемые сообщения, will, QoS 0/1
+class StubBroker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.retained = {}
+        self.published = []
+        self.clients = {}
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen()
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self.server.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _read_exact(conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def _read_packet(self, conn):
+        header = self._read_exact(conn, 1)[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = self._read_exact(conn, 1)[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return header, self._read_exact(conn, length)
+
+    @staticmethod
+    def _packet(header, body):
+        length = bytearray()
+        size = len(body)
+        while True:
+            byte = size % 128
+            size //= 128
+            length.append(byte | 0x80 if size else byte)
+            if not size:
+                break
+        return bytes([header]) + bytes(length) + body
+
+    @staticmethod
+    def _string(body, offset):
+        size = struct.unpack("!H", body[offset:offset + 2])[0]
+        return body[offset + 2:offset + 2 + size], offset + 2 + size
+
+    def _send(self, conn, data):
+        with self.lock:
+            send_lock = self.clients.get(conn, (None, threading.Lock()))[1]
+        with send_lock:
+            try:
+                conn.sendall(data)
+            except OSError:
+                pass
+
+    def _deliver(self, topic, payload, retain):
+        with self.lock:
+            self.published.append((topic, payload, retain))
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            targets = [conn for conn, (filters, _) in self.clients.items()
+                       if any(topic_matches(topic_filter, topic) for topic_filter in filters)]
+
+        body = struct.pack("!H", len(topic)) + topic.encode() + payload
+        for conn in targets:
+            self._send(conn, self._packet(0x30, body))
+
+    def _serve(self, conn):
+        will = None
+        clean = False
+        try:
+            header, body = self._read_packet(conn)
+            _, offset = self._string(body, 0)
+            flags = body[offset + 1]
+            _, offset = self._string(body, offset + 4)
+            if flags & 0x04:
+                will_topic, offset = self._string(body, offset)
+                will_payload, offset = self._string(body, offset)
+                will = (will_topic.decode(), will_payload, bool(flags & 0x20))
+
+            with self.lock:
+                self.clients[conn] = ([], threading.Lock())
+            self._send(conn, self._packet(0x20, b"\x00\x00"))
+
+            while True:
+                header, body = self._read_packet(conn)
+                packet_type = header >> 4
+                if packet_type == 3:
+                    qos = (header >> 1) & 0x03
+                    topic, offset = self._string(body, 0)
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                        self._send(conn, self._packet(0x40, packet_id))
+                    self._deliver(topic.decode(), body[offset:], bool(header & 0x01))
+                elif packet_type == 8:
+                    packet_id, offset = body[:2], 2
+                    filters = []
+                    while offset < len(body):
+                        topic_filter, offset = self._string(body, offset)
+                        filters.append(topic_filter.decode())
+                        offset += 1
+                    with self.lock:
+                        self.clients[conn][0].extend(filters)
+                        retained = [(topic, payload) for topic, payload in self.retained.items()
+                                    if any(topic_matches(topic_filter, topic) for topic_filter in filters)]
+                    self._send(conn, self._packet(0x90, packet_id + b"\x00" * len(filters)))
+                    for topic, payload in retained:
+                        self._send(conn, self._packet(0x31, struct.pack("!H", len(topic)) + topic.encode() + payload))
+                elif packet_type == 12:
+                    self._send(conn, self._packet(0xD0, b""))
+                elif packet_type == 14:
+                    clean = True
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self.lock:
+                self.clients.pop(conn, None)
+            conn.close()
+            # will публикуется только при обрыве связи без DISCONNECT
+            if will and not clean:
+                self._deliver(*will)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def broker():
+    broker = StubBroker()
+    yield broker
+    broker.close()
+
+
+@pytest.fixture
+def manager(broker):
+    # без __init__: только MQTT и поток статусов
+    manager = ModuleManager.__new__(ModuleManager)
+    manager.logger = module_manager.logging.getLogger("test")
+    manager.config = {"mqtt": {"broker": "127.0.0.1", "port": broker.port, "topic_prefix": "module_manager"}}
+    manager.node_id = "node-a"
+    manager.status_stream = {"enabled": True, "qos": 1}
+    manager.published_statuses = {}
+    manager.status_lock = threading.Lock()
+    manager.last_heartbeat_at = 0
+    manager.last_summary_at = 0
+    manager.sharding = {"enabled": False}
+    manager.modules = [{"guid": "g1"}, {"guid": "g2"}]
+
+    manager.setup_mqtt()
+    assert wait_for(lambda: "module_manager/managers/node-a" in broker.retained)
+    yield manager
+    manager.mqtt_client.loop_stop()
+    try:
+        manager.mqtt_client.disconnect()
+    except OSError:
+        pass
+
+
+def status_publishes(broker, guid):
+    with broker.lock:
+        return [(payload, retain) for topic, payload, retain in broker.published
+                if topic == f"module_manager/status/{guid}"]
+
+
+def test_status_deltas_are_retained_and_only_sent_on_change(broker, manager):
+    manager.publish_status("g1", "active")
+    manager.publish_status("g1", "active")
+    manager.publish_status("g2", "failed")
+    manager.publish_status("g1", "failed")
+
+    assert wait_for(lambda: len(status_publishes(broker, "g1")) == 2)
+    time.sleep(0.2)
+    g1 = status_publishes(broker, "g1")
+    assert [json.loads(payload)["status"] for payload, _ in g1] == ["active", "failed"]
+    assert all(retain for _, retain in g1)
+    assert len(status_publishes(broker, "g2")) == 1
+
+    # новый подписчик сразу получает последние статусы из сохраненных сообщений
+    received = {}
+    observer = mqtt.Client(client_id="observer")
+    observer.on_message = lambda client, userdata, msg: received.__setitem__(msg.topic, json.loads(msg.payload))
+    observer.connect("127.0.0.1", broker.port)
+    observer.subscribe("module_manager/status/+")
+    observer.loop_start()
+    try:
+        assert wait_for(lambda: len(received) == 2)
+        assert received["module_manager/status/g1"]["status"] == "failed"
+        assert received["module_manager/status/g2"]["status"] == "failed"
+    finally:
+        observer.loop_stop()
+        observer.disconnect()
+
+
+def test_removed_module_status_is_cleared(broker, manager):
+    manager.publish_status("g2", "active")
+    assert wait_for(lambda: "module_manager/status/g2" in broker.retained)
+
+    manager.modules = [{"guid": "g1"}]
+    manager.clear_removed_statuses()
+    assert wait_for(lambda: "module_manager/status/g2" not in broker.retained)
+
+
+def test_summary_and_heartbeat_topics(broker, manager):
+    manager.publish_status("g1", "active")
+    manager.publish_status("g2", "degraded")
+    manager.publish_periodic()
+
+    assert wait_for(lambda: "module_manager/fleet/node-a" in broker.retained)
+    summary = json.loads(broker.retained["module_manager/fleet/node-a"])
+    assert summary["node"] == "node-a"
+    assert summary["total"] == 2
+    assert summary["by_status"] == {"active": 1, "degraded": 1}
+
+    heartbeat = json.loads(broker.retained["module_manager/managers/node-a"])
+    assert heartbeat["state"] == "online"
+    assert heartbeat["modules"] == 2
+
+
+def test_summaries_of_shards_do_not_overwrite_each_other(broker, manager):
+    manager.publish_status("g1", "active")
+    manager.publish_fleet_summary()
+    # второй узел со своей частью модулей
+    manager.node_id = "node-b"
+    manager.publish_status("g2", "failed")
+    manager.publish_fleet_summary()
+
+    assert wait_for(lambda: "module_manager/fleet/node-b" in broker.retained)
+    assert json.loads(broker.retained["module_manager/fleet/node-a"])["node"] == "node-a"
+    assert json.loads(broker.retained["module_manager/fleet/node-b"])["node"] == "node-b"
+    assert "module_manager/fleet" not in broker.retained
+
+
+def test_offline_will_on_connection_loss(broker, manager):
+    # обрыв связи без DISCONNECT: брокер публикует will
+    manager.mqtt_client.loop_stop()
+    manager.mqtt_client.socket().close()
+
+    assert wait_for(lambda: json.loads(broker.retained["module_manager/managers/node-a"])["state"] == "offline")
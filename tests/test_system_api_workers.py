@@ -0,0 +1,31 @@
+import pytest
+
+
+@pytest.fixture
+def api(load_system_api, monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("GUNICORN_CMD_ARGS", raising=False)
+    return load_system_api
+
+
+@pytest.mark.parametrize("argv, environ, expected", [
+    (["uvicorn", "system_api:app"], {}, 1),
+    (["uvicorn", "system_api:app", "--workers", "4"], {}, 4),
+    (["uvicorn", "system_api:app", "--workers=3"], {}, 3),
+    (["gunicorn", "-k", "uvicorn.workers.UvicornWorker", "-w", "4", "system_api:app"], {}, 4),
+    (["gunicorn", "-w2", "system_api:app"], {}, 2),
+    (["gunicorn", "system_api:app"], {"WEB_CONCURRENCY": "3"}, 3),
+    (["gunicorn", "system_api:app"], {"GUNICORN_CMD_ARGS": "--workers 5 --bind 0.0.0.0:8080"}, 5),
+])
+def test_detect_worker_count(api, argv, environ, expected):
+    system_api = api()
+    assert system_api.detect_worker_count(argv, environ) == expected
+
+
+def test_write_behind_disabled_with_several_workers(api, monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert api(write_behind={"enabled": True}).status_buffer is None
+
+
+def test_write_behind_enabled_with_one_worker(api):
+    assert api(write_behind={"enabled": True}).status_buffer is not None
@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def api(load_system_api):
+    # большой интервал: фоновая запись не успевает, буфер сбрасывают только чтения
+    system_api = load_system_api(write_behind={"enabled": True, "flush_interval": 3600})
+    for i in range(3):
+        assert system_api.db.add_module({"guid": f"g{i}", "name": f"module_{i}", "status": "inactive",
+                                         "service_type": "dummy_service"})
+    return system_api
+
+
+def test_summary_and_page_totals_see_buffered_statuses(api):
+    client = TestClient(api.app)
+    assert client.put("/api/modules/g0/status", json={"status": "active"}).status_code == 200
+    assert api.status_buffer.has_pending()
+
+    modules = client.get("/api/modules", headers={"Accept": "application/json"}).json()
+    assert {module["guid"]: module["status"] for module in modules}["g0"] == "active"
+
+    summary = client.get("/api/modules/summary").json()
+    assert summary["by_status"] == {"active": 1, "inactive": 2}
+
+    page = client.get("/api/dashboard/rows", params={"status": "active"}).json()
+    assert page["total"] == 1
+    assert page["version"] is not None
+    assert not api.status_buffer.has_pending()
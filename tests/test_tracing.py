@@ -0,0 +1,129 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import module_manager
+from module_manager import CommandErrorCollector, ModuleManager
+from tracing import Tracer, parse_traceparent
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+TRACEPARENT = f"00-{TRACE_ID}-{PARENT_ID}-01"
+
+
+# трассировщик, завершенные участки которого складываются в список
+def recording_tracer(tmp_path):
+    tracer = Tracer({"enabled": True, "directory": str(tmp_path / "traces")}, "test")
+    tracer.spans = []
+    tracer.exporter.export = tracer.spans.append
+    return tracer
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(TRACEPARENT) == (TRACE_ID, PARENT_ID)
+    assert parse_traceparent(f" {TRACEPARENT} ") == (TRACE_ID, PARENT_ID)
+
+
+@pytest.mark.parametrize("value", [
+    None, "", "garbage", f"00-{TRACE_ID}-{PARENT_ID}", f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01",
+    f"00-{'z' * 32}-{PARENT_ID}-01", f"00-{TRACE_ID}-{'x' * 16}-01", 12345
+])
+def test_parse_malformed_traceparent(value):
+    assert parse_traceparent(value) is None
+
+
+def test_span_keeps_incoming_trace_and_replaces_malformed(tmp_path):
+    tracer = recording_tracer(tmp_path)
+
+    with tracer.span("valid", parent=TRACEPARENT, root=True) as span:
+        assert tracer.inject_headers() == {"traceparent": f"00-{TRACE_ID}-{span.span_id}-01"}
+    assert (span.trace_id, span.parent_id) == (TRACE_ID, PARENT_ID)
+
+    with tracer.span("malformed", parent="00-bad-trace-01", root=True) as span:
+        pass
+    assert len(span.trace_id) == 32 and span.trace_id != TRACE_ID
+    assert span.parent_id is None
+
+    # без root некорректный контекст не создает трассировку
+    with tracer.span("ignored", parent="00-bad-trace-01") as span:
+        assert span.trace_id is None
+
+
+@pytest.fixture
+def api(load_system_api, tmp_path, monkeypatch):
+    system_api = load_system_api(tracing={"enabled": True, "directory": str(tmp_path / "traces")})
+    system_api.tracer.spans = []
+    monkeypatch.setattr(system_api.tracer.exporter, "export", system_api.tracer.spans.append)
+
+    published = []
+
+    async def publish_mqtt(messages):
+        published.extend(messages)
+
+    monkeypatch.setattr(system_api, "publish_mqtt", publish_mqtt)
+    system_api.published = published
+    return system_api
+
+
+def test_request_with_valid_traceparent_continues_trace(api):
+    TestClient(api.app).get("/api/modules/summary", headers={"traceparent": TRACEPARENT})
+
+    span = api.tracer.spans[-1]
+    assert span.name == "GET /api/modules/summary"
+    assert (span.trace_id, span.parent_id) == (TRACE_ID, PARENT_ID)
+    assert span.attributes["http.status_code"] == 200
+
+
+def test_request_with_malformed_traceparent_gets_new_trace(api):
+    TestClient(api.app).get("/api/modules/summary", headers={"traceparent": f"00-{TRACE_ID}-short-01"})
+
+    span = api.tracer.spans[-1]
+    assert span.trace_id != TRACE_ID
+    assert span.parent_id is None
+
+
+def test_traceparent_is_passed_to_mqtt_payload(api):
+    response = TestClient(api.app).post(
+        "/api/modules/actions", json={"action": "stop", "selector": {"status": "failed"}}, headers={"traceparent": TRACEPARENT}
+    )
+    assert response.status_code == 202
+
+    payload = json.loads(api.published[0]["payload"])
+    trace_id, span_id = parse_traceparent(payload["traceparent"])
+    assert trace_id == TRACE_ID
+    publish_span = next(span for span in api.tracer.spans if span.name == "mqtt publish bulk_action")
+    assert span_id == publish_span.span_id
+
+
+def test_manager_passes_traceparent_from_command_to_api_calls(tmp_path, monkeypatch):
+    manager = ModuleManager.__new__(ModuleManager)
+    manager.logger = module_manager.logging.getLogger("test")
+    manager.tracer = recording_tracer(tmp_path)
+    manager.sharding = {"enabled": False}
+    manager.command_errors = CommandErrorCollector()
+    manager.module_services = {}
+    manager.modules = []
+    manager.last_config_reload = None
+    manager.api_base_url = "http://api"
+    requests = []
+    manager.api_client = SimpleNamespace(
+        put=lambda url, json, headers: requests.append(headers) or SimpleNamespace(status_code=200, text="")
+    )
+    monkeypatch.setattr(manager, "publish_status", lambda guid, status: None)
+    monkeypatch.setattr(manager, "send_command_reply", lambda request, state, **details: None)
+    monkeypatch.setattr(manager, "dispatch_command", lambda command, payload: manager._update_module_status("g1", "active") or True)
+
+    manager.execute_command({
+        "command": "run_command_for_systemd_service",
+        "payload": {"config_id": "g1", "action": "start", "traceparent": TRACEPARENT},
+        "topic": "module_manager/command/run_command_for_systemd_service",
+        "traceparent": TRACEPARENT,
+        "received_at": 0
+    })
+
+    command_span = next(span for span in manager.tracer.spans if span.name == "mqtt run_command_for_systemd_service")
+    status_span = next(span for span in manager.tracer.spans if span.name == "http PUT status")
+    assert command_span.trace_id == TRACE_ID
+    assert requests[0]["traceparent"] == f"00-{TRACE_ID}-{status_span.span_id}-01"
@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import glob
+import queue
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TRACING_CONFIG = {
+    "enabled": False,
+    "exporter": "file",
+    "directory": "traces",
+    "otlp_endpoint": "http://localhost:4318/v1/traces",
+    "flush_interval": 1.0,
+    "max_queue": 10000
+}
+
+# заголовок HTTP и поле в MQTT сообщении с контекстом трассировки (формат W3C traceparent)
+TRACEPARENT = "traceparent"
+
+# участок работы внутри трассировки
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+    # дополнительное поле участка
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+    # контекст для передачи в другой процесс
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+# заглушка, когда трассировка выключена или нет текущей трассировки
+class _NoopSpan:
+    trace_id = None
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = nullcontext(NOOP_SPAN)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+# разбор traceparent: (trace_id, span_id) или None
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not value or not isinstance(value, str):
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+# фоновая выгрузка завершенных участков в файл или OTLP коллектор
+class SpanExporter:
+    def __init__(self, tracing_config: Dict[str, Any], service_name: str):
+        self.logger = logging.getLogger(f"Tracing.{service_name}")
+        self.service_name = service_name
+        self.exporter = tracing_config["exporter"]
+        self.path = os.path.join(tracing_config["directory"], f"{service_name}.jsonl")
+        self.otlp_endpoint = tracing_config["otlp_endpoint"]
+        self.flush_interval = float(tracing_config["flush_interval"])
+        self.queue = queue.Queue(maxsize=int(tracing_config["max_queue"]))
+        self.dropped = 0
+
+        if self.exporter == "file":
+            os.makedirs(tracing_config["directory"], exist_ok=True)
+
+        self.thread = threading.Thread(target=self._run, name="span-exporter")
+        self.thread.daemon = True
+        self.thread.start()
+    # участок в очередь, при переполнении отбрасывается
+    def export(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+    # выгрузка накопленных участков раз в flush_interval секунд
+    def _run(self):
+        while True:
+            spans = [self.queue.get()]
+            time.sleep(self.flush_interval)
+            while True:
+                try:
+                    spans.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                if self.exporter == "otlp":
+                    self._send_otlp(spans)
+                else:
+                    self._write_file(spans)
+            except Exception as e:
+                self.logger.error(f"Ошибка при выгрузке {len(spans)} участков трассировки: {str(e)}")
+
+            if self.dropped:
+                self.logger.warning(f"Очередь трассировки переполнена, отброшено участков: {self.dropped}")
+                self.dropped = 0
+    # строка JSON на участок
+    def _write_file(self, spans: List[Span]):
+        lines = []
+        for span in spans:
+            lines.append(json.dumps({
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "service": self.service_name,
+                "name": span.name,
+                "start_ns": span.start_ns,
+                "end_ns": span.end_ns,
+                "attributes": span.attributes,
+                "error": span.error
+            }, ensure_ascii=False, default=str) + "\n")
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+    # OTLP/HTTP JSON
+    def _send_otlp(self, spans: List[Span]):
+        import urllib.request
+
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}} for key, value in span.attributes.items()
+                ],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+
+        body = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": self.service_name}, "spans": otlp_spans}]
+            }]
+        }).encode("utf-8")
+
+        request = urllib.request.Request(
+            self.otlp_endpoint, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+
+# трассировка команд: участки связываются через traceparent в MQTT сообщениях и HTTP заголовках
+class Tracer:
+    def __init__(self, tracing_config: Optional[Dict[str, Any]] = None, service_name: str = "service"):
+        settings = dict(DEFAULT_TRACING_CONFIG)
+        settings.update(tracing_config or {})
+
+        self.enabled = bool(settings["enabled"])
+        self.exporter = SpanExporter(settings, service_name) if self.enabled else None
+    # участок работы: продолжает текущую трассировку или traceparent из parent, новая трассировка только при root
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[str] = None, root: bool = False):
+        if not self.enabled:
+            return _NOOP_CONTEXT
+
+        remote = parse_traceparent(parent)
+        current = _current_span.get()
+        if remote:
+            trace_id, parent_id = remote
+        elif current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        elif root:
+            trace_id, parent_id = os.urandom(16).hex(), None
+        else:
+            return _NOOP_CONTEXT
+
+        return self._record(Span(name, trace_id, parent_id, attributes))
+    # участок становится текущим до выхода из блока
+    @contextmanager
+    def _record(self, span: Span):
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.exporter.export(span)
+    # текущий traceparent для передачи дальше
+    def current_traceparent(self) -> Optional[str]:
+        current = _current_span.get() if self.enabled else None
+        return current.traceparent if current is not None else None
+    # заголовки HTTP запроса с контекстом трассировки
+    def inject_headers(self) -> Dict[str, str]:
+        traceparent = self.current_traceparent()
+        return {TRACEPARENT: traceparent} if traceparent else {}
+
+# одна трассировка из файлов всех процессов в виде временной шкалы
+def print_timeline(trace_id: str, directory: str):
+    spans = []
+    for path in glob.glob(os.path.join(directory, "*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if trace_id in line:
+                    span = json.loads(line)
+                    if span["trace_id"] == trace_id:
+                        spans.append(span)
+
+    if not spans:
+        print(f"Трассировка {trace_id} не найдена в {directory}")
+        return
+
+    spans.sort(key=lambda span: span["start_ns"])
+    started = spans[0]["start_ns"]
+    children = {}
+    known = {span["span_id"] for span in spans}
+    for span in spans:
+        parent = span["parent_id"] if span["parent_id"] in known else None
+        children.setdefault(parent, []).append(span)
+
+    def show(parent, depth):
+        for span in children.get(parent, []):
+            offset = (span["start_ns"] - started) / 1e6
+            duration = (span["end_ns"] - span["start_ns"]) / 1e6
+            error = f"  ОШИБКА: {span['error']}" if span["error"] else ""
+            print(f"{offset:10.1f} мс {duration:10.1f} мс  {'  ' * depth}[{span['service']}] {span['name']}{error}")
+            show(span["span_id"], depth + 1)
+
+    show(None, 0)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python tracing.py <trace_id> [каталог с трассировками]")
+        sys.exit(1)
+    print_timeline(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else DEFAULT_TRACING_CONFIG["directory"])